@@ -0,0 +1,36 @@
+"""
+Answer Cache
+
+Two-level cache for /ask results: an exact-match LRU keyed on the
+normalized question and generation parameters, backed by a semantic
+lookup over embeddings of previously answered questions.
+"""
+
+from typing import Tuple
+
+from ..embeddings.query_cache import QueryCache
+
+
+class AnswerCache(QueryCache):
+    """QueryCache keyed on /ask generation parameters."""
+    
+    @staticmethod
+    def make_key(
+        query: str,
+        top_k: int,
+        max_tokens: int,
+        temperature: float
+    ) -> Tuple:
+        """
+        Build the exact-match cache key for a request.
+        
+        Args:
+            query: User question
+            top_k: Number of chunks retrieved
+            max_tokens: Max answer tokens
+            temperature: LLM temperature
+        
+        Returns:
+            Hashable cache key
+        """
+        return QueryCache.make_key(query, top_k, max_tokens, round(temperature, 2))
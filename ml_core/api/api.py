@@ -2,25 +2,48 @@
 FastAPI REST API for RAG Pipeline
 
 Provides endpoints for:
-- Question answering (/ask)
+- Question answering (/ask, /ask/stream)
 - Document ingestion (/ingest)
 - Health check (/info)
 """
 
+import os
+
+# Bound BLAS/OpenMP pools before numpy/torch/faiss create them; by default
+# they size to every host core, which oversubscribes containers
+_DEFAULT_THREADS = str(max(1, (os.cpu_count() or 2) // 2))
+os.environ.setdefault('OMP_NUM_THREADS', os.environ.get('FAISS_THREADS', _DEFAULT_THREADS))
+os.environ.setdefault('MKL_NUM_THREADS', os.environ.get('FAISS_THREADS', _DEFAULT_THREADS))
+
 import logging
 import asyncio
+import inspect
+import json
+from contextlib import contextmanager
+from importlib.util import find_spec
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict, Iterator, Tuple
 from datetime import datetime
 
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi.routing import serialize_response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from ..ingest.ingest_pipeline import IngestionPipeline
-from ..embeddings.embedder import Embedder
-from ..embeddings.build_faiss import build_index_from_chunks
+from ..ingest.pdf_to_text import get_pdf_extractor
+from ..embeddings.embedder import Embedder, QueryBatcher
+from ..embeddings.build_faiss import build_index_from_chunks, append_to_index
+from ..embeddings.search import SemanticSearch, configure_threads, load_search_engine
 from ..models.rag_pipeline import RAGPipeline, initialize_rag_pipeline
+from .answer_cache import AnswerCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -58,7 +81,10 @@ class IngestRequest(BaseModel):
     """Request model for /ingest endpoint."""
     pdf_path: str = Field(..., description="Path to PDF file")
     document_name: Optional[str] = Field(None, description="Document name (defaults to filename)")
-    rebuild_index: bool = Field(default=True, description="Rebuild FAISS index after ingestion")
+    rebuild_index: bool = Field(
+        default=True,
+        description="Rebuild the FAISS index from this document (false: append to the existing index)"
+    )
 
 
 class IngestResponse(BaseModel):
@@ -71,6 +97,12 @@ class IngestResponse(BaseModel):
     message: str
 
 
+class HealthResponse(BaseModel):
+    """Response model for /health endpoint."""
+    status: str
+    timestamp: str
+
+
 class InfoResponse(BaseModel):
     """Response model for /info endpoint."""
     status: str
@@ -81,19 +113,186 @@ class InfoResponse(BaseModel):
     uptime_seconds: float
 
 
-# Global state
+# Global state (per worker process). Config comes from the environment so
+# that every uvicorn worker sees what __main__ was given.
 app_state = {
     'rag_pipeline': None,
+    'embedder': None,
+    'query_batcher': None,
     'start_time': datetime.now(),
-    'config': {}
+    'config': json.loads(os.environ.get('ML_CORE_API_CONFIG', '{}')),
+    'index_generation': None,
+    'answer_cache': AnswerCache(max_entries=1024, similarity_threshold=0.97)
 }
 
 
+# Serializes index writes from concurrent /ingest requests in this process;
+# _index_file_lock does the same across worker processes
+_index_lock = asyncio.Lock()
+
+# Serializes pipeline reloads in this process
+_reload_lock = asyncio.Lock()
+
+
+def _index_dir() -> str:
+    """Index directory from the config."""
+    return app_state['config'].get('index_dir', './ml_core/data/index')
+
+
+@contextmanager
+def _index_file_lock(index_dir: str, shared: bool = False):
+    """
+    Lock the index directory across processes (no-op without fcntl).
+    
+    Writers hold it exclusively; readers loading the index hold it shared,
+    so they never load the files of a half-finished save.
+    """
+    if fcntl is None:
+        yield
+        return
+    
+    Path(index_dir).mkdir(parents=True, exist_ok=True)
+    with open(Path(index_dir) / ".write.lock", 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _index_generation(index_dir: str) -> Optional[Tuple[int, int]]:
+    """
+    Identify the last completed save of the index (None if there is none).
+    
+    save_index replaces the config file last, so a new inode or mtime on
+    it means the index and metadata were replaced too. One stat, cheap
+    enough to check on every request.
+    """
+    for name in ("faiss_index_config.json", "faiss_index.bin"):
+        try:
+            stat = os.stat(Path(index_dir) / name)
+        except FileNotFoundError:
+            continue
+        return (stat.st_ino, stat.st_mtime_ns)
+    return None
+
+
+def _load_rag_pipeline(index_dir: str) -> RAGPipeline:
+    """
+    Load the RAG pipeline (LLM included), recording which save of the
+    index it uses once the load has succeeded.
+    """
+    with _index_file_lock(index_dir, shared=True):
+        generation = _index_generation(index_dir)
+        rag_pipeline = initialize_rag_pipeline(
+            index_dir=index_dir,
+            model_name=app_state['config'].get('model_name', 'llama-3.2-3b'),
+            quantize=app_state['config'].get('quantize', True)
+        )
+    app_state['index_generation'] = generation
+    return rag_pipeline
+
+
+def _load_search_engine(index_dir: str, current: SemanticSearch) -> SemanticSearch:
+    """
+    Load a search engine over the index on disk, sharing the current
+    engine's embedder, and record which save of the index it uses once
+    the load has succeeded.
+    """
+    with _index_file_lock(index_dir, shared=True):
+        generation = _index_generation(index_dir)
+        search_engine = load_search_engine(index_dir, embedder=current.embedder)
+    app_state['index_generation'] = generation
+    return search_engine
+
+
+async def _refresh_rag_pipeline():
+    """
+    Reload the pipeline if the index on disk changed since it was loaded.
+    
+    Each worker process holds its own pipeline and answer cache, and only
+    the worker serving /ingest writes the index, so every worker checks
+    before answering. The first request after an ingest waits for the
+    index and metadata to load (the LLM is kept); a failed load is
+    retried on the next request.
+    """
+    index_dir = _index_dir()
+    generation = _index_generation(index_dir)
+    if generation is None or generation == app_state['index_generation']:
+        return
+    
+    async with _reload_lock:
+        if _index_generation(index_dir) != app_state['index_generation']:
+            await reload_rag_pipeline(index_dir)
+
+
+def _write_index(write_fn, chunks: List[Dict], embeddings: np.ndarray, index_dir: str):
+    """Run an index build/append while holding the cross-process lock."""
+    with _index_file_lock(index_dir):
+        return write_fn(chunks, embeddings, index_dir)
+
+
+def _get_embedder() -> Embedder:
+    """Return the shared embedder, loading it on first use."""
+    if app_state['embedder'] is None:
+        app_state['embedder'] = Embedder()
+    return app_state['embedder']
+
+
+async def _embed_all(
+    embedder: Embedder,
+    texts: List[str],
+    batch: int = 64,
+    concurrency: int = 4
+) -> np.ndarray:
+    """
+    Embed texts in worker threads without blocking the event loop.
+    
+    Texts are split into batches that run concurrently, bounded by a
+    semaphore so at most `concurrency` encodes are in flight.
+    
+    Args:
+        embedder: Embedder instance
+        texts: Texts to embed
+        batch: Number of texts per batch
+        concurrency: Maximum concurrent batches
+        
+    Returns:
+        Embeddings array (n_texts, embedding_dim)
+    """
+    if not texts:
+        return np.array([])
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def _run(batch_texts: List[str]) -> np.ndarray:
+        async with semaphore:
+            return await asyncio.to_thread(
+                embedder.embed_texts,
+                batch_texts,
+                batch_size=batch
+            )
+    
+    slices = [texts[i:i + batch] for i in range(0, len(texts), batch)]
+    results = await asyncio.gather(*[_run(s) for s in slices])
+    
+    return np.concatenate(results)
+
+
+# Response serialization: recent FastAPI versions dump response models
+# straight to JSON bytes in pydantic-core, but only with the default
+# response class. Older versions go through stdlib json, so use orjson there.
+_app_kwargs = {}
+if 'dump_json' not in inspect.signature(serialize_response).parameters:
+    from fastapi.responses import ORJSONResponse
+    _app_kwargs['default_response_class'] = ORJSONResponse
+
 # FastAPI app
 app = FastAPI(
     title="ISO Document RAG API",
     description="Semantic search and question answering for ISO documents",
-    version="1.0.0"
+    version="1.0.0",
+    **_app_kwargs
 )
 
 # CORS middleware
@@ -111,21 +310,33 @@ async def startup_event():
     """Initialize RAG pipeline on startup."""
     logger.info("Starting API server...")
     
+    configure_threads()
+    
     # Load configuration
-    index_dir = app_state['config'].get('index_dir', './ml_core/data/index')
-    model_name = app_state['config'].get('model_name', 'llama-3.2-3b')
-    quantize = app_state['config'].get('quantize', True)
+    index_dir = _index_dir()
+    
+    # Load the shared embedder once, not per /ingest request; concurrent
+    # /ask queries are embedded through it in shared batches
+    try:
+        app_state['embedder'] = Embedder()
+        app_state['query_batcher'] = QueryBatcher(app_state['embedder'])
+        app_state['query_batcher'].start()
+    except Exception as e:
+        logger.error(f"Failed to load embedder: {e}")
+    
+    # Load the shared OCR engines now, not on the first scanned PDF
+    if app_state['config'].get('ocr_warmup', True):
+        try:
+            await asyncio.to_thread(get_pdf_extractor().warmup)
+        except Exception as e:
+            logger.warning(f"OCR warmup failed: {e}")
     
     # Check if index exists
     index_path = Path(index_dir)
     if index_path.exists() and (index_path / "faiss_index.bin").exists():
         logger.info(f"Loading RAG pipeline from: {index_dir}")
         try:
-            app_state['rag_pipeline'] = initialize_rag_pipeline(
-                index_dir=index_dir,
-                model_name=model_name,
-                quantize=quantize
-            )
+            app_state['rag_pipeline'] = _load_rag_pipeline(index_dir)
             logger.info("✓ RAG pipeline loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load RAG pipeline: {e}")
@@ -135,6 +346,14 @@ async def startup_event():
         logger.warning("API starting without RAG pipeline. Use /ingest to create index.")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the query batcher."""
+    if app_state['query_batcher'] is not None:
+        await app_state['query_batcher'].stop()
+        app_state['query_batcher'] = None
+
+
 @app.post("/ask", response_model=AskResponse)
 async def ask_question(request: AskRequest):
     """
@@ -149,6 +368,8 @@ async def ask_question(request: AskRequest):
     }
     ```
     """
+    await _refresh_rag_pipeline()
+    
     if app_state['rag_pipeline'] is None:
         raise HTTPException(
             status_code=503,
@@ -158,30 +379,148 @@ async def ask_question(request: AskRequest):
     try:
         logger.info(f"Processing question: {request.query}")
         
-        # Get answer from RAG pipeline
-        result = app_state['rag_pipeline'].ask_question(
-            query=request.query,
-            top_k=request.top_k,
-            max_tokens=request.max_tokens,
-            temperature=request.temperature
+        rag_pipeline = app_state['rag_pipeline']
+        cache = app_state['answer_cache']
+        cache_key = AnswerCache.make_key(
+            request.query,
+            request.top_k,
+            request.max_tokens,
+            request.temperature
         )
         
-        # Format response
-        response = AskResponse(
-            answer=result['answer'],
-            sources=[Source(**s) for s in result['sources']],
-            query=result['query'],
-            num_sources=result['num_sources'],
-            timestamp=datetime.now().isoformat()
-        )
+        # Exact repeat, then paraphrase of an answered question
+        result = cache.get(cache_key)
+        query_embedding = None
+        if result is None:
+            batcher = app_state['query_batcher']
+            if batcher is not None:
+                query_embedding = await batcher.embed(request.query)
+            else:
+                query_embedding = await asyncio.to_thread(
+                    rag_pipeline.search_engine.embedder.embed_query,
+                    request.query
+                )
+            result = cache.get_similar(cache_key, query_embedding)
+        else:
+            logger.info("Answer cache hit")
         
-        return response
+        if result is None:
+            # Get answer from RAG pipeline, off the event loop
+            result = await asyncio.to_thread(_ask, rag_pipeline, request, query_embedding)
+            cache.put(cache_key, result, query_embedding)
+        
+        # Plain dict: FastAPI validates and serializes it once against
+        # AskResponse, instead of building the models here and re-walking them
+        return {
+            'answer': result['answer'],
+            'sources': result['sources'],
+            'query': result['query'],
+            'num_sources': result['num_sources'],
+            'timestamp': datetime.now().isoformat()
+        }
         
     except Exception as e:
         logger.error(f"Error processing question: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _ask(rag_pipeline: RAGPipeline, request: AskRequest, query_embedding: np.ndarray) -> Dict:
+    """
+    Answer a question, passing down the query embedding computed for the
+    answer cache when the pipeline's ask_question accepts one.
+    
+    Args:
+        rag_pipeline: RAG pipeline
+        request: Ask request
+        query_embedding: Embedding of request.query
+        
+    Returns:
+        Answer dictionary from the pipeline
+    """
+    kwargs = dict(
+        query=request.query,
+        top_k=request.top_k,
+        max_tokens=request.max_tokens,
+        temperature=request.temperature
+    )
+    
+    if 'query_embedding' in inspect.signature(rag_pipeline.ask_question).parameters:
+        kwargs['query_embedding'] = query_embedding
+    return rag_pipeline.ask_question(**kwargs)
+
+
+def _answer_frames(rag_pipeline: RAGPipeline, request: AskRequest) -> Iterator[Dict]:
+    """
+    Yield answer frames: one {'sources': [...]} frame, then {'token': str} frames.
+    
+    Uses the pipeline's token streamer when it has one; otherwise the
+    complete answer is sent as a single token frame.
+    
+    Args:
+        rag_pipeline: RAG pipeline
+        request: Ask request
+        
+    Yields:
+        Frame dictionaries
+    """
+    kwargs = dict(
+        query=request.query,
+        top_k=request.top_k,
+        max_tokens=request.max_tokens,
+        temperature=request.temperature
+    )
+    
+    if hasattr(rag_pipeline, 'ask_question_stream'):
+        yield from rag_pipeline.ask_question_stream(**kwargs)
+        return
+    
+    result = rag_pipeline.ask_question(**kwargs)
+    yield {'sources': result['sources']}
+    yield {'token': result['answer']}
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(request: AskRequest):
+    """
+    Ask a question and stream the answer as Server-Sent Events.
+    
+    The first event carries the sources, following events carry answer
+    tokens as they are generated, and the last event is `{"done": true}`.
+    
+    **Example event:**
+    ```
+    data: {"token": "ISO 9001 specifies"}
+    ```
+    """
+    await _refresh_rag_pipeline()
+    
+    if app_state['rag_pipeline'] is None:
+        raise HTTPException(
+            status_code=503,
+            detail="RAG pipeline not initialized. Please run /ingest first to create index."
+        )
+    
+    logger.info(f"Streaming answer for: {request.query}")
+    rag_pipeline = app_state['rag_pipeline']
+    
+    # Sync generator: Starlette iterates it in a worker thread, so blocking
+    # token streamers don't stall the event loop
+    def event_stream() -> Iterator[str]:
+        try:
+            for frame in _answer_frames(rag_pipeline, request):
+                yield f"data: {json.dumps(frame, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        yield f"data: {json.dumps({'done': True})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/ingest", response_model=IngestResponse)
 async def ingest_document(request: IngestRequest, background_tasks: BackgroundTasks):
     """
@@ -207,8 +546,9 @@ async def ingest_document(request: IngestRequest, background_tasks: BackgroundTa
         # Run ingestion pipeline
         output_dir = app_state['config'].get('output_dir', './data/chunks')
         
+        # Extraction/chunking off the event loop
         pipeline = IngestionPipeline()
-        result = pipeline.ingest_document(
+        result = await pipeline.ingest_document_async(
             str(pdf_path),
             document_name=request.document_name,
             output_dir=output_dir
@@ -219,26 +559,32 @@ async def ingest_document(request: IngestRequest, background_tasks: BackgroundTa
         
         logger.info(f"Ingestion complete: {len(chunks)} chunks created")
         
-        # Rebuild index if requested
+        # Rebuild the index from this document, or append to the existing one
         index_updated = False
-        if request.rebuild_index:
-            logger.info("Rebuilding FAISS index...")
-            
-            index_dir = app_state['config'].get('index_dir', './data/index')
+        if chunks:
+            index_dir = _index_dir()
             
             # Generate embeddings
-            embedder = Embedder()
+            embedder = _get_embedder()
             texts = [c['text'] for c in chunks]
-            embeddings = embedder.embed_texts(texts, show_progress=True)
+            embeddings = await _embed_all(embedder, texts)
             
-            # Build index
-            build_index_from_chunks(chunks, embeddings, index_dir)
+            # FAISS training/adding off the event loop; one writer at a time
+            async with _index_lock:
+                if request.rebuild_index:
+                    logger.info("Rebuilding FAISS index...")
+                    write_fn = build_index_from_chunks
+                else:
+                    logger.info("Appending to FAISS index...")
+                    write_fn = append_to_index
+                await asyncio.to_thread(_write_index, write_fn, chunks, embeddings, index_dir)
             
             index_updated = True
-            logger.info("Index rebuilt successfully")
+            logger.info("Index updated successfully")
             
-            # Reload RAG pipeline in background
-            background_tasks.add_task(reload_rag_pipeline, index_dir)
+            # Reload RAG pipeline in background (other workers reload on
+            # their next request)
+            background_tasks.add_task(_refresh_rag_pipeline)
         
         return IngestResponse(
             status="success",
@@ -263,39 +609,46 @@ async def get_info():
     
     # Get index size
     index_size = 0
-    index_dir = app_state['config'].get('index_dir', './data/index')
+    index_dir = _index_dir()
     
     if app_state['rag_pipeline'] is not None:
         index_size = app_state['rag_pipeline'].search_engine.index.ntotal
     
-    return InfoResponse(
-        status="healthy" if app_state['rag_pipeline'] is not None else "no_index",
-        version="1.0.0",
-        model=app_state['config'].get('model_name', 'llama-3.2-3b'),
-        index_size=index_size,
-        index_directory=index_dir,
-        uptime_seconds=uptime
-    )
+    return {
+        'status': "healthy" if app_state['rag_pipeline'] is not None else "no_index",
+        'version': "1.0.0",
+        'model': app_state['config'].get('model_name', 'llama-3.2-3b'),
+        'index_size': index_size,
+        'index_directory': index_dir,
+        'uptime_seconds': uptime
+    }
 
 
-@app.get("/health")
+@app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Simple health check endpoint."""
     return {"status": "ok", "timestamp": datetime.now().isoformat()}
 
 
 async def reload_rag_pipeline(index_dir: str):
-    """Reload RAG pipeline (background task)."""
+    """
+    Reload the RAG pipeline's index (background task).
+    
+    A loaded pipeline keeps its LLM and embedder and only gets a new
+    search engine; without one, the whole pipeline is loaded.
+    """
     try:
         logger.info("Reloading RAG pipeline...")
-        model_name = app_state['config'].get('model_name', 'llama-3.2-3b')
-        quantize = app_state['config'].get('quantize', True)
+        rag_pipeline = app_state['rag_pipeline']
+        if rag_pipeline is None:
+            app_state['rag_pipeline'] = await asyncio.to_thread(_load_rag_pipeline, index_dir)
+        else:
+            rag_pipeline.search_engine = await asyncio.to_thread(
+                _load_search_engine, index_dir, rag_pipeline.search_engine
+            )
         
-        app_state['rag_pipeline'] = initialize_rag_pipeline(
-            index_dir=index_dir,
-            model_name=model_name,
-            quantize=quantize
-        )
+        # Cached answers cite the old index
+        app_state['answer_cache'].clear()
         logger.info("✓ RAG pipeline reloaded")
     except Exception as e:
         logger.error(f"Failed to reload RAG pipeline: {e}")
@@ -320,6 +673,8 @@ def create_app(config: dict = None) -> FastAPI:
 if __name__ == "__main__":
     import uvicorn
     
+    configure_threads()
+    
     # Configuration
     config = {
         'index_dir': './ml_core/data/index',
@@ -328,12 +683,21 @@ if __name__ == "__main__":
         'quantize': True
     }
     
-    app_state['config'] = config
+    # Workers import the app by name, so config travels via the environment
+    os.environ['ML_CORE_API_CONFIG'] = json.dumps(config)
+    
+    # Each worker loads its own LLM; raise WORKERS only if RAM allows it.
+    # The FAISS index is memory-mapped, so workers share it, and each one
+    # reloads it on its next request after an /ingest changes it.
+    workers = int(os.environ.get('WORKERS', 1))
     
     # Run server
     uvicorn.run(
-        app,
+        "ml_core.api.api:app",
         host="0.0.0.0",
         port=8000,
+        workers=workers,
+        loop="uvloop" if find_spec("uvloop") else "auto",
+        http="httptools" if find_spec("httptools") else "auto",
         log_level="info"
     )
@@ -6,9 +6,11 @@ Creates and manages FAISS indices for efficient vector search.
 
 import logging
 import json
+import os
 import pickle
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from collections.abc import Sequence
+from typing import List, Dict, Optional, Tuple, Union
 import numpy as np
 
 try:
@@ -16,43 +18,261 @@ try:
 except ImportError:
     raise ImportError("FAISS required. Install: pip install faiss-cpu")
 
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Per-chunk fields stored alongside the index
+METADATA_FIELDS = [
+    'chunk_id', 'text', 'section_id', 'section_name',
+    'page_start', 'page_end', 'document', 'token_count'
+]
+
+
+class ArrowMetadata(Sequence):
+    """
+    Read-only list of metadata rows backed by an Arrow table.
+    
+    Rows are materialized as dicts only when accessed, so chunk text stays
+    in the table's buffers instead of being copied into one Python string
+    per chunk at load time.
+    """
+    
+    def __init__(self, table: "pa.Table"):
+        """
+        Args:
+            table: Arrow table, row i = FAISS id i
+        """
+        self.table = table
+    
+    @staticmethod
+    def schema() -> "pa.Schema":
+        """Arrow schema of the METADATA_FIELDS columns."""
+        return pa.schema([
+            ('chunk_id', pa.string()),
+            ('text', pa.large_string()),
+            ('section_id', pa.string()),
+            ('section_name', pa.string()),
+            ('page_start', pa.int64()),
+            ('page_end', pa.int64()),
+            ('document', pa.string()),
+            ('token_count', pa.int64())
+        ])
+    
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict]) -> "ArrowMetadata":
+        """
+        Build the table straight from chunk dicts, keeping only METADATA_FIELDS.
+        
+        Args:
+            chunks: List of chunk dictionaries
+            
+        Returns:
+            ArrowMetadata instance
+        """
+        return cls(pa.Table.from_pylist(chunks, schema=cls.schema()))
+    
+    @classmethod
+    def from_columns(cls, columns: Dict[str, list]) -> "ArrowMetadata":
+        """
+        Build the table from parallel per-field lists (e.g. chunk_document_columns).
+        
+        Args:
+            columns: Field name -> list of values; extra fields are ignored
+            
+        Returns:
+            ArrowMetadata instance
+        """
+        return cls(pa.Table.from_pydict(columns, schema=cls.schema()))
+    
+    def __len__(self) -> int:
+        return self.table.num_rows
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"metadata index out of range: {i}")
+        
+        return self.table.slice(i, 1).to_pylist()[0]
+    
+    def __iter__(self):
+        for batch in self.table.to_batches():
+            yield from batch.to_pylist()
+    
+    def column(self, name: str) -> list:
+        """
+        Return one field for all rows, without materializing the others.
+        
+        Args:
+            name: Field name
+            
+        Returns:
+            List of values
+        """
+        return self.table.column(name).to_pylist()
+    
+    def take(self, indices: List[int], fields: List[str]) -> List[Tuple]:
+        """
+        Gather several rows in one call, as tuples of the requested fields.
+        
+        Args:
+            indices: Row indexes
+            fields: Field names, in tuple order
+            
+        Returns:
+            List of tuples, one per index
+        """
+        rows = self.table.select(fields).take(indices)
+        return list(zip(*(rows.column(f).to_pylist() for f in fields)))
+    
+    def extend(self, rows: Union[List[Dict], "ArrowMetadata"]) -> "ArrowMetadata":
+        """
+        Return a new ArrowMetadata with rows appended.
+        
+        Args:
+            rows: Row dicts or another ArrowMetadata
+            
+        Returns:
+            ArrowMetadata instance
+        """
+        if isinstance(rows, ArrowMetadata):
+            other = rows.table.cast(self.table.schema)
+        else:
+            other = pa.Table.from_pylist(rows, schema=self.table.schema)
+        return ArrowMetadata(pa.concat_tables([self.table, other]))
+
+
 class FAISSIndexBuilder:
     """
     FAISS index builder and manager.
     
     Supports:
     - IndexFlatL2: Exact search (good for small datasets)
+    - IndexScalarQuantizer: Exact cosine scan over int8/fp16 codes
     - IndexHNSWFlat: Approximate search (faster for large datasets)
+    - IVF-PQ / OPQ+IVF-PQ: Compressed inverted lists (large datasets, low RAM)
+    - IndexHNSWPQ: Graph search over PQ-compressed vectors
+    
+    Cosine indexes are wrapped in an IndexPreTransform that L2-normalizes
+    vectors, so un-normalized embeddings can be added and searched.
     """
     
-    def __init__(self, index_type: str = "flat", metric: str = "l2"):
+    INDEX_TYPES = ["auto", "flat", "hnsw", "ivfpq", "hnswpq", "opq_ivfpq"]
+    
+    # PQ/IVF training needs enough points; below this we keep an exact flat index
+    COMPRESSED_MIN_DOCS = 10_000
+    
+    # "auto" switches from HNSW to IVF-PQ at this many vectors
+    AUTO_IVFPQ_MIN_DOCS = 1_000_000
+    
+    # IO_FLAG_MMAP_IFC (faiss >= 1.10) maps flat/SQ code arrays, which is
+    # where most of the bytes are; the older IO_FLAG_MMAP only covers IVF
+    # lists. The two flags can't be combined.
+    MMAP_FLAGS = (
+        getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        | faiss.IO_FLAG_READ_ONLY
+    )
+    
+    SQ_TYPES = {
+        "8bit": faiss.ScalarQuantizer.QT_8bit,
+        "fp16": faiss.ScalarQuantizer.QT_fp16
+    }
+    
+    def __init__(
+        self,
+        index_type: str = "flat",
+        metric: str = "l2",
+        nlist: int = 1024,
+        m_pq: int = 16,
+        nbits: int = 8,
+        sq_type: Optional[str] = "8bit"
+    ):
         """
         Initialize index builder.
         
         Args:
-            index_type: Type of index ("flat" or "hnsw")
+            index_type: Type of index ("auto", "flat", "hnsw", "ivfpq", "hnswpq"
+                or "opq_ivfpq"); "auto" picks one from the corpus size
             metric: Distance metric ("l2" or "cosine")
+            nlist: Number of IVF cells (ivfpq/opq_ivfpq only)
+            m_pq: Number of PQ sub-quantizers (must divide the embedding dim)
+            nbits: Bits per PQ code
+            sq_type: Scalar quantizer for flat cosine indexes ("8bit", "fp16",
+                or None for uncompressed float32)
         """
         self.index_type = index_type.lower()
         self.metric = metric.lower()
+        self.nlist = nlist
+        self.m_pq = m_pq
+        self.nbits = nbits
+        self.sq_type = sq_type.lower() if sq_type else None
         
-        if self.index_type not in ["flat", "hnsw"]:
-            raise ValueError(f"Invalid index type: {index_type}. Use 'flat' or 'hnsw'")
+        if self.index_type not in self.INDEX_TYPES:
+            raise ValueError(
+                f"Invalid index type: {index_type}. Use one of {self.INDEX_TYPES}"
+            )
         
         if self.metric not in ["l2", "cosine"]:
             raise ValueError(f"Invalid metric: {metric}. Use 'l2' or 'cosine'")
+        
+        if self.sq_type is not None and self.sq_type not in self.SQ_TYPES:
+            raise ValueError(
+                f"Invalid scalar quantizer: {sq_type}. Use one of {list(self.SQ_TYPES)} or None"
+            )
+    
+    @property
+    def faiss_metric(self) -> int:
+        """FAISS metric constant for the configured metric."""
+        if self.metric == "cosine":
+            return faiss.METRIC_INNER_PRODUCT  # Inner product for normalized vectors
+        return faiss.METRIC_L2
+    
+    def resolve_index_type(self, n_docs: int, dim: int) -> Tuple[str, int, int]:
+        """
+        Pick the index type and IVF/PQ sizes for a corpus.
+        
+        For "auto": flat below COMPRESSED_MIN_DOCS, HNSW below
+        AUTO_IVFPQ_MIN_DOCS, otherwise IVF-PQ with sqrt(N) cells and
+        8-dimensional sub-quantizers (48 bytes per 384-dim vector).
+        
+        Args:
+            n_docs: Number of vectors
+            dim: Embedding dimension
+            
+        Returns:
+            Tuple of (index type, nlist, m_pq)
+        """
+        if self.index_type != "auto":
+            return self.index_type, self.nlist, self.m_pq
+        
+        if n_docs < self.COMPRESSED_MIN_DOCS:
+            return "flat", self.nlist, self.m_pq
+        if n_docs < self.AUTO_IVFPQ_MIN_DOCS:
+            return "hnsw", self.nlist, self.m_pq
+        
+        nlist = int(np.sqrt(n_docs))
+        m_pq = dim // 8 if dim % 8 == 0 else self.m_pq
+        return "ivfpq", nlist, m_pq
     
     def build_index(
         self,
         embeddings: np.ndarray,
-        metadata: List[Dict],
+        metadata: Union[List[Dict], ArrowMetadata],
         hnsw_m: int = 32,
         hnsw_ef_construction: int = 200
-    ) -> Tuple[faiss.Index, Dict]:
+    ) -> Tuple[faiss.Index, Union[List[Dict], ArrowMetadata]]:
         """
         Build FAISS index from embeddings.
         
@@ -63,27 +283,44 @@ class FAISSIndexBuilder:
             hnsw_ef_construction: Construction parameter for HNSW
             
         Returns:
-            Tuple of (FAISS index, metadata mapping dict)
+            Tuple of (FAISS index, metadata list indexed by FAISS id)
         """
         if len(embeddings) != len(metadata):
             raise ValueError("Number of embeddings must match metadata count")
         
         n_docs, dim = embeddings.shape
         
-        logger.info(f"Building {self.index_type.upper()} index...")
+        index_type, nlist, m_pq = self.resolve_index_type(n_docs, dim)
+        
+        logger.info(f"Building {index_type.upper()} index...")
         logger.info(f"  Documents: {n_docs}")
         logger.info(f"  Embedding dim: {dim}")
         logger.info(f"  Metric: {self.metric}")
         
+        if index_type in ("ivfpq", "hnswpq", "opq_ivfpq") and n_docs < self.COMPRESSED_MIN_DOCS:
+            logger.warning(
+                f"Only {n_docs} vectors (< {self.COMPRESSED_MIN_DOCS}), "
+                f"too few to train {index_type.upper()}. Using exact FLAT index instead."
+            )
+            index_type = "flat"
+        
         # Create index based on type
-        if self.index_type == "flat":
+        if index_type == "flat":
             # Exact search
             if self.metric == "l2":
                 index = faiss.IndexFlatL2(dim)
+            elif self.sq_type:
+                # Normalized vectors keep recall with 1-2 bytes per dimension
+                index = faiss.IndexScalarQuantizer(
+                    dim,
+                    self.SQ_TYPES[self.sq_type],
+                    faiss.METRIC_INNER_PRODUCT
+                )
+                logger.info(f"  Scalar quantizer: {self.sq_type}")
             else:  # cosine
                 index = faiss.IndexFlatIP(dim)  # Inner product for normalized vectors
         
-        elif self.index_type == "hnsw":
+        elif index_type == "hnsw":
             # HNSW approximate search
             if self.metric == "l2":
                 index = faiss.IndexHNSWFlat(dim, hnsw_m)
@@ -94,24 +331,57 @@ class FAISSIndexBuilder:
             logger.info(f"  HNSW M: {hnsw_m}")
             logger.info(f"  HNSW efConstruction: {hnsw_ef_construction}")
         
-        # Add embeddings to index
+        elif index_type == "hnswpq":
+            # HNSW graph over PQ codes
+            index = faiss.IndexHNSWPQ(dim, m_pq, hnsw_m, self.nbits, self.faiss_metric)
+            index.hnsw.efConstruction = hnsw_ef_construction
+            logger.info(f"  HNSW M: {hnsw_m}, PQ: {m_pq}x{self.nbits}")
+        
+        else:  # ivfpq / opq_ivfpq
+            factory = f"IVF{nlist},PQ{m_pq}x{self.nbits}"
+            if index_type == "opq_ivfpq":
+                factory = f"OPQ{m_pq},{factory}"
+            index = faiss.index_factory(dim, factory, self.faiss_metric)
+            logger.info(f"  Factory: {factory}")
+        
+        # Cosine indexes L2-normalize vectors themselves on add and search,
+        # so callers can pass raw embeddings
+        if self.metric == "cosine":
+            norm = faiss.NormalizationTransform(dim, 2.0)
+            if isinstance(index, faiss.IndexPreTransform):
+                index.prepend_transform(norm)
+            else:
+                index = faiss.IndexPreTransform(norm, index)
+        
         embeddings = embeddings.astype('float32')
+        
+        # Compressed indexes must be trained before vectors can be added
+        if not index.is_trained:
+            logger.info("  Training index...")
+            index.train(embeddings)
+        
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = max(1, nlist // 32)
+            logger.info(f"  IVF nprobe: {ivf.nprobe}")
+            # Map id -> inverted list entry, so vectors can be reconstructed
+            # by id (e.g. SemanticSearch.get_similar_chunks)
+            ivf.make_direct_map()
+        
+        # Add embeddings to index
         index.add(embeddings)
         
         logger.info(f"Index built successfully with {index.ntotal} vectors")
         
-        # Create ID to metadata mapping
-        id_to_metadata = {
-            i: metadata[i]
-            for i in range(len(metadata))
-        }
-        
-        return index, id_to_metadata
+        # FAISS ids are dense [0, n), so metadata[i] belongs to vector i
+        if isinstance(metadata, ArrowMetadata):
+            return index, metadata
+        return index, list(metadata)
     
     def save_index(
         self,
         index: faiss.Index,
-        metadata: Dict,
+        metadata: Union[List[Dict], ArrowMetadata],
         output_dir: str,
         index_name: str = "faiss_index"
     ):
@@ -120,50 +390,88 @@ class FAISSIndexBuilder:
         
         Args:
             index: FAISS index
-            metadata: Metadata dictionary
+            metadata: Metadata rows (position = FAISS id)
             output_dir: Output directory
             index_name: Base name for files
         """
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
-        # Save FAISS index
+        # Save FAISS index. Write then rename: workers may have the old file
+        # memory-mapped, and truncating it in place would crash them
         index_file = output_path / f"{index_name}.bin"
-        faiss.write_index(index, str(index_file))
+        tmp_file = output_path / f"{index_name}.bin.tmp"
+        faiss.write_index(index, str(tmp_file))
+        os.replace(tmp_file, index_file)
         logger.info(f"Saved FAISS index to: {index_file}")
         
-        # Save metadata as JSON
-        metadata_file = output_path / f"{index_name}_metadata.json"
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        # Save metadata: columnar Arrow file (row i = FAISS id i) when
+        # pyarrow is installed, JSON otherwise. Also written then renamed,
+        # so a reader never sees metadata for only part of the index
+        if PYARROW_AVAILABLE:
+            metadata_file = output_path / f"{index_name}_metadata.feather"
+            tmp_file = output_path / f"{index_name}_metadata.feather.tmp"
+            if isinstance(metadata, ArrowMetadata):
+                table = metadata.table
+            else:
+                table = pa.Table.from_pylist(list(metadata))
+            feather.write_feather(
+                table,
+                str(tmp_file),
+                compression='zstd'
+            )
+            os.replace(tmp_file, metadata_file)
+            # Don't leave a stale JSON copy that could shadow this one
+            (output_path / f"{index_name}_metadata.json").unlink(missing_ok=True)
+        else:
+            metadata_file = output_path / f"{index_name}_metadata.json"
+            tmp_file = output_path / f"{index_name}_metadata.json.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(list(metadata), f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, metadata_file)
         logger.info(f"Saved metadata to: {metadata_file}")
         
         # Save index config
+        ivf = faiss.try_extract_index_ivf(index)
+        base = index
+        if isinstance(index, faiss.IndexPreTransform):
+            base = faiss.downcast_index(index.index)
         config = {
             'index_type': self.index_type,
             'metric': self.metric,
             'n_vectors': index.ntotal,
-            'dimension': index.d
+            'dimension': index.d,
+            'nprobe': ivf.nprobe if ivf is not None else None,
+            'sq_type': self.sq_type if isinstance(base, faiss.IndexScalarQuantizer) else None
         }
         config_file = output_path / f"{index_name}_config.json"
-        with open(config_file, 'w', encoding='utf-8') as f:
+        tmp_file = output_path / f"{index_name}_config.json.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(config, f, indent=2)
+        os.replace(tmp_file, config_file)
         logger.info(f"Saved config to: {config_file}")
     
     def load_index(
         self,
         index_dir: str,
-        index_name: str = "faiss_index"
-    ) -> Tuple[faiss.Index, Dict]:
+        index_name: str = "faiss_index",
+        preload: bool = False
+    ) -> Tuple[faiss.Index, Union[List[Dict], ArrowMetadata]]:
         """
         Load FAISS index and metadata from disk.
         
+        By default the index is memory-mapped read-only, so processes
+        loading the same file share one copy in the OS page cache.
+        
         Args:
             index_dir: Directory containing index files
             index_name: Base name of index files
+            preload: Read the whole index into memory instead of mapping
+                it (required to add vectors to the loaded index)
             
         Returns:
-            Tuple of (FAISS index, metadata dict)
+            Tuple of (FAISS index, metadata rows). Arrow metadata is kept
+            as an ArrowMetadata view rather than converted to dicts.
         """
         index_dir = Path(index_dir)
         
@@ -172,34 +480,69 @@ class FAISSIndexBuilder:
         if not index_file.exists():
             raise FileNotFoundError(f"Index file not found: {index_file}")
         
-        index = faiss.read_index(str(index_file))
+        index = None
+        if not preload:
+            try:
+                index = faiss.read_index(str(index_file), self.MMAP_FLAGS)
+            except RuntimeError as e:
+                logger.warning(f"Memory-mapping not supported for this index, reading it fully: {e}")
+        if index is None:
+            index = faiss.read_index(str(index_file))
         logger.info(f"Loaded FAISS index from: {index_file}")
         logger.info(f"  Vectors: {index.ntotal}")
         logger.info(f"  Dimension: {index.d}")
         
-        # Load metadata
-        metadata_file = index_dir / f"{index_name}_metadata.json"
-        if not metadata_file.exists():
-            raise FileNotFoundError(f"Metadata file not found: {metadata_file}")
+        # Restore search-time parameters (not stored in the FAISS binary)
+        config_file = index_dir / f"{index_name}_config.json"
+        if config_file.exists():
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            
+            ivf = faiss.try_extract_index_ivf(index)
+            if ivf is not None and config.get('nprobe'):
+                ivf.nprobe = config['nprobe']
+                logger.info(f"  IVF nprobe: {ivf.nprobe}")
         
-        with open(metadata_file, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
+        # Load metadata (Arrow if present, else legacy JSON)
+        feather_file = index_dir / f"{index_name}_metadata.feather"
+        metadata_file = index_dir / f"{index_name}_metadata.json"
         
-        # Convert string keys back to integers
-        metadata = {int(k): v for k, v in metadata.items()}
+        if feather_file.exists():
+            if not PYARROW_AVAILABLE:
+                raise ImportError(
+                    f"pyarrow required to read {feather_file}. Install: pip install pyarrow"
+                )
+            metadata = ArrowMetadata(feather.read_table(str(feather_file)))
+        elif metadata_file.exists():
+            with open(metadata_file, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            
+            # Indexes saved before metadata became a list store {"0": ...}
+            if isinstance(metadata, dict):
+                metadata = [metadata[str(i)] for i in range(len(metadata))]
+        else:
+            raise FileNotFoundError(f"Metadata file not found: {metadata_file}")
         
         logger.info(f"Loaded metadata for {len(metadata)} vectors")
         
         return index, metadata
 
 
+def _chunks_to_metadata(chunks: List[Dict]) -> Union[List[Dict], ArrowMetadata]:
+    """Select the per-chunk fields stored alongside the index."""
+    if PYARROW_AVAILABLE:
+        # Columns are filled straight from the chunks, no per-chunk dicts
+        return ArrowMetadata.from_chunks(chunks)
+    return [{field: chunk[field] for field in METADATA_FIELDS} for chunk in chunks]
+
+
 def build_index_from_chunks(
     chunks: List[Dict],
     embeddings: np.ndarray,
     output_dir: str,
-    index_type: str = "flat",
+    index_type: str = "auto",
     index_name: str = "faiss_index"
-) -> Tuple[faiss.Index, Dict]:
+) -> Tuple[faiss.Index, Union[List[Dict], ArrowMetadata]]:
     """
     Convenience function to build index from chunks.
     
@@ -207,34 +550,130 @@ def build_index_from_chunks(
         chunks: List of chunk dictionaries
         embeddings: Embeddings array
         output_dir: Output directory
-        index_type: Type of FAISS index
+        index_type: Type of FAISS index ("auto" sizes it to the corpus)
         index_name: Name for index files
         
     Returns:
         Tuple of (index, metadata)
     """
     # Prepare metadata from chunks
-    metadata = []
-    for chunk in chunks:
-        metadata.append({
-            'chunk_id': chunk['chunk_id'],
-            'text': chunk['text'],
-            'section_id': chunk['section_id'],
-            'section_name': chunk['section_name'],
-            'page_start': chunk['page_start'],
-            'page_end': chunk['page_end'],
-            'document': chunk['document'],
-            'token_count': chunk['token_count']
-        })
+    metadata = _chunks_to_metadata(chunks)
     
     # Build index
     builder = FAISSIndexBuilder(index_type=index_type)
-    index, id_to_metadata = builder.build_index(embeddings, metadata)
+    index, metadata = builder.build_index(embeddings, metadata)
     
     # Save index
-    builder.save_index(index, id_to_metadata, output_dir, index_name)
+    builder.save_index(index, metadata, output_dir, index_name)
+    
+    return index, metadata
+
+
+def append_to_index(
+    chunks: List[Dict],
+    embeddings: np.ndarray,
+    index_dir: str,
+    index_name: str = "faiss_index"
+) -> Tuple[faiss.Index, Union[List[Dict], ArrowMetadata]]:
+    """
+    Add chunks to an existing index without rebuilding it.
+    
+    Trained indexes (IVF-PQ, OPQ) keep their coarse quantizer and codebooks,
+    so new vectors are only encoded and appended. Builds a new index if
+    none exists yet.
+    
+    Chunks of a document that is already indexed, and chunks whose
+    chunk_id is already indexed, are skipped: re-ingesting a document
+    needs a rebuild to replace its old chunks.
+    
+    The index and metadata files are rewritten whole on each append.
+    Measured at 100k chunks (177 MB of metadata): read 0.2s + write 0.6s
+    for the metadata, 0.1s for a flat index, well under the time to
+    embed one document, so the metadata is kept in one file.
+    
+    Args:
+        chunks: List of chunk dictionaries
+        embeddings: Embeddings array for the new chunks
+        index_dir: Directory containing the index
+        index_name: Base name of index files
+        
+    Returns:
+        Tuple of (index, metadata) covering old and new chunks
+    """
+    index_dir = Path(index_dir)
+    if not (index_dir / f"{index_name}.bin").exists():
+        logger.info("No existing index, building a new one")
+        return build_index_from_chunks(chunks, embeddings, str(index_dir), index_name=index_name)
+    
+    # Rebuild the builder with the settings the index was created with
+    config = {}
+    config_file = index_dir / f"{index_name}_config.json"
+    if config_file.exists():
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    
+    builder = FAISSIndexBuilder(
+        index_type=config.get('index_type', 'flat'),
+        metric=config.get('metric', 'l2'),
+        sq_type=config.get('sq_type') or "8bit"
+    )
+    
+    # Appending needs a writable, fully loaded index (not a read-only mapping)
+    index, metadata = builder.load_index(str(index_dir), index_name, preload=True)
+    
+    # IVF indexes saved without a direct map get one, as in build_index
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.no():
+        ivf.make_direct_map()
+    
+    embeddings = np.asarray(embeddings, dtype='float32')
+    if embeddings.shape[1] != index.d:
+        raise ValueError(
+            f"Embedding dimension {embeddings.shape[1]} does not match index dimension {index.d}"
+        )
+    if len(embeddings) != len(chunks):
+        raise ValueError("Number of embeddings must match chunk count")
+    
+    # Skip what is already indexed (also catches duplicates within chunks)
+    if isinstance(metadata, ArrowMetadata):
+        indexed_ids = set(metadata.column('chunk_id'))
+        indexed_documents = set(metadata.column('document'))
+    else:
+        indexed_ids = {row['chunk_id'] for row in metadata}
+        indexed_documents = {row['document'] for row in metadata}
+    
+    keep = []
+    skipped_documents = set()
+    for i, chunk in enumerate(chunks):
+        if chunk['document'] in indexed_documents:
+            skipped_documents.add(chunk['document'])
+        elif chunk['chunk_id'] not in indexed_ids:
+            indexed_ids.add(chunk['chunk_id'])
+            keep.append(i)
+    
+    if skipped_documents:
+        logger.warning(
+            f"Already indexed, not appended (rebuild the index to replace them): "
+            f"{sorted(skipped_documents)}"
+        )
+    if len(keep) < len(chunks):
+        logger.info(f"Skipping {len(chunks) - len(keep)} chunks already in the index")
+        if not keep:
+            return index, metadata
+        chunks = [chunks[i] for i in keep]
+        embeddings = embeddings[keep]
+    
+    index.add(embeddings)
+    new_metadata = _chunks_to_metadata(chunks)
+    if isinstance(metadata, ArrowMetadata):
+        metadata = metadata.extend(new_metadata)
+    else:
+        metadata = list(metadata) + list(new_metadata)
+    logger.info(f"Appended {len(chunks)} vectors (total: {index.ntotal})")
+    
+    builder.save_index(index, metadata, str(index_dir), index_name)
     
-    return index, id_to_metadata
+    return index, metadata
 
 
 if __name__ == "__main__":
@@ -5,9 +5,11 @@ Generates semantic embeddings using BAAI/bge-small-en-v1.5.
 Optimized for CPU execution with batch processing.
 """
 
+import asyncio
 import logging
+import threading
 import numpy as np
-from typing import List, Union, Optional
+from typing import Any, Dict, List, Union, Optional, Tuple
 import torch
 
 try:
@@ -15,6 +17,13 @@ try:
 except ImportError:
     raise ImportError("sentence-transformers required. Install: pip install sentence-transformers")
 
+try:
+    from optimum.intel import OVModelForFeatureExtraction, OVWeightQuantizationConfig
+    from transformers import AutoTokenizer
+    OPENVINO_AVAILABLE = True
+except ImportError:
+    OPENVINO_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -31,12 +40,23 @@ class Embedder:
     """
     
     DEFAULT_MODEL = "BAAI/bge-small-en-v1.5"
+    BACKENDS = ["torch", "openvino"]
+    MAX_LENGTH = 512
+    
+    # Loaded models shared by all instances: (model_name, device, backend) -> (model, tokenizer)
+    _model_cache: Dict[Tuple[str, str, str], Tuple[Any, Any]] = {}
+    _model_cache_lock = threading.Lock()
     
     def __init__(
         self,
         model_name: str = DEFAULT_MODEL,
         device: Optional[str] = None,
-        batch_size: int = 32
+        batch_size: int = 32,
+        query_instruction: Optional[str] = None,
+        backend: str = "torch",
+        pooling: str = "cls",
+        use_bf16: Optional[bool] = None,
+        use_fp16: Optional[bool] = None
     ):
         """
         Initialize embedder.
@@ -45,9 +65,28 @@ class Embedder:
             model_name: HuggingFace model name
             device: Device to use ('cpu', 'cuda', None=auto)
             batch_size: Batch size for processing
+            query_instruction: Optional prefix for queries (e.g. BGE's
+                "Represent this sentence for searching relevant passages: ")
+            backend: 'torch' (sentence-transformers) or 'openvino'
+                (INT8 weight-quantized OpenVINO export, CPU only)
+            pooling: Pooling for the openvino backend ('cls' or 'mean').
+                BGE is trained with CLS pooling, so 'cls' matches the
+                vectors produced by the torch backend.
+            use_bf16: Run the torch backend under bfloat16 autocast
+                (None = auto, enabled on CPUs with AVX-512 BF16)
+            use_fp16: Run the torch backend under float16 autocast
+                (None = auto, enabled on CUDA devices)
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}. Choose from {self.BACKENDS}")
+        if pooling not in ("cls", "mean"):
+            raise ValueError(f"Unknown pooling: {pooling}. Choose 'cls' or 'mean'")
+        
         self.model_name = model_name
+        self.backend = backend
+        self.pooling = pooling
         self.batch_size = batch_size
+        self.query_instruction = query_instruction
         
         # Determine device (CPU only for Intel GPU compatibility)
         if device is None:
@@ -59,18 +98,163 @@ class Embedder:
         
         logger.info(f"Loading embedding model: {model_name}")
         
-        # Load model
-        self.model = SentenceTransformer(
-            model_name,
-            device=self.device
-        )
+        if use_bf16 is None:
+            bf16_supported = getattr(torch.cpu, "_is_avx512_bf16_supported", lambda: False)
+            use_bf16 = self.device == 'cpu' and bf16_supported()
+        self.use_bf16 = use_bf16 and backend == "torch"
+        
+        # Autocast keeps the shared model weights in float32; CPUs have no
+        # fast fp16 matmuls, so half precision is only used on CUDA
+        if use_fp16 is None:
+            use_fp16 = self.device.startswith('cuda')
+        self.use_fp16 = use_fp16 and backend == "torch" and not self.use_bf16
+        
+        if backend == "openvino":
+            self.device = 'cpu'
+        
+        self.model, self.tokenizer = self._load_model(model_name, self.device, backend)
         
         # Get embedding dimension
-        self.embedding_dim = self.model.get_sentence_embedding_dimension()
+        if backend == "openvino":
+            self.embedding_dim = self.model.config.hidden_size
+        else:
+            self.embedding_dim = self.model.get_sentence_embedding_dimension()
         
         logger.info(f"Model loaded successfully")
         logger.info(f"  Embedding dimension: {self.embedding_dim}")
         logger.info(f"  Device: {self.device}")
+        logger.info(f"  Backend: {self.backend}")
+        logger.info(f"  bfloat16 autocast: {self.use_bf16}")
+        logger.info(f"  float16 autocast: {self.use_fp16}")
+    
+    @classmethod
+    def _load_model(cls, model_name: str, device: str, backend: str) -> Tuple[Any, Any]:
+        """
+        Load a model once per process and reuse it for later instances.
+        
+        Args:
+            model_name: HuggingFace model name
+            device: Device to load on
+            backend: 'torch' or 'openvino'
+            
+        Returns:
+            Tuple of (model, tokenizer); tokenizer is None for the torch backend
+        """
+        key = (model_name, device, backend)
+        with cls._model_cache_lock:
+            if key in cls._model_cache:
+                logger.info("Reusing already loaded model")
+                return cls._model_cache[key]
+            
+            if backend == "openvino":
+                if not OPENVINO_AVAILABLE:
+                    raise ImportError(
+                        "optimum-intel required for the openvino backend. "
+                        "Install: pip install optimum[openvino]"
+                    )
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                model = OVModelForFeatureExtraction.from_pretrained(
+                    model_name,
+                    export=True,
+                    quantization_config=OVWeightQuantizationConfig(bits=8)
+                )
+            else:
+                # Load model
+                tokenizer = None
+                model = SentenceTransformer(
+                    model_name,
+                    device=device
+                )
+            
+            cls._model_cache[key] = (model, tokenizer)
+            return model, tokenizer
+    
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        """
+        Run one batch through the model, without normalization.
+        
+        Args:
+            texts: Text strings (one batch)
+            
+        Returns:
+            numpy array of shape (len(texts), embedding_dim)
+        """
+        if self.backend == "torch":
+            # No autograd bookkeeping; bf16 matmuls where the CPU has native
+            # support, fp16 on GPU tensor cores
+            with torch.inference_mode(), torch.autocast(
+                device_type=torch.device(self.device).type,
+                dtype=torch.float16 if self.use_fp16 else torch.bfloat16,
+                enabled=self.use_bf16 or self.use_fp16
+            ):
+                embeddings = self.model.encode(
+                    texts,
+                    batch_size=len(texts),
+                    show_progress_bar=False,
+                    convert_to_tensor=True,
+                    normalize_embeddings=False
+                )
+            
+            # Always hand back float32
+            return embeddings.float().cpu().numpy()
+        
+        inputs = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.MAX_LENGTH,
+            return_tensors="np"
+        )
+        hidden = np.asarray(self.model(**inputs).last_hidden_state, dtype=np.float32)
+        
+        if self.pooling == "cls":
+            return hidden[:, 0]
+        
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    
+    def _encode(
+        self,
+        texts: List[str],
+        batch_size: int,
+        normalize: bool = True,
+        show_progress: bool = False
+    ) -> np.ndarray:
+        """
+        Embed texts in length-sorted batches into a single preallocated array.
+        
+        Args:
+            texts: Text strings
+            batch_size: Batch size
+            normalize: L2 normalize embeddings
+            show_progress: Show progress bar
+            
+        Returns:
+            numpy array of shape (n_texts, embedding_dim)
+        """
+        n = len(texts)
+        out = np.empty((n, self.embedding_dim), dtype=np.float32)
+        
+        # Batches are padded to their longest text, so group similar lengths
+        # together and scatter each batch back to its original rows
+        order = np.argsort([len(t) for t in texts], kind='stable')
+        
+        starts = range(0, n, batch_size)
+        if show_progress:
+            from tqdm.auto import tqdm
+            starts = tqdm(starts, desc="Batches", unit="batch")
+        
+        for start in starts:
+            rows = order[start:start + batch_size]
+            out[rows] = self._forward([texts[i] for i in rows])
+        
+        # Normalize the whole buffer once, in place
+        if normalize:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            np.maximum(norms, 1e-12, out=norms)
+            out /= norms
+        
+        return out
     
     def embed_texts(
         self,
@@ -98,15 +282,29 @@ class Embedder:
         
         logger.info(f"Generating embeddings for {len(texts)} texts...")
         
+        # Repeated texts (headers, boilerplate, shared clauses) are embedded
+        # once and copied back to every position they occur at
+        unique_ids = {}
+        inverse = np.fromiter(
+            (unique_ids.setdefault(t, len(unique_ids)) for t in texts),
+            dtype=np.intp,
+            count=len(texts)
+        )
+        unique_texts = list(unique_ids)
+        
         # Generate embeddings
-        embeddings = self.model.encode(
-            texts,
-            batch_size=batch_size,
-            show_progress_bar=show_progress,
-            convert_to_numpy=True,
-            normalize_embeddings=normalize
+        embeddings = self._encode(
+            unique_texts,
+            batch_size,
+            normalize=normalize,
+            show_progress=show_progress
         )
         
+        if len(unique_texts) < len(texts):
+            logger.info(f"  Embedded {len(unique_texts)} unique texts "
+                        f"({len(texts) - len(unique_texts)} duplicates reused)")
+            embeddings = embeddings[inverse]
+        
         logger.info(f"Generated embeddings shape: {embeddings.shape}")
         
         return embeddings
@@ -129,13 +327,27 @@ class Embedder:
         Returns:
             numpy array of shape (embedding_dim,)
         """
-        embedding = self.model.encode(
-            [query],
-            convert_to_numpy=True,
-            normalize_embeddings=normalize
-        )[0]
+        return self.embed_queries([query], normalize=normalize)[0]
+    
+    def embed_queries(
+        self,
+        queries: List[str],
+        normalize: bool = True
+    ) -> np.ndarray:
+        """
+        Generate embeddings for several queries in one forward pass.
+        
+        Args:
+            queries: Query strings
+            normalize: L2 normalize embeddings
+            
+        Returns:
+            numpy array of shape (n_queries, embedding_dim)
+        """
+        if self.query_instruction:
+            queries = [self.query_instruction + q for q in queries]
         
-        return embedding
+        return self._encode(queries, self.batch_size, normalize=normalize)
     
     def compute_similarity(
         self,
@@ -174,11 +386,130 @@ class Embedder:
         # Matrix multiplication for batch similarity
         similarities = np.dot(corpus_embeddings, query_embedding)
         return similarities
+    
+    def compute_similarities_batch(
+        self,
+        query_embeddings: np.ndarray,
+        corpus_embeddings: np.ndarray
+    ) -> np.ndarray:
+        """
+        Compute similarities between several queries and a corpus.
+        
+        One matrix-matrix product instead of a matrix-vector product per
+        query.
+        
+        Args:
+            query_embeddings: Query embeddings (n_queries, embedding_dim)
+            corpus_embeddings: Corpus embeddings (n_docs, embedding_dim)
+            
+        Returns:
+            Similarity scores (n_queries, n_docs)
+        """
+        queries = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        corpus = np.ascontiguousarray(corpus_embeddings, dtype=np.float32)
+        return np.matmul(queries, corpus.T)
+
+
+class QueryBatcher:
+    """
+    Coalesces concurrent query embeddings into batched forward passes.
+    
+    Queries submitted within `max_wait` seconds of each other (up to
+    `max_batch` of them) are embedded with a single `embed_queries` call
+    in a worker thread, so concurrent requests share one encode.
+    """
+    
+    def __init__(
+        self,
+        embedder: Embedder,
+        max_batch: int = 32,
+        max_wait: float = 0.005
+    ):
+        """
+        Initialize batcher.
+        
+        Args:
+            embedder: Embedder instance
+            max_batch: Maximum queries per forward pass
+            max_wait: Seconds to wait for more queries after the first
+        """
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """Start the background batching task on the running loop."""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the background batching task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def embed(self, query: str) -> np.ndarray:
+        """
+        Embed a query, batched with any other pending queries.
+        
+        Args:
+            query: Query string
+            
+        Returns:
+            numpy array of shape (embedding_dim,)
+        """
+        self.start()
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, future))
+        
+        return await future
+    
+    async def _run(self):
+        """Drain the queue into batches and resolve each caller's future."""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            texts = [text for text, _ in items]
+            
+            try:
+                embeddings = await asyncio.to_thread(self.embedder.embed_queries, texts)
+            except Exception as e:
+                logger.error(f"Batched query embedding failed: {e}")
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), embedding in zip(items, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
 
 
 def load_embedder(
     model_name: str = "BAAI/bge-small-en-v1.5",
-    device: Optional[str] = None
+    device: Optional[str] = None,
+    backend: str = "torch"
 ) -> Embedder:
     """
     Convenience function to load embedder.
@@ -186,11 +517,12 @@ def load_embedder(
     Args:
         model_name: Model to load
         device: Device to use
+        backend: 'torch' or 'openvino'
         
     Returns:
         Embedder instance
     """
-    return Embedder(model_name=model_name, device=device)
+    return Embedder(model_name=model_name, device=device, backend=backend)
 
 
 def embed_texts(
@@ -0,0 +1,191 @@
+"""
+Query Cache
+
+Two-level cache for per-query results: an exact-match LRU keyed on the
+normalized query and request parameters, backed by a semantic lookup
+over embeddings of previously seen queries.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    raise ImportError("FAISS required. Install: pip install faiss-cpu")
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """
+    LRU result cache with paraphrase matching.
+    
+    Keys are tuples whose first element is the normalized query and the
+    rest are request parameters. Exact hits are looked up by key. On a
+    miss, the query embedding is searched against an inner-product index
+    of cached queries; a neighbour above `similarity_threshold` with the
+    same parameters is returned as a hit.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        similarity_threshold: float = 0.97
+    ):
+        """
+        Initialize cache.
+        
+        Args:
+            max_entries: Maximum cached results (least recently used evicted)
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+        """
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        
+        # key -> (result, normalized query embedding or None)
+        self._entries: "OrderedDict[Tuple, Tuple[Dict, Optional[np.ndarray]]]" = OrderedDict()
+        
+        # Semantic index rows map to keys; evicted keys are skipped on lookup
+        # and dropped when the index is rebuilt
+        self._index: Optional[faiss.IndexFlatIP] = None
+        self._index_keys: List[Tuple] = []
+        
+        # Searches may run in worker threads
+        self._lock = threading.RLock()
+    
+    @staticmethod
+    def make_key(query: str, *params) -> Tuple:
+        """
+        Build the exact-match cache key for a request.
+        
+        Args:
+            query: Query string
+            *params: Request parameters that must also match
+        
+        Returns:
+            Hashable cache key
+        """
+        return (query.strip().lower(), *params)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: Tuple) -> Optional[Dict]:
+        """
+        Look up an exact match.
+        
+        Args:
+            key: Key from make_key
+        
+        Returns:
+            Cached result or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def get_similar(self, key: Tuple, embedding: np.ndarray) -> Optional[Dict]:
+        """
+        Look up a previously seen paraphrase.
+        
+        Args:
+            key: Key from make_key (parameters must match)
+            embedding: Query embedding
+        
+        Returns:
+            Cached result or None
+        """
+        query = self._normalize(embedding)
+        
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                return None
+            
+            k = min(8, self._index.ntotal)
+            scores, indices = self._index.search(query, k)
+            
+            for score, idx in zip(scores[0], indices[0]):
+                if idx == -1 or score < self.similarity_threshold:
+                    break
+                
+                cached_key = self._index_keys[idx]
+                if cached_key[1:] != key[1:]:
+                    continue
+                
+                result = self.get(cached_key)
+                if result is not None:
+                    logger.info(f"Semantic cache hit (score={score:.3f})")
+                    return result
+            
+            return None
+    
+    def put(
+        self,
+        key: Tuple,
+        result: Dict,
+        embedding: Optional[np.ndarray] = None
+    ):
+        """
+        Store a result.
+        
+        Args:
+            key: Key from make_key
+            result: Result to cache
+            embedding: Optional query embedding for semantic lookups
+        """
+        if embedding is not None:
+            embedding = self._normalize(embedding)
+        
+        with self._lock:
+            is_new = key not in self._entries
+            self._entries[key] = (result, embedding)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            
+            if embedding is None or not is_new:
+                return
+            
+            if self._index is None:
+                self._index = faiss.IndexFlatIP(embedding.shape[1])
+            
+            # Stale rows accumulate as entries are evicted; compact periodically
+            if len(self._index_keys) >= 2 * self.max_entries:
+                self._rebuild_index()
+            else:
+                self._index.add(embedding)
+                self._index_keys.append(key)
+    
+    def clear(self):
+        """Drop all cached results (e.g. after the index changes)."""
+        with self._lock:
+            self._entries.clear()
+            self._index = None
+            self._index_keys = []
+    
+    def _rebuild_index(self):
+        """Rebuild the semantic index from the live entries."""
+        live = [(k, emb) for k, (_, emb) in self._entries.items() if emb is not None]
+        
+        self._index.reset()
+        self._index_keys = [k for k, _ in live]
+        if live:
+            self._index.add(np.vstack([emb for _, emb in live]))
+    
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        """L2-normalize an embedding into a (1, dim) float32 row."""
+        row = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        norm = np.linalg.norm(row)
+        return row / norm if norm > 0 else row
@@ -4,7 +4,10 @@ Semantic Search Module
 Performs semantic search using FAISS index with metadata enrichment.
 """
 
+import asyncio
 import logging
+import os
+import threading
 import numpy as np
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
@@ -14,12 +17,45 @@ try:
 except ImportError:
     raise ImportError("FAISS required. Install: pip install faiss-cpu")
 
-from .embedder import Embedder, load_embedder
+from .embedder import Embedder, QueryBatcher, load_embedder
 from .build_faiss import FAISSIndexBuilder
+from .query_cache import QueryCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Metadata fields copied into every search result, in _meta_views tuple order
+RESULT_FIELDS = ['chunk_id', 'text', 'section_id', 'section_name', 'page_start', 'document']
+
+# Row layout of search_arrays output
+HIT_DTYPE = np.dtype([('idx', np.int64), ('score', np.float32), ('distance', np.float32)])
+
+# Half the visible cores: leaves room for the embedder (and LLM) threads
+DEFAULT_FAISS_THREADS = max(1, (os.cpu_count() or 2) // 2)
+
+
+def configure_threads(include_torch: bool = True):
+    """
+    Set FAISS (and torch) thread counts from FAISS_THREADS / TORCH_THREADS.
+    
+    FAISS and the BLAS behind numpy/torch each default to one thread per
+    core; running both at full width oversubscribes the CPU.
+    
+    Args:
+        include_torch: Also set torch's intra-op thread count
+            (default 2 when TORCH_THREADS is unset)
+    """
+    faiss_threads = int(os.environ.get('FAISS_THREADS', DEFAULT_FAISS_THREADS))
+    faiss.omp_set_num_threads(faiss_threads)
+    
+    if include_torch:
+        import torch
+        torch_threads = int(os.environ.get('TORCH_THREADS', 2))
+        torch.set_num_threads(torch_threads)
+        logger.info(f"Threads: faiss={faiss_threads}, torch={torch_threads}")
+    else:
+        logger.info(f"Threads: faiss={faiss_threads}")
+
 
 class SemanticSearch:
     """
@@ -30,35 +66,220 @@ class SemanticSearch:
     - Metadata enrichment
     - Score normalization
     - Result ranking
+    - Exact and paraphrase query caching
+    - Recall/latency knobs for approximate indexes (nprobe, ef_search)
     """
     
     def __init__(
         self,
         index: faiss.Index,
-        metadata: Dict,
-        embedder: Embedder
+        metadata: List[Dict],
+        embedder: Embedder,
+        cache_size: int = 1024,
+        cache_threshold: float = 0.95
     ):
         """
         Initialize search engine.
         
         Args:
             index: FAISS index
-            metadata: ID to metadata mapping
+            metadata: Chunk metadata, indexed by FAISS id
             embedder: Embedder instance
+            cache_size: Number of queries whose results are cached (0 disables)
+            cache_threshold: Cosine similarity above which a cached
+                paraphrase's results are reused
         """
         self.index = index
         self.metadata = metadata
         self.embedder = embedder
+        self._gpu_res = None  # Owns GPU memory while self.index lives on a GPU
+        # Per-thread float32 query buffers, so searches don't allocate and
+        # concurrent callers don't overwrite each other's queries
+        self._buffers = threading.local()
+        self._id_to_idx = self._build_id_map(metadata)
+        # Per-row tuples of RESULT_FIELDS, so building a hit is a tuple unpack.
+        # Arrow-backed metadata gathers the hit rows per query instead, to keep
+        # chunk text out of Python objects.
+        self._meta_views = None
+        if not hasattr(metadata, 'take'):
+            self._meta_views = [tuple(m[f] for f in RESULT_FIELDS) for m in metadata]
+        # Score conversion depends only on the metric, so decide it once
+        self._is_ip = index.metric_type == faiss.METRIC_INNER_PRODUCT
+        self.cache = QueryCache(cache_size, cache_threshold) if cache_size > 0 else None
         
         logger.info("Semantic search engine initialized")
         logger.info(f"  Index size: {self.index.ntotal} vectors")
         logger.info(f"  Embedding dim: {self.embedder.embedding_dim}")
     
+    def _base_index(self) -> faiss.Index:
+        """Index under any IndexPreTransform wrapper (e.g. normalization)."""
+        index = self.index
+        while isinstance(index, faiss.IndexPreTransform):
+            index = faiss.downcast_index(index.index)
+        return index
+    
+    @property
+    def nprobe(self) -> Optional[int]:
+        """IVF cells visited per query (None for non-IVF indexes)."""
+        ivf = faiss.try_extract_index_ivf(self.index)
+        return ivf.nprobe if ivf is not None else None
+    
+    @nprobe.setter
+    def nprobe(self, value: int):
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is None:
+            raise ValueError("nprobe only applies to IVF indexes")
+        ivf.nprobe = value
+        if self.cache is not None:
+            self.cache.clear()
+    
+    @property
+    def ef_search(self) -> Optional[int]:
+        """HNSW candidate list size per query (None for non-HNSW indexes)."""
+        base = self._base_index()
+        return base.hnsw.efSearch if hasattr(base, 'hnsw') else None
+    
+    @ef_search.setter
+    def ef_search(self, value: int):
+        base = self._base_index()
+        if not hasattr(base, 'hnsw'):
+            raise ValueError("ef_search only applies to HNSW indexes")
+        base.hnsw.efSearch = value
+        if self.cache is not None:
+            self.cache.clear()
+    
+    def to_gpu(self, device: int = 0) -> bool:
+        """
+        Move the index to a CUDA GPU if faiss was built with GPU support.
+        
+        Args:
+            device: GPU ordinal
+            
+        Returns:
+            True if the index now lives on the GPU, False if it stayed on CPU
+        """
+        if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+            return False
+        
+        res = faiss.StandardGpuResources()
+        try:
+            gpu_index = faiss.index_cpu_to_gpu(res, device, self.index)
+        except RuntimeError as e:
+            # Not every index type has a GPU implementation (e.g. HNSW)
+            logger.warning(f"Keeping index on CPU: {e}")
+            return False
+        
+        self.index = gpu_index
+        self._gpu_res = res
+        logger.info(f"Moved index to GPU {device}")
+        return True
+    
+    async def asearch(
+        self,
+        query: str,
+        k: int = 5,
+        min_score: Optional[float] = None,
+        batcher: Optional[QueryBatcher] = None
+    ) -> List[Dict]:
+        """
+        Search without blocking the event loop.
+        
+        Embedding and the FAISS scan run in worker threads (both release
+        the GIL), so concurrent requests overlap instead of queueing
+        behind each other on the loop.
+        
+        Args:
+            query: Search query
+            k: Number of results to return
+            min_score: Minimum similarity score (optional)
+            batcher: QueryBatcher to coalesce the embedding with other
+                concurrent queries (optional)
+            
+        Returns:
+            List of result dictionaries with metadata and scores
+        """
+        if self.cache is not None:
+            cached = self.cache.get(QueryCache.make_key(query, k, min_score))
+            if cached is not None:
+                return [dict(r) for r in cached]
+        
+        if batcher is not None:
+            query_embedding = await batcher.embed(query)
+        else:
+            query_embedding = await asyncio.to_thread(self.embedder.embed_query, query)
+        
+        return await asyncio.to_thread(self.search, query, k, min_score, query_embedding)
+    
+    def _query_buffer(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Return queries as a C-contiguous (n, dim) float32 matrix for FAISS.
+        
+        Float32 C-contiguous input (what Embedder returns) is passed through
+        as a view. Anything else is cast into this thread's reusable buffer,
+        which grows by doubling to the largest batch seen and never shrinks.
+        
+        Args:
+            queries: Query embeddings, (dim,) or (n, dim)
+            
+        Returns:
+            C-contiguous (n, dim) float32 array
+        """
+        queries = queries.reshape(-1, queries.shape[-1])
+        if queries.dtype == np.float32 and queries.flags.c_contiguous:
+            return queries
+        
+        n, dim = queries.shape
+        
+        buf = getattr(self._buffers, 'buf', None)
+        if buf is None or buf.shape[0] < n or buf.shape[1] != dim:
+            rows = max(n, 2 * buf.shape[0]) if buf is not None and buf.shape[1] == dim else n
+            buf = np.empty((rows, dim), dtype=np.float32)
+            self._buffers.buf = buf
+        
+        view = buf[:n]
+        np.copyto(view, queries, casting='same_kind')
+        return view
+    
+    def _views(self, indices: List[int]) -> List[Tuple]:
+        """
+        Return the RESULT_FIELDS tuples for a list of FAISS ids.
+        
+        Args:
+            indices: FAISS ids (no -1 entries)
+            
+        Returns:
+            List of tuples, one per id
+        """
+        if self._meta_views is not None:
+            return [self._meta_views[i] for i in indices]
+        return self.metadata.take(indices, RESULT_FIELDS)
+    
+    @staticmethod
+    def _build_id_map(metadata: List[Dict]) -> Dict[str, int]:
+        """
+        Map each chunk_id to its FAISS id.
+        
+        Args:
+            metadata: Chunk metadata, indexed by FAISS id
+            
+        Returns:
+            Dictionary of chunk_id -> row index (first row wins on duplicates)
+        """
+        if hasattr(metadata, 'column'):
+            chunk_ids = metadata.column('chunk_id')
+        else:
+            chunk_ids = [meta['chunk_id'] for meta in metadata]
+        id_to_idx = {}
+        for idx, chunk_id in enumerate(chunk_ids):
+            id_to_idx.setdefault(chunk_id, idx)
+        return id_to_idx
+    
     def search(
         self,
         query: str,
         k: int = 5,
-        min_score: Optional[float] = None
+        min_score: Optional[float] = None,
+        query_embedding: Optional[np.ndarray] = None
     ) -> List[Dict]:
         """
         Search for relevant chunks.
@@ -67,54 +288,94 @@ class SemanticSearch:
             query: Search query
             k: Number of results to return
             min_score: Minimum similarity score (optional)
+            query_embedding: Precomputed query embedding, e.g. from a
+                QueryBatcher (optional)
             
         Returns:
             List of result dictionaries with metadata and scores
         """
+        cache_key = QueryCache.make_key(query, k, min_score)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return [dict(r) for r in cached]
+        
         # Generate query embedding
-        query_embedding = self.embedder.embed_query(query)
+        if query_embedding is None:
+            query_embedding = self.embedder.embed_query(query)
         
-        # Reshape for FAISS
-        query_embedding = query_embedding.reshape(1, -1).astype('float32')
+        if self.cache is not None:
+            cached = self.cache.get_similar(cache_key, query_embedding)
+            if cached is not None:
+                return [dict(r) for r in cached]
+        
+        # (1, dim) float32 for FAISS; no copy for Embedder output
+        query_embedding = self._query_buffer(query_embedding)
         
         # Search index
         distances, indices = self.index.search(query_embedding, k)
         
-        # Build results
-        results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if idx == -1:  # FAISS returns -1 for insufficient results
-                continue
-            
-            # Get metadata
-            chunk_metadata = self.metadata[int(idx)]
-            
-            # Convert distance to similarity score
-            # For L2: lower is better, convert to similarity
-            # For cosine (inner product): higher is better
-            score = self._distance_to_score(distance)
-            
-            # Filter by minimum score if specified
-            if min_score is not None and score < min_score:
-                continue
-            
-            result = {
-                'chunk_id': chunk_metadata['chunk_id'],
-                'text': chunk_metadata['text'],
-                'section': chunk_metadata['section_id'],
-                'section_name': chunk_metadata['section_name'],
-                'page': chunk_metadata['page_start'],
-                'document': chunk_metadata['document'],
-                'score': float(score),
-                'distance': float(distance)
-            }
-            
-            results.append(result)
+        results = self._build_results(indices[0], distances[0], min_score)
+        
+        if self.cache is not None:
+            self.cache.put(cache_key, [dict(r) for r in results], query_embedding)
         
         logger.info(f"Found {len(results)} results for query: '{query[:50]}...'")
         
         return results
     
+    def _build_results(
+        self,
+        indices: np.ndarray,
+        distances: np.ndarray,
+        min_score: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Turn one row of FAISS output into result dictionaries.
+        
+        Args:
+            indices: FAISS ids for one query
+            distances: FAISS distances for one query
+            min_score: Minimum similarity score (optional)
+            
+        Returns:
+            List of result dictionaries with metadata and scores
+        """
+        # Convert the whole row of distances to similarity scores at once
+        scores = self._distances_to_scores(distances)
+        
+        # Filter padding (FAISS returns -1 for insufficient results) and low
+        # scores with one mask. Hits come back best-first and scores are
+        # monotonic in distance, so anything past k would score lower still:
+        # a larger k can't add hits above min_score.
+        keep = indices != -1
+        if min_score is not None:
+            keep &= scores >= min_score
+        
+        # Plain Python floats/ints avoid numpy scalar overhead in the loop
+        hits = list(zip(
+            indices[keep].tolist(),
+            distances[keep].tolist(),
+            scores[keep].tolist()
+        ))
+        views = self._views([idx for idx, _, _ in hits])
+        
+        results = []
+        for (idx, distance, score), view in zip(hits, views):
+            chunk_id, text, section, section_name, page, document = view
+            results.append({
+                'chunk_id': chunk_id,
+                'text': text,
+                'section': section,
+                'section_name': section_name,
+                'page': page,
+                'document': document,
+                'score': score,
+                'distance': distance
+            })
+        
+        return results
+    
     def _distance_to_score(self, distance: float) -> float:
         """
         Convert FAISS distance to normalized similarity score.
@@ -129,8 +390,7 @@ class SemanticSearch:
         # distance is already similarity
         # For L2: use exponential decay
         
-        # Check index type
-        if isinstance(self.index, (faiss.IndexFlatIP, faiss.IndexHNSWFlat)):
+        if self._is_ip:
             # Inner product - distance is similarity
             return max(0.0, min(1.0, distance))
         else:
@@ -138,28 +398,89 @@ class SemanticSearch:
             # Use exponential decay: exp(-distance^2)
             return float(np.exp(-distance ** 2))
     
+    def _distances_to_scores(self, distances: np.ndarray) -> np.ndarray:
+        """
+        Vectorized _distance_to_score over an array of FAISS distances.
+        
+        Args:
+            distances: FAISS distances (any shape)
+            
+        Returns:
+            Similarity scores (0-1, higher is better), same shape
+        """
+        distances = np.asarray(distances, dtype=np.float32)
+        if self._is_ip:
+            return np.clip(distances, 0.0, 1.0)
+        
+        # exp(-d^2) in one scratch buffer; numpy's float32 exp is already
+        # SIMD-vectorized, so the remaining cost was the temporaries
+        scores = np.square(distances)
+        np.negative(scores, out=scores)
+        return np.exp(scores, out=scores)
+    
     def batch_search(
         self,
         queries: List[str],
-        k: int = 5
+        k: int = 5,
+        min_score: Optional[float] = None
     ) -> List[List[Dict]]:
         """
         Search multiple queries at once.
         
+        All queries are embedded in one forward pass and searched with a
+        single FAISS call (one matrix-matrix product for flat indexes).
+        
         Args:
             queries: List of queries
             k: Results per query
+            min_score: Minimum similarity score (optional)
             
         Returns:
             List of result lists
         """
-        all_results = []
+        if not queries:
+            return []
         
-        for query in queries:
-            results = self.search(query, k=k)
-            all_results.append(results)
+        query_embeddings = self._query_buffer(self.embedder.embed_queries(queries))
+        distances, indices = self.index.search(query_embeddings, k)
         
-        return all_results
+        return [
+            self._build_results(indices[i], distances[i], min_score)
+            for i in range(len(queries))
+        ]
+    
+    def search_arrays(
+        self,
+        queries: List[str],
+        k: int = 5
+    ) -> np.ndarray:
+        """
+        Search multiple queries and return hits as a structured array.
+        
+        For reranking or aggregating many hits: scores stay packed float32
+        columns that can be filtered with numpy (hits['score'] > x) and
+        metadata is only gathered for the rows that are kept
+        (e.g. via search_by_chunk_id or self.metadata[idx]).
+        
+        Args:
+            queries: List of queries
+            k: Results per query
+            
+        Returns:
+            Array of shape (len(queries), k) with HIT_DTYPE fields idx,
+            score and distance; idx is -1 where FAISS had fewer than k hits
+        """
+        hits = np.empty((len(queries), k), dtype=HIT_DTYPE)
+        if not queries:
+            return hits
+        
+        query_embeddings = self._query_buffer(self.embedder.embed_queries(queries))
+        distances, indices = self.index.search(query_embeddings, k)
+        
+        hits['idx'] = indices
+        hits['distance'] = distances
+        hits['score'] = self._distances_to_scores(distances)
+        return hits
     
     def search_by_chunk_id(self, chunk_id: str) -> Optional[Dict]:
         """
@@ -171,10 +492,10 @@ class SemanticSearch:
         Returns:
             Chunk metadata or None
         """
-        for idx, meta in self.metadata.items():
-            if meta['chunk_id'] == chunk_id:
-                return meta
-        return None
+        idx = self._id_to_idx.get(chunk_id)
+        if idx is None:
+            return None
+        return self.metadata[idx]
     
     def get_similar_chunks(
         self,
@@ -192,11 +513,7 @@ class SemanticSearch:
             List of similar chunks
         """
         # Find chunk index
-        chunk_idx = None
-        for idx, meta in self.metadata.items():
-            if meta['chunk_id'] == chunk_id:
-                chunk_idx = idx
-                break
+        chunk_idx = self._id_to_idx.get(chunk_id)
         
         if chunk_idx is None:
             logger.warning(f"Chunk not found: {chunk_id}")
@@ -209,22 +526,25 @@ class SemanticSearch:
         distances, indices = self.index.search(embedding, k + 1)  # +1 to exclude self
         
         # Build results (skip first result which is the chunk itself)
+        scores = self._distances_to_scores(distances[0][1:])
+        hits = [
+            (idx, score)
+            for idx, score in zip(indices[0][1:].tolist(), scores.tolist())
+            if idx != -1
+        ]
+        views = self._views([idx for idx, _ in hits])
+        
         results = []
-        for idx, distance in zip(indices[0][1:], distances[0][1:]):
-            if idx == -1:
-                continue
-            
-            chunk_metadata = self.metadata[int(idx)]
-            score = self._distance_to_score(distance)
-            
+        for (idx, score), view in zip(hits, views):
+            chunk_id, text, section, section_name, page, document = view
             results.append({
-                'chunk_id': chunk_metadata['chunk_id'],
-                'text': chunk_metadata['text'],
-                'section': chunk_metadata['section_id'],
-                'section_name': chunk_metadata['section_name'],
-                'page': chunk_metadata['page_start'],
-                'document': chunk_metadata['document'],
-                'score': float(score)
+                'chunk_id': chunk_id,
+                'text': text,
+                'section': section,
+                'section_name': section_name,
+                'page': page,
+                'document': document,
+                'score': score
             })
         
         return results
@@ -233,7 +553,9 @@ class SemanticSearch:
 def load_search_engine(
     index_dir: str,
     index_name: str = "faiss_index",
-    embedder_model: str = "BAAI/bge-small-en-v1.5"
+    embedder_model: str = "BAAI/bge-small-en-v1.5",
+    embedder: Optional[Embedder] = None,
+    use_gpu: bool = True
 ) -> SemanticSearch:
     """
     Load search engine from saved index.
@@ -242,19 +564,29 @@ def load_search_engine(
         index_dir: Directory containing index
         index_name: Index file basename
         embedder_model: Embedder model to use
+        embedder: Already-loaded embedder to share (skips loading
+            embedder_model)
+        use_gpu: Move the index to GPU 0 when faiss sees a CUDA device
         
     Returns:
         SemanticSearch instance
     """
+    configure_threads(include_torch=False)
+    
     # Load index
     builder = FAISSIndexBuilder()
     index, metadata = builder.load_index(index_dir, index_name)
     
     # Load embedder
-    embedder = load_embedder(embedder_model)
+    if embedder is None:
+        embedder = load_embedder(embedder_model)
     
     # Create search engine
-    return SemanticSearch(index, metadata, embedder)
+    engine = SemanticSearch(index, metadata, embedder)
+    if use_gpu:
+        engine.to_gpu()
+    
+    return engine
 
 
 if __name__ == "__main__":
@@ -10,6 +10,8 @@ This script demonstrates the complete workflow:
 import json
 from pathlib import Path
 
+import torch
+
 # Import pipeline components
 from ml_core.ingest.ingest_pipeline import ingest_document
 from ml_core.embeddings.embedder import Embedder
@@ -64,7 +66,8 @@ def main():
     # ========================================================================
     print("\n🔢 STEP 2: Generating embeddings...")
     
-    embedder = Embedder(device="cpu")
+    # Embed on the same device the FAISS index will search on
+    embedder = Embedder(device="cuda" if torch.cuda.is_available() else "cpu")
     texts = [chunk['text'] for chunk in chunks]
     
     print(f"   Embedding {len(texts)} chunks with BAAI/bge-small-en-v1.5...")
@@ -78,7 +81,7 @@ def main():
         chunks,
         embeddings,
         output_dir=index_dir,
-        index_type="flat"
+        index_type="auto"
     )
     
     print(f"   ✅ FAISS index saved to: {index_dir}")
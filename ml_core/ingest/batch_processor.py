@@ -5,10 +5,13 @@ Process allfiles in a directory (PDF, Word, Excel).
 """
 
 import logging
+import os
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 
+import torch
+
 from .ingest_pipeline import IngestionPipeline
 from ..embeddings.embedder import Embedder
 from ..embeddings.build_faiss import build_index_from_chunks
@@ -21,16 +24,23 @@ def process_directory(
     input_dir: str,
     output_dir: str = "./data/chunks",
     index_dir: str = "./data/index",
-    file_patterns: List[str] = None
+    file_patterns: List[str] = None,
+    max_workers: Optional[int] = None
 ) -> Dict:
     """
     Process all documents in a directory.
     
+    Files are ingested in parallel worker processes (via
+    IngestionPipeline.ingest_batch); chunks are combined in file order so
+    the index is the same as a serial run.
+    
     Args:
         input_dir: Directory containing documents
         output_dir: Output directory for chunks
         index_dir: Output directory for FAISS index
         file_patterns: File patterns to process (default: all supported)
+        max_workers: Worker processes (default: CPU count - 1; 1 runs
+            serially in this process)
         
     Returns:
         Processing statistics
@@ -44,39 +54,51 @@ def process_directory(
     if file_patterns is None:
         file_patterns = ['*.pdf', '*.docx', '*.doc', '*.xlsx', '*.xls']
     
-    # Find all matching files
+    # Find all matching files in a single walk of the tree. Simple "*.ext"
+    # patterns become a suffix lookup; anything else is matched per name.
+    suffixes = {p[1:].lower() for p in file_patterns if p.startswith('*.') and '*' not in p[1:]}
+    other_patterns = [p for p in file_patterns if p[1:].lower() not in suffixes]
+    
     all_files = []
-    for pattern in file_patterns:
-        all_files.extend(input_path.rglob(pattern))
+    for root, _, names in os.walk(input_path):
+        for name in names:
+            path = Path(root) / name
+            if path.suffix.lower() in suffixes or any(path.match(p) for p in other_patterns):
+                all_files.append(path)
+    all_files.sort()
     
     logger.info(f"Found {len(all_files)} documents to process")
     
-    # Initialize pipeline
-    pipeline = IngestionPipeline()
-    
-    # Process each file
+    # Process each file; a failed file's exception takes its slot
     all_chunks = []
     processed = 0
     failed = 0
     
-    for file_path in all_files:
-        try:
-            logger.info(f"\n{'='*60}")
-            logger.info(f"Processing: {file_path.name}")
-            logger.info(f"{'='*60}")
+    outcomes = IngestionPipeline().ingest_batch(
+        [str(file_path) for file_path in all_files],
+        output_dir=output_dir,
+        max_workers=max_workers,
+        return_exceptions=True
+    )
+    
+    # Combined chunks are streamed out as JSON Lines, one chunk per line
+    combined_file = Path(output_dir) / "all_documents_chunks.jsonl"
+    combined_file.parent.mkdir(parents=True, exist_ok=True)
+    
+    with open(combined_file, 'w', encoding='utf-8') as f:
+        for file_path, outcome in zip(all_files, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Failed to process {file_path.name}: {outcome}")
+                failed += 1
+                continue
             
-            result = pipeline.ingest_document(
-                str(file_path),
-                document_name=file_path.stem,
-                output_dir=output_dir
-            )
+            chunks = outcome['chunks']
+            for chunk in chunks:
+                f.write(json.dumps(chunk, ensure_ascii=False))
+                f.write('\n')
             
-            all_chunks.extend(result['chunks'])
+            all_chunks.extend(chunks)
             processed += 1
-            
-        except Exception as e:
-            logger.error(f"Failed to process {file_path.name}: {e}")
-            failed += 1
     
     logger.info(f"\n{'='*60}")
     logger.info("Batch processing complete!")
@@ -85,18 +107,17 @@ def process_directory(
     logger.info(f"  Total chunks: {len(all_chunks)}")
     logger.info(f"{'='*60}")
     
-    # Save combined chunks
-    combined_file = Path(output_dir) / "all_documents_chunks.json"
-    with open(combined_file, 'w', encoding='utf-8') as f:
-        json.dump(all_chunks, f, indent=2, ensure_ascii=False)
-    
     logger.info(f"Saved combined chunks to: {combined_file}")
     
     # Build FAISS index
     if all_chunks:
         logger.info("\nBuilding FAISS index from all chunks...")
         
-        embedder = Embedder()
+        # Bulk embedding: large length-sorted batches, fp16 autocast on GPU
+        embedder = Embedder(
+            device='cuda' if torch.cuda.is_available() else 'cpu',
+            batch_size=128
+        )
         texts = [chunk['text'] for chunk in all_chunks]
         embeddings = embedder.embed_texts(texts, show_progress=True)
         
@@ -5,17 +5,44 @@ Chunks ISO documents respecting section boundaries with metadata preservation.
 Splits large sections into overlapping sub-chunks for better retrieval.
 """
 
+import os
 import re
 import logging
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterator, Optional
+from dataclasses import dataclass, fields
 import tiktoken  # For accurate token counting
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Tokenizer per encoding name, loaded once per process (None if unavailable)
+_encodings: Dict[str, Optional["tiktoken.Encoding"]] = {}
 
-@dataclass
+
+def _get_encoding(encoding_name: str) -> Optional["tiktoken.Encoding"]:
+    """
+    Load a tiktoken encoding once per process.
+    
+    tiktoken caches loaded encodings itself, but not failures: without
+    this every chunker would retry the BPE download when offline.
+    
+    Args:
+        encoding_name: Tokenizer encoding to load
+        
+    Returns:
+        Encoding, or None if it cannot be loaded
+    """
+    if encoding_name not in _encodings:
+        try:
+            _encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            logger.warning(f"Failed to load tiktoken encoding: {e}. Using simple word count.")
+            _encodings[encoding_name] = None
+    return _encodings[encoding_name]
+
+
+@dataclass(slots=True)
 class Chunk:
     """Container for text chunk with metadata."""
     chunk_id: str
@@ -40,6 +67,9 @@ class DocumentChunker:
     3. Preserve metadata for each chunk
     """
     
+    # Sentence boundary: . ! ? followed by space and capital letter
+    SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+(?=[A-ZÀ-Ÿ])')
+    
     def __init__(
         self,
         target_tokens: int = 400,
@@ -63,17 +93,14 @@ class DocumentChunker:
         self.max_tokens = max_tokens
         self.overlap_tokens = overlap_tokens
         
-        # Initialize tokenizer
-        try:
-            self.encoding = tiktoken.get_encoding(encoding_name)
-        except Exception as e:
-            logger.warning(f"Failed to load tiktoken encoding: {e}. Using simple word count.")
-            self.encoding = None
+        # Initialize tokenizer (shared across chunkers)
+        self.encoding = _get_encoding(encoding_name)
     
     def chunk_sections(
         self,
         sections: List[Dict],
-        document_name: str
+        document_name: str,
+        max_workers: Optional[int] = None
     ) -> List[Chunk]:
         """
         Chunk ISO sections into retrievable units.
@@ -81,32 +108,81 @@ class DocumentChunker:
         Args:
             sections: List of section dicts from parse_sections
             document_name: Name of source document
+            max_workers: Threads used to split long sections (default: CPU
+                count; 1 always runs serially)
             
         Returns:
             List of chunks with metadata
         """
-        chunks = []
-        
-        for section in sections:
-            section_chunks = self._chunk_single_section(section, document_name)
-            chunks.extend(section_chunks)
+        chunks = list(self.iter_chunks(sections, document_name, max_workers))
         
         logger.info(f"Created {len(chunks)} chunks from {len(sections)} sections")
         return chunks
     
-    def _chunk_single_section(self, section: Dict, document_name: str) -> List[Chunk]:
+    def iter_chunks(
+        self,
+        sections: List[Dict],
+        document_name: str,
+        max_workers: Optional[int] = None
+    ) -> Iterator[Chunk]:
+        """
+        Yield chunks section by section, in document order.
+        
+        Lets consumers (e.g. embedding batches) start before the whole
+        document is chunked; only one section's chunks are built at a time
+        on the serial path.
+        
+        Args:
+            sections: List of section dicts from parse_sections
+            document_name: Name of source document
+            max_workers: Threads used to split long sections (default: CPU
+                count; 1 always runs serially)
+            
+        Yields:
+            Chunks with metadata
+        """
+        # Size every section with one batched (multi-threaded) tokenizer call
+        token_counts = self.count_tokens_batch([section['text'] for section in sections])
+        
+        def chunk_one(section: Dict, token_count: int) -> List[Chunk]:
+            return self._chunk_single_section(section, document_name, token_count)
+        
+        # Sections are independent. Splitting a long one tokenizes all of its
+        # sentences, which tiktoken does without holding the GIL, so several
+        # long sections are split on a thread pool; results keep section order
+        n_long = sum(count > self.max_tokens for count in token_counts)
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = min(max_workers, n_long)
+        
+        if self.encoding and max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for section_chunks in executor.map(chunk_one, sections, token_counts):
+                    yield from section_chunks
+        else:
+            for section_chunks in map(chunk_one, sections, token_counts):
+                yield from section_chunks
+    
+    def _chunk_single_section(
+        self,
+        section: Dict,
+        document_name: str,
+        token_count: Optional[int] = None
+    ) -> List[Chunk]:
         """
         Chunk a single section, splitting if necessary.
         
         Args:
             section: Section dictionary
             document_name: Document name
+            token_count: Token count of the section text, if already known
             
         Returns:
             List of chunks (1 if small, multiple if split)
         """
         text = section['text']
-        token_count = self.count_tokens(text)
+        if token_count is None:
+            token_count = self.count_tokens(text)
         
         # If section is within limits, keep as single chunk
         if token_count <= self.max_tokens:
@@ -152,17 +228,21 @@ class DocumentChunker:
         # Split by sentences for clean boundaries
         sentences = self._split_into_sentences(text)
         
-        current_chunk_text = []
+        # Tokenize every sentence in one batched call; chunk sizes are then
+        # sums of these counts
+        sentence_counts = self.count_tokens_batch(sentences)
+        
+        # The current chunk is the sentence window [start, i); its text is
+        # only joined when the chunk is emitted
+        start = 0
         current_tokens = 0
         chunk_index = 0
         
-        for sentence in sentences:
-            sentence_tokens = self.count_tokens(sentence)
-            
+        for i, sentence_tokens in enumerate(sentence_counts):
             # If adding this sentence exceeds max, save current chunk
-            if current_tokens + sentence_tokens > self.target_tokens and current_chunk_text:
+            if current_tokens + sentence_tokens > self.target_tokens and i > start:
                 # Save chunk
-                chunk_text = ' '.join(current_chunk_text)
+                chunk_text = ' '.join(sentences[start:i])
                 chunk_id = self._generate_chunk_id(
                     document_name,
                     section['section_id'],
@@ -183,20 +263,20 @@ class DocumentChunker:
                 
                 # Start new chunk with overlap
                 overlap_text = self._get_overlap_text(
-                    current_chunk_text,
-                    self.overlap_tokens
+                    sentences[start:i],
+                    self.overlap_tokens,
+                    sentence_counts[start:i]
                 )
-                current_chunk_text = overlap_text
-                current_tokens = self.count_tokens(' '.join(current_chunk_text))
+                start = i - len(overlap_text)
+                current_tokens = sum(sentence_counts[start:i])
                 chunk_index += 1
             
             # Add sentence to current chunk
-            current_chunk_text.append(sentence)
             current_tokens += sentence_tokens
         
         # Save final chunk
-        if current_chunk_text:
-            chunk_text = ' '.join(current_chunk_text)
+        if start < len(sentences):
+            chunk_text = ' '.join(sentences[start:])
             chunk_id = self._generate_chunk_id(
                 document_name,
                 section['section_id'],
@@ -233,31 +313,39 @@ class DocumentChunker:
             List of sentences
         """
         # Simple sentence splitting (could be improved with NLP library)
-        # Split on . ! ? followed by space and capital letter
-        sentences = re.split(r'(?<=[.!?])\s+(?=[A-ZÀ-Ÿ])', text)
+        sentences = self.SENTENCE_SPLIT_RE.split(text)
         
         # Clean up
         sentences = [s.strip() for s in sentences if s.strip()]
         
         return sentences
     
-    def _get_overlap_text(self, sentences: List[str], overlap_tokens: int) -> List[str]:
+    def _get_overlap_text(
+        self,
+        sentences: List[str],
+        overlap_tokens: int,
+        sentence_counts: Optional[List[int]] = None
+    ) -> List[str]:
         """
         Get last N tokens worth of sentences for overlap.
         
         Args:
             sentences: List of sentences
             overlap_tokens: Target overlap size
+            sentence_counts: Token count of each sentence, if already known
+                (avoids tokenizing the sentences again)
             
         Returns:
             List of sentences for overlap
         """
+        if sentence_counts is None:
+            sentence_counts = self.count_tokens_batch(sentences)
+        
         overlap = []
         tokens = 0
         
         # Work backwards from end
-        for sentence in reversed(sentences):
-            sentence_tokens = self.count_tokens(sentence)
+        for sentence, sentence_tokens in zip(reversed(sentences), reversed(sentence_counts)):
             if tokens + sentence_tokens <= overlap_tokens:
                 overlap.insert(0, sentence)
                 tokens += sentence_tokens
@@ -266,6 +354,20 @@ class DocumentChunker:
         
         return overlap
     
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """
+        Count tokens in several texts with one tokenizer call.
+        
+        Args:
+            texts: Texts to count
+            
+        Returns:
+            Token count per text
+        """
+        if self.encoding:
+            return [len(ids) for ids in self.encoding.encode_batch(texts)]
+        return [self.count_tokens(text) for text in texts]
+    
     def count_tokens(self, text: str) -> int:
         """
         Count tokens in text.
@@ -307,6 +409,26 @@ class DocumentChunker:
         return f"{doc_clean}_{section_clean}_chunk_{chunk_index}"
 
 
+# Shared chunkers for the convenience functions, keyed by target size
+_chunkers: Dict[int, DocumentChunker] = {}
+
+
+def get_chunker(target_tokens: int = 400) -> DocumentChunker:
+    """
+    Return a shared DocumentChunker, so the tokenizer is loaded only once.
+    
+    Args:
+        target_tokens: Target chunk size
+        
+    Returns:
+        DocumentChunker instance
+    """
+    chunker = _chunkers.get(target_tokens)
+    if chunker is None:
+        chunker = _chunkers[target_tokens] = DocumentChunker(target_tokens=target_tokens)
+    return chunker
+
+
 def chunk_document(
     sections: List[Dict],
     document_name: str,
@@ -323,10 +445,9 @@ def chunk_document(
     Returns:
         List of chunk dictionaries
     """
-    chunker = DocumentChunker(target_tokens=target_tokens)
-    chunks = chunker.chunk_sections(sections, document_name)
+    chunks = get_chunker(target_tokens).iter_chunks(sections, document_name)
     
-    # Convert to dicts
+    # Convert to dicts as chunks are produced (no intermediate Chunk list)
     return [
         {
             'chunk_id': c.chunk_id,
@@ -344,6 +465,37 @@ def chunk_document(
     ]
 
 
+def chunk_document_columns(
+    sections: List[Dict],
+    document_name: str,
+    target_tokens: int = 400
+) -> Dict[str, List]:
+    """
+    Chunk a document into parallel per-field lists instead of row dicts.
+    
+    Same chunks as chunk_document, laid out as one list per Chunk field.
+    Cheaper to build than one dict per chunk and maps directly onto
+    column stores (ArrowMetadata.from_columns, DataFrames).
+    
+    Args:
+        sections: List of sections from parse_sections
+        document_name: Name of document
+        target_tokens: Target chunk size
+        
+    Returns:
+        Dictionary of field name -> list of values
+    """
+    names = [field.name for field in fields(Chunk)]
+    columns = {name: [] for name in names}
+    
+    # Stream chunks straight into the columns; no list of Chunks is kept
+    for chunk in get_chunker(target_tokens).iter_chunks(sections, document_name):
+        for name in names:
+            columns[name].append(getattr(chunk, name))
+    
+    return columns
+
+
 if __name__ == "__main__":
     # Example usage
     sample_sections = [
@@ -6,9 +6,17 @@ Removes page numbers, headers, footers while preserving ISO section structure.
 """
 
 import re
+import json
+import threading
 import unicodedata
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
+
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,6 +53,15 @@ class TextCleaner:
         r'^\s*Internal\s+use\s+only\s*$',               # Internal use only
     ]
     
+    # Curly quotes -> straight quotes
+    QUOTE_TABLE = str.maketrans({
+        '\u201c': '"', '\u201d': '"',
+        '\u2018': "'", '\u2019': "'"
+    })
+    
+    # ISO heading glued to preceding text: "...text4.1.2 Title"
+    ISO_HEADING_RE = re.compile(r'([^\n])(\d+\.\d+(?:\.\d+)*\s+[A-Z])')
+    
     def __init__(self, config: Optional[Dict] = None):
         """
         Initialize text cleaner.
@@ -54,12 +71,30 @@ class TextCleaner:
         """
         self.config = config or {}
         
-        # Add custom patterns if provided
-        if 'custom_page_patterns' in self.config:
-            self.PAGE_NUMBER_PATTERNS.extend(self.config['custom_page_patterns'])
-        
-        if 'custom_header_patterns' in self.config:
-            self.HEADER_FOOTER_PATTERNS.extend(self.config['custom_header_patterns'])
+        # Add custom patterns if provided (per instance: extending the class
+        # lists would leak one config's patterns into every other cleaner)
+        page_patterns = self.PAGE_NUMBER_PATTERNS + self.config.get('custom_page_patterns', [])
+        header_patterns = self.HEADER_FOOTER_PATTERNS + self.config.get('custom_header_patterns', [])
+        
+        # Compile once; each pattern list becomes a single alternation so a
+        # line is tested with one regex call instead of one per pattern
+        self._page_re = re.compile('|'.join(f'(?:{p})' for p in page_patterns), re.IGNORECASE)
+        self._hf_re = re.compile('|'.join(f'(?:{p})' for p in header_patterns), re.IGNORECASE)
+        
+        # Optional Hyperscan prefilter: one DFA pass over the whole text finds
+        # the few lines any page/header pattern can match
+        self._hs_db = None
+        self._hs_scratch = threading.local()
+        if HYPERSCAN_AVAILABLE:
+            self._hs_db = self._build_prefilter(page_patterns + header_patterns)
+        self._list_item_re = re.compile(r'^\s*(?:[-•*]|\d+[\.)])\s+')
+        # Runs of 2+ spaces/tabs or a lone tab; single spaces are left alone
+        self._ws_re = re.compile(r'(?: [ \t]|\t)[ \t]*')
+        self._space_before_punct_re = re.compile(r'\s+([.,;:!?])')
+        self._space_after_punct_re = re.compile(r'([.,;:!?])([^\s\d])')
+        self._open_paren_re = re.compile(r'\(\s+')
+        self._close_paren_re = re.compile(r'\s+\)')
+        self._newlines_re = re.compile(r'\n{3,}')
     
     def clean_text(self, text: str) -> str:
         """
@@ -77,14 +112,9 @@ class TextCleaner:
         # Step 1: Unicode normalization
         text = self._normalize_unicode(text)
         
-        # Step 2: Remove page numbers
-        text = self._remove_page_numbers(text)
-        
-        # Step 3: Remove headers/footers
-        text = self._remove_headers_footers(text)
-        
-        # Step 4: Normalize whitespace
-        text = self._normalize_whitespace(text)
+        # Steps 2-4: Remove page numbers and headers/footers, normalize
+        # whitespace (one pass over the lines)
+        text = self._clean_lines(text)
         
         # Step 5: Clean punctuation
         text = self._normalize_punctuation(text)
@@ -94,87 +124,115 @@ class TextCleaner:
         
         return text.strip()
     
+    def _build_prefilter(self, patterns: List[str]) -> Optional["hyperscan.Database"]:
+        """
+        Compile all page/header patterns into one multi-line Hyperscan database.
+        
+        Args:
+            patterns: Regex patterns to compile
+            
+        Returns:
+            Hyperscan database, or None if a pattern is not supported
+        """
+        flags = (hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_MULTILINE |
+                 hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP)
+        db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        try:
+            db.compile(
+                expressions=[p.encode('utf-8') for p in patterns],
+                ids=list(range(len(patterns))),
+                elements=len(patterns),
+                flags=[flags] * len(patterns)
+            )
+        except hyperscan.error as e:
+            logger.warning(f"Hyperscan prefilter disabled: {e}")
+            return None
+        return db
+    
+    def _prefilter_lines(self, text: str) -> Optional[Set[int]]:
+        """
+        Find the lines a page/header pattern may match, in one scan.
+        
+        Every line matching a pattern on its own is reported; a few more
+        (matches spanning lines) may be, so callers re-check each candidate.
+        
+        Args:
+            text: Text to scan
+            
+        Returns:
+            Candidate line numbers, or None if the prefilter is unavailable
+        """
+        # Hyperscan's Unicode \s excludes the \x1c-\x1f separators that
+        # Python's \s (and str.strip) treat as whitespace
+        if self._hs_db is None or any(c in text for c in '\x1c\x1d\x1e\x1f'):
+            return None
+        
+        scratch = getattr(self._hs_scratch, 'scratch', None)
+        if scratch is None:
+            scratch = self._hs_scratch.scratch = hyperscan.Scratch(self._hs_db)
+        
+        data = text.encode('utf-8')
+        ends = set()
+        
+        def on_match(pattern_id, start, end, flags, context):
+            ends.add(end)
+        
+        self._hs_db.scan(data, match_event_handler=on_match, scratch=scratch)
+        
+        # Map each match's last byte to its line number
+        lines = set()
+        line = 0
+        pos = 0
+        for end in sorted(ends):
+            line += data.count(b'\n', pos, end - 1)
+            pos = end - 1
+            lines.add(line)
+        return lines
+    
     def _normalize_unicode(self, text: str) -> str:
         """Normalize Unicode characters (NFKC normalization)."""
         return unicodedata.normalize('NFKC', text)
     
-    def _remove_page_numbers(self, text: str) -> str:
+    def _clean_lines(self, text: str) -> str:
         """
-        Remove page numbers using multiple patterns.
+        Drop page-number and header/footer lines and normalize whitespace.
         
-        Works line-by-line to avoid removing valid numbered sections.
+        Works line-by-line to avoid removing valid numbered sections:
+        - Remove page numbers (multiple patterns)
+        - Remove common headers and footers
+        - Remove trailing whitespace, collapse tabs/spaces to one space
+        - Remove leading whitespace except on list items
         """
-        lines = text.split('\n')
         cleaned_lines = []
+        candidates = self._prefilter_lines(text)
         
-        for line in lines:
-            is_page_number = False
+        for i, line in enumerate(text.split('\n')):
+            stripped = line.strip()
             
-            # Check against all page number patterns
-            for pattern in self.PAGE_NUMBER_PATTERNS:
-                if re.match(pattern, line.strip(), re.IGNORECASE):
-                    is_page_number = True
-                    break
+            # Check against all page number and header/footer patterns
+            # (only candidate lines when the Hyperscan prefilter ran)
+            if candidates is None or i in candidates:
+                if self._page_re.match(stripped) or self._hf_re.search(line):
+                    continue
             
             # Special case: standalone numbers (but not ISO sections)
-            # ISO sections: "4.1.2 Title" - keep these
+            # ISO sections: "4.1.2 Title" - keep these (never all digits)
             # Page numbers: just "12" - remove these
-            if re.match(r'^\s*\d+\s*$', line) and not re.match(r'^\s*\d+(\.\d+)+', line):
-                is_page_number = True
+            if stripped.isdecimal():
+                continue
             
-            if not is_page_number:
-                cleaned_lines.append(line)
-        
-        return '\n'.join(cleaned_lines)
-    
-    def _remove_headers_footers(self, text: str) -> str:
-        """Remove common headers and footers."""
-        lines = text.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            is_header_footer = False
+            line = line.rstrip()
             
-            for pattern in self.HEADER_FOOTER_PATTERNS:
-                if re.search(pattern, line, re.IGNORECASE):
-                    is_header_footer = True
-                    break
+            # Preserve bullet points and numbered lists; for other lines,
+            # normalize but keep ISO section numbering
+            if not self._list_item_re.match(line):
+                line = line.lstrip()
             
-            if not is_header_footer:
-                cleaned_lines.append(line)
-        
-        return '\n'.join(cleaned_lines)
-    
-    def _normalize_whitespace(self, text: str) -> str:
-        """
-        Normalize whitespace.
-        
-        - Convert tabs to spaces
-        - Remove trailing whitespace
-        - Normalize spaces (multiple → single)
-        """
-        # Convert tabs to spaces
-        text = text.replace('\t', ' ')
+            cleaned_lines.append(line)
         
-        # Remove trailing whitespace from each line
-        lines = [line.rstrip() for line in text.split('\n')]
-        
-        # Remove leading whitespace but preserve indentation for lists
-        cleaned_lines = []
-        for line in lines:
-            # Preserve bullet points and numbered lists
-            if re.match(r'^\s*[-•*]\s+', line) or re.match(r'^\s*\d+[\.)]\s+', line):
-                cleaned_lines.append(line)
-            else:
-                # For other lines, normalize but keep ISO section numbering
-                cleaned_lines.append(line.lstrip())
-        
-        text = '\n'.join(cleaned_lines)
-        
-        # Normalize multiple spaces to single space (but not across lines)
-        text = re.sub(r' +', ' ', text)
-        
-        return text
+        # Tabs and runs of spaces become a single space: one regex pass over
+        # the joined text instead of a call per line (runs never span lines)
+        return self._ws_re.sub(' ', '\n'.join(cleaned_lines))
     
     def _normalize_punctuation(self, text: str) -> str:
         """
@@ -185,16 +243,15 @@ class TextCleaner:
         - Clean up special characters
         """
         # Normalize quotes
-        text = text.replace('"', '"').replace('"', '"')
-        text = text.replace(''', "'").replace(''', "'")
+        text = text.translate(self.QUOTE_TABLE)
         
         # Fix spacing around punctuation (no space before, one space after)
-        text = re.sub(r'\s+([.,;:!?])', r'\1', text)  # Remove space before
-        text = re.sub(r'([.,;:!?])([^\s\d])', r'\1 \2', text)  # Add space after
+        text = self._space_before_punct_re.sub(r'\1', text)  # Remove space before
+        text = self._space_after_punct_re.sub(r'\1 \2', text)  # Add space after
         
         # Fix parentheses spacing
-        text = re.sub(r'\(\s+', '(', text)
-        text = re.sub(r'\s+\)', ')', text)
+        text = self._open_paren_re.sub('(', text)
+        text = self._close_paren_re.sub(')', text)
         
         return text
     
@@ -205,7 +262,7 @@ class TextCleaner:
         - Multiple newlines → maximum 2 (paragraph break)
         """
         # Replace 3+ newlines with 2 newlines
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text = self._newlines_re.sub('\n\n', text)
         
         return text
     
@@ -224,15 +281,32 @@ class TextCleaner:
         
         # Additional: Ensure ISO sections start on new lines
         # Pattern: "4.1.2 Title" should be on its own line
-        text = re.sub(
-            r'([^\n])(\d+\.\d+(\.\d+)*\s+[A-Z])', 
-            r'\1\n\n\2', 
-            text
-        )
+        text = self.ISO_HEADING_RE.sub(r'\1\n\n\2', text)
         
         return text
 
 
+# Shared cleaners for the convenience functions, keyed by their config
+_cleaners: Dict[str, TextCleaner] = {}
+
+
+def get_cleaner(config: Optional[Dict] = None) -> TextCleaner:
+    """
+    Return a shared TextCleaner for this config, compiling its regexes once.
+    
+    Args:
+        config: Optional configuration
+        
+    Returns:
+        TextCleaner instance
+    """
+    key = json.dumps(config or {}, sort_keys=True)
+    cleaner = _cleaners.get(key)
+    if cleaner is None:
+        cleaner = _cleaners[key] = TextCleaner(config)
+    return cleaner
+
+
 def clean_text(text: str, config: Optional[Dict] = None) -> str:
     """
     Convenience function for text cleaning.
@@ -244,8 +318,7 @@ def clean_text(text: str, config: Optional[Dict] = None) -> str:
     Returns:
         Cleaned text
     """
-    cleaner = TextCleaner(config)
-    return cleaner.clean_text(text)
+    return get_cleaner(config).clean_text(text)
 
 
 def clean_iso_text(text: str) -> str:
@@ -258,8 +331,7 @@ def clean_iso_text(text: str) -> str:
     Returns:
         Cleaned text optimized for ISO sections
     """
-    cleaner = TextCleaner()
-    return cleaner.clean_for_iso_sections(text)
+    return get_cleaner().clean_for_iso_sections(text)
 
 
 if __name__ == "__main__":
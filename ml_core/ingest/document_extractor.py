@@ -7,10 +7,17 @@ Supports extraction from:
 - Excel (.xlsx, .xls)
 """
 
+import gc
+import hashlib
+import io
+import json
 import logging
+import os
+import tempfile
+import zipfile
 from pathlib import Path
 from typing import Dict, List, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 
 # Import existing PDF extractor
 from .pdf_to_text import extract_text_from_pdf
@@ -30,6 +37,29 @@ class DocumentContent:
     file_type: str
 
 
+class _TextBuffer:
+    """
+    Separator-joined text written straight into one buffer.
+    
+    Same result as sep.join(parts), without keeping every part alive in a
+    list until the end (lower peak memory for many small rows).
+    """
+    
+    def __init__(self, sep: str):
+        self.sep = sep
+        self.count = 0
+        self._buf = io.StringIO()
+    
+    def add(self, text: str):
+        if self.count:
+            self._buf.write(self.sep)
+        self._buf.write(text)
+        self.count += 1
+    
+    def getvalue(self) -> str:
+        return self._buf.getvalue()
+
+
 class MultiFormatExtractor:
     """
     Extract text from multiple document formats.
@@ -46,8 +76,32 @@ class MultiFormatExtractor:
         'excel': ['.xlsx', '.xls']
     }
     
-    def __init__(self):
-        """Initialize extractor."""
+    # File signatures (first bytes of the file)
+    PDF_MAGIC = b'%PDF'
+    ZIP_MAGIC = b'PK\x03\x04'  # OOXML: .docx, .xlsx
+    OLE_MAGIC = b'\xd0\xcf\x11\xe0'  # Legacy Office: .doc, .xls
+    
+    def __init__(
+        self,
+        use_paddleocr: bool = True,
+        min_chars_threshold: int = 100,
+        tesseract_lang: str = 'eng+fra',
+        pdf_page_workers: int = 1
+    ):
+        """
+        Initialize extractor.
+        
+        Args:
+            use_paddleocr: Use PaddleOCR for scanned PDF pages if available
+            min_chars_threshold: Min chars to consider a PDF page text-based
+            tesseract_lang: Language for Tesseract OCR
+            pdf_page_workers: Worker processes for OCR of scanned PDF pages
+                (default 1 keeps PDF extraction in this process)
+        """
+        self.use_paddleocr = use_paddleocr
+        self.min_chars_threshold = min_chars_threshold
+        self.tesseract_lang = tesseract_lang
+        self.pdf_page_workers = pdf_page_workers
         self.extractors = {
             'pdf': self._extract_pdf,
             'word': self._extract_word,
@@ -83,15 +137,49 @@ class MultiFormatExtractor:
         # Extract using appropriate method
         return self.extractors[file_type](file_path)
     
+    def cache_key(self) -> str:
+        """Settings that change the extracted text, for extraction cache keys."""
+        return f"{self.use_paddleocr}|{self.min_chars_threshold}|{self.tesseract_lang}"
+    
     def _detect_file_type(self, file_path: Path) -> str:
-        """Detect document type from extension."""
+        """
+        Detect document type from the file signature, then the extension.
+        
+        A mislabeled file (e.g. a PDF saved as .docx) goes to the right
+        extractor instead of failing after the wrong one loads it.
+        """
         ext = file_path.suffix.lower()
+        ext_type = None
         
         for file_type, extensions in self.SUPPORTED_FORMATS.items():
             if ext in extensions:
-                return file_type
+                ext_type = file_type
+                break
+        
+        head = self._read_head(file_path)
+        
+        if head.startswith(self.PDF_MAGIC):
+            return 'pdf'
+        
+        if head.startswith(self.ZIP_MAGIC):
+            # OOXML packages keep their parts under word/ or xl/
+            try:
+                with zipfile.ZipFile(file_path) as archive:
+                    names = archive.namelist()
+            except zipfile.BadZipFile:
+                return ext_type
+            if any(name.startswith('word/') for name in names):
+                return 'word'
+            if any(name.startswith('xl/') for name in names):
+                return 'excel'
         
-        return None
+        # Legacy OLE files (.doc/.xls) share one signature; trust the suffix
+        return ext_type
+    
+    def _read_head(self, file_path: Path, n: int = 8) -> bytes:
+        """Read the first bytes of a file (its signature)."""
+        with open(file_path, 'rb') as f:
+            return f.read(n)
     
     def _get_supported_extensions(self) -> List[str]:
         """Get list of all supported extensions."""
@@ -102,7 +190,13 @@ class MultiFormatExtractor:
     
     def _extract_pdf(self, file_path: Path) -> DocumentContent:
         """Extract text from PDF using existing extractor."""
-        result = extract_text_from_pdf(str(file_path))
+        result = extract_text_from_pdf(
+            str(file_path),
+            use_paddleocr=self.use_paddleocr,
+            min_chars_threshold=self.min_chars_threshold,
+            tesseract_lang=self.tesseract_lang,
+            max_workers=self.pdf_page_workers
+        )
         
         return DocumentContent(
             text=result['full_text'],
@@ -121,6 +215,10 @@ class MultiFormatExtractor:
         """
         try:
             from docx import Document
+            from docx.oxml.table import CT_Tbl
+            from docx.oxml.text.paragraph import CT_P
+            from docx.table import Table
+            from docx.text.paragraph import Paragraph
         except ImportError:
             raise ImportError("python-docx required. Install: pip install python-docx")
         
@@ -128,34 +226,42 @@ class MultiFormatExtractor:
             # Load document
             doc = Document(str(file_path))
             
-            # Extract all paragraphs
-            paragraphs = []
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    paragraphs.append(para.text)
+            # Walk the body once, keeping paragraphs and tables in document order
+            paragraphs = _TextBuffer('\n\n')
+            for block in doc.element.body.iterchildren():
+                if isinstance(block, CT_P):
+                    text = Paragraph(block, doc).text
+                    if text.strip():
+                        paragraphs.add(text)
+                elif isinstance(block, CT_Tbl):
+                    for row in Table(block, doc).rows:
+                        for cell in row.cells:
+                            if cell.text.strip():
+                                paragraphs.add(cell.text)
             
-            # Extract tables if any
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            paragraphs.append(cell.text)
+            full_text = paragraphs.getvalue()
             
-            full_text = '\n\n'.join(paragraphs)
+            # The package/part objects form reference cycles, so the parsed XML
+            # tree would otherwise wait for a later GC pass; free it now
+            del doc
+            gc.collect()
             
             # Estimate pages (rough approximation)
             # Assume ~500 chars per page
             estimated_pages = max(1, len(full_text) // 500)
             
-            # Create page info
+            # Create page info as offsets into full_text rather than
+            # substrings, so the text is not held twice
+            total_chars = len(full_text)
             pages = [{
                 'page_number': i + 1,
-                'text': full_text[i*500:(i+1)*500],
+                'char_start': i * 500,
+                'char_end': min((i + 1) * 500, total_chars),
                 'is_scanned': False,
-                'char_count': min(500, len(full_text) - i*500)
+                'char_count': min(500, total_chars - i*500)
             } for i in range(estimated_pages)]
             
-            logger.info(f"Extracted {len(paragraphs)} paragraphs from Word document")
+            logger.info(f"Extracted {paragraphs.count} paragraphs from Word document")
             
             return DocumentContent(
                 text=full_text,
@@ -178,8 +284,14 @@ class MultiFormatExtractor:
         Extracts all sheets, all cells.
         """
         ext = file_path.suffix.lower()
+        head = self._read_head(file_path)
         
-        if ext == '.xlsx':
+        # Container format decides the reader; the suffix is the fallback
+        if head.startswith(self.ZIP_MAGIC):
+            return self._extract_xlsx(file_path)
+        elif head.startswith(self.OLE_MAGIC):
+            return self._extract_xls(file_path)
+        elif ext == '.xlsx':
             return self._extract_xlsx(file_path)
         elif ext == '.xls':
             return self._extract_xls(file_path)
@@ -194,28 +306,33 @@ class MultiFormatExtractor:
             raise ImportError("openpyxl required. Install: pip install openpyxl")
         
         try:
-            # Load workbook
-            wb = load_workbook(str(file_path), data_only=True)
+            # Load workbook (read-only: rows are streamed from the XML instead
+            # of building every Cell object in memory)
+            wb = load_workbook(str(file_path), data_only=True, read_only=True, keep_links=False)
             
-            all_text = []
+            all_text = _TextBuffer('\n')
             sheet_count = 0
             
-            # Extract from all sheets
-            for sheet_name in wb.sheetnames:
-                sheet = wb[sheet_name]
-                sheet_count += 1
-                
-                # Add sheet header
-                all_text.append(f"\n=== Sheet: {sheet_name} ===\n")
-                
-                # Extract all cells
-                for row in sheet.iter_rows(values_only=True):
-                    # Filter out None values and convert to strings
-                    cell_values = [str(cell) for cell in row if cell is not None]
-                    if cell_values:
-                        all_text.append(' | '.join(cell_values))
+            try:
+                # Extract from all sheets
+                for sheet_name in wb.sheetnames:
+                    sheet = wb[sheet_name]
+                    sheet_count += 1
+                    
+                    # Add sheet header
+                    all_text.add(f"\n=== Sheet: {sheet_name} ===\n")
+                    
+                    # Extract all cells
+                    for row in sheet.iter_rows(values_only=True):
+                        # Filter out None values and convert to strings
+                        cell_values = [str(cell) for cell in row if cell is not None]
+                        if cell_values:
+                            all_text.add(' | '.join(cell_values))
+            finally:
+                # Read-only workbooks keep the file open until closed
+                wb.close()
             
-            full_text = '\n'.join(all_text)
+            full_text = all_text.getvalue()
             
             # Create "pages" as sheets
             pages = [{
@@ -251,7 +368,7 @@ class MultiFormatExtractor:
             # Load workbook
             wb = xlrd.open_workbook(str(file_path))
             
-            all_text = []
+            all_text = _TextBuffer('\n')
             sheet_count = wb.nsheets
             
             # Extract from all sheets
@@ -259,20 +376,16 @@ class MultiFormatExtractor:
                 sheet = wb.sheet_by_index(sheet_idx)
                 
                 # Add sheet header
-                all_text.append(f"\n=== Sheet: {sheet.name} ===\n")
+                all_text.add(f"\n=== Sheet: {sheet.name} ===\n")
                 
-                # Extract all cells
+                # Extract all cells, a whole row of values per call
                 for row_idx in range(sheet.nrows):
-                    row_values = []
-                    for col_idx in range(sheet.ncols):
-                        cell = sheet.cell(row_idx, col_idx)
-                        if cell.value:
-                            row_values.append(str(cell.value))
+                    row_values = [str(value) for value in sheet.row_values(row_idx) if value]
                     
                     if row_values:
-                        all_text.append(' | '.join(row_values))
+                        all_text.add(' | '.join(row_values))
             
-            full_text = '\n'.join(all_text)
+            full_text = all_text.getvalue()
             
             # Create pages
             pages = [{
@@ -298,6 +411,10 @@ class MultiFormatExtractor:
             raise
 
 
+# Shared extractor for the convenience functions (it holds no per-document state)
+_EXTRACTOR = MultiFormatExtractor()
+
+
 def extract_document(file_path: str) -> DocumentContent:
     """
     Convenience function to extract from any supported format.
@@ -308,8 +425,94 @@ def extract_document(file_path: str) -> DocumentContent:
     Returns:
         DocumentContent with extracted text
     """
-    extractor = MultiFormatExtractor()
-    return extractor.extract_document(file_path)
+    return _EXTRACTOR.extract_document(file_path)
+
+
+def extract_document_cached(
+    file_path: str,
+    cache_dir: str,
+    extractor: Optional[MultiFormatExtractor] = None
+) -> DocumentContent:
+    """
+    Extract a document, reusing a previous extraction if the file is unchanged.
+    
+    Entries are keyed by absolute path, size and mtime (no content hash)
+    plus the extractor's OCR settings, so checking an unchanged file costs
+    one stat and one JSON load. Each path keeps only its latest entry:
+    writing a new one deletes the entries of earlier versions.
+    
+    Args:
+        file_path: Path to document (PDF, Word, or Excel)
+        cache_dir: Directory holding cached extractions
+        extractor: Extractor to use on a miss (default: the shared one)
+        
+    Returns:
+        DocumentContent with extracted text
+    """
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    settings = (extractor or _EXTRACTOR).cache_key()
+    path_key = hashlib.sha1(str(path).encode('utf-8')).hexdigest()
+    key = hashlib.sha1(
+        f"{stat.st_size}|{stat.st_mtime_ns}|{settings}".encode('utf-8')
+    ).hexdigest()
+    
+    # <path hash>.<version hash>.json, so a path's entries can be found
+    cache_path = Path(cache_dir)
+    cache_file = cache_path / f"{path_key}.{key}.json"
+    
+    if cache_file.exists():
+        logger.info(f"Using cached extraction for: {path.name}")
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return DocumentContent(**json.load(f))
+    
+    if extractor is None:
+        content = extract_document(str(path))
+    else:
+        content = extractor.extract_document(str(path))
+    
+    # Write to a temp file and rename so a crash never leaves a partial
+    # entry; the temp name is unique, as other processes may be writing
+    # the same entry
+    cache_path.mkdir(parents=True, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(dir=cache_path, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(asdict(content), f, ensure_ascii=False)
+        os.replace(tmp_file, cache_file)
+    except Exception:
+        Path(tmp_file).unlink(missing_ok=True)
+        raise
+    
+    # Earlier versions of this file will never be read again
+    for stale_file in cache_path.glob(f"{path_key}.*.json"):
+        if stale_file != cache_file:
+            stale_file.unlink(missing_ok=True)
+    
+    return content
+
+
+def clear_extraction_cache(cache_dir: str) -> int:
+    """
+    Delete all cached extractions in a cache directory.
+    
+    Args:
+        cache_dir: Directory holding cached extractions
+        
+    Returns:
+        Number of entries removed
+    """
+    cache_path = Path(cache_dir)
+    if not cache_path.is_dir():
+        return 0
+    
+    removed = 0
+    for cache_file in cache_path.glob('*.json'):
+        cache_file.unlink(missing_ok=True)
+        removed += 1
+    
+    logger.info(f"Cleared {removed} cached extractions from: {cache_dir}")
+    return removed
 
 
 if __name__ == "__main__":
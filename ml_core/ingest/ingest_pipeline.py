@@ -4,13 +4,23 @@ Complete Ingestion Pipeline
 Orchestrates PDF → Text → Sections → Chunks → Embeddings workflow.
 """
 
+import asyncio
 import json
 import logging
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 
-from .document_extractor import extract_document, MultiFormatExtractor
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from .document_extractor import extract_document, extract_document_cached, MultiFormatExtractor
 from .clean_text import clean_iso_text
 from .parse_sections import parse_sections
 from .chunker import chunk_document
@@ -40,6 +50,20 @@ class IngestionPipeline:
         self.use_paddleocr = self.config.get('use_paddleocr', True)
         self.target_tokens = self.config.get('target_tokens', 400)
         self.min_chars_threshold = self.config.get('min_chars_threshold', 100)
+        self.max_workers = self.config.get('max_workers')
+        self.tesseract_lang = self.config.get('tesseract_lang', 'eng+fra')
+        self.extraction_cache_dir = self.config.get('extraction_cache_dir')
+        self.disable_extraction_cache = self.config.get('disable_extraction_cache', False)
+        
+        # Scanned-page OCR fan-out is opt-in: ingest workers and the API
+        # server already run documents in parallel
+        self.pdf_page_workers = self.config.get('pdf_page_workers', 1)
+        self.extractor = MultiFormatExtractor(
+            use_paddleocr=self.use_paddleocr,
+            min_chars_threshold=self.min_chars_threshold,
+            tesseract_lang=self.tesseract_lang,
+            pdf_page_workers=self.pdf_page_workers
+        )
     
     def ingest_document(
         self,
@@ -57,6 +81,88 @@ class IngestionPipeline:
             document_name: Name for the document (defaults to filename)
             output_dir: Directory to save outputs (optional)
             
+        Returns:
+            Dictionary with chunks and statistics
+        """
+        result = self._process_document(
+            document_path, document_name, self._extraction_cache(output_dir)
+        )
+        
+        # Save outputs if directory specified
+        if output_dir:
+            chunks_file, metadata_file, metadata = self._output_files(result, document_path, output_dir)
+            self.save_chunks(result['chunks'], str(chunks_file))
+            self._save_json(metadata, metadata_file)
+            logger.info(f"  Saved chunks to: {chunks_file}, metadata to: {metadata_file}")
+        
+        return result
+    
+    async def ingest_document_async(
+        self,
+        document_path: str,
+        document_name: Optional[str] = None,
+        output_dir: Optional[str] = None
+    ) -> Dict:
+        """
+        Async ingest_document for event-loop callers (e.g. the API).
+        
+        Extraction and processing run in a worker thread and both output
+        files are written concurrently, so the loop stays free and several
+        documents gathered together overlap one's writes with another's
+        extraction.
+        
+        Args:
+            document_path: Path to document file
+            document_name: Name for the document (defaults to filename)
+            output_dir: Directory to save outputs (optional)
+            
+        Returns:
+            Dictionary with chunks and statistics
+        """
+        result = await asyncio.to_thread(
+            self._process_document, document_path, document_name, self._extraction_cache(output_dir)
+        )
+        
+        if output_dir:
+            chunks_file, metadata_file, metadata = self._output_files(result, document_path, output_dir)
+            await asyncio.gather(
+                asyncio.to_thread(self.save_chunks, result['chunks'], str(chunks_file)),
+                asyncio.to_thread(self._save_json, metadata, metadata_file)
+            )
+            logger.info(f"  Saved chunks to: {chunks_file}, metadata to: {metadata_file}")
+        
+        return result
+    
+    def _extraction_cache(self, output_dir: Optional[str]) -> Optional[str]:
+        """
+        Directory for cached extractions.
+        
+        config 'extraction_cache_dir' if set, else a hidden folder in the
+        output directory, else no cache. Config 'disable_extraction_cache'
+        turns it off.
+        """
+        if self.disable_extraction_cache:
+            return None
+        if self.extraction_cache_dir:
+            return self.extraction_cache_dir
+        if output_dir:
+            return str(Path(output_dir) / ".extraction_cache")
+        return None
+    
+    def _process_document(
+        self,
+        document_path: str,
+        document_name: Optional[str] = None,
+        cache_dir: Optional[str] = None
+    ) -> Dict:
+        """
+        Extract, clean, parse and chunk a document (no file output).
+        
+        Args:
+            document_path: Path to document file
+            document_name: Name for the document (defaults to filename)
+            cache_dir: Reuse/store the extraction here if unchanged (optional)
+            
         Returns:
             Dictionary with chunks and statistics
         """
@@ -69,27 +175,18 @@ class IngestionPipeline:
         if not document_name:
             document_name = document_path.stem
         
-        logger.info(f"Starting ingestion pipeline for: {document_name}")
-        logger.info(f"=" * 60)
-        
         # Step 1: Extract text from document (auto-detects format)
-        logger.info("Step 1/4: Extracting text from document...")
-        extraction_result = extract_document(str(document_path))
+        if cache_dir:
+            extraction_result = extract_document_cached(str(document_path), cache_dir, self.extractor)
+        else:
+            extraction_result = self.extractor.extract_document(str(document_path))
         
         raw_text = extraction_result.text
-        logger.info(f"  ✓ Extracted {extraction_result.total_chars} characters "
-                   f"from {extraction_result.total_pages} pages/sheets")
-        logger.info(f"  ✓ File type: {extraction_result.file_type.upper()}")
-        logger.info(f"  ✓ Method: {extraction_result.extraction_method}")
         
         # Step 2: Clean text
-        logger.info("Step 2/4: Cleaning text...")
         cleaned_text = clean_iso_text(raw_text)
-        logger.info(f"  ✓ Text cleaned ({len(cleaned_text)} characters after cleaning)")
         
         # Step 3: Parse sections
-        logger.info("Step 3/4: Parsing ISO sections...")
-        
         # Prepare page info for section parser
         page_info = [
             {
@@ -100,16 +197,13 @@ class IngestionPipeline:
         ]
         
         sections = parse_sections(cleaned_text, page_info)
-        logger.info(f"  ✓ Parsed {len(sections)} sections")
         
         # Step 4: Create chunks
-        logger.info("Step 4/4: Chunking sections...")
         chunks = chunk_document(
             sections,
             document_name,
             target_tokens=self.target_tokens
         )
-        logger.info(f"  ✓ Created {len(chunks)} chunks")
         
         # Calculate statistics
         stats = self._calculate_stats(
@@ -118,35 +212,19 @@ class IngestionPipeline:
             chunks
         )
         
-        logger.info(f"=" * 60)
-        logger.info("Ingestion complete!")
-        logger.info(f"  Total chunks: {stats['total_chunks']}")
-        logger.info(f"  Avg tokens/chunk: {stats['avg_tokens_per_chunk']:.1f}")
-        logger.info(f"  Total sections: {stats['total_sections']}")
-        
-        # Save outputs if directory specified
-        if output_dir:
-            output_path = Path(output_dir)
-            output_path.mkdir(parents=True, exist_ok=True)
-            
-            # Save chunks
-            chunks_file = output_path / f"{document_name}_chunks.json"
-            self.save_chunks(chunks, str(chunks_file))
-            logger.info(f"  Saved chunks to: {chunks_file}")
-            
-            # Save metadata
-            metadata = {
-                'document_name': document_name,
-                'source_file': str(document_path),
-                'file_type': extraction_result.file_type,
-                'ingestion_date': datetime.now().isoformat(),
-                'statistics': stats,
-                'config': self.config
-            }
-            metadata_file = output_path / f"{document_name}_metadata.json"
-            with open(metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2, ensure_ascii=False)
-            logger.info(f"  Saved metadata to: {metadata_file}")
+        # One summary record per document instead of one per step, so
+        # batch workers don't contend on the log handler
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("\n".join([
+                f"Ingestion complete for: {document_name}",
+                f"  ✓ Extracted {extraction_result.total_chars} characters "
+                f"from {extraction_result.total_pages} pages/sheets "
+                f"({extraction_result.file_type.upper()}, {extraction_result.extraction_method})",
+                f"  ✓ Text cleaned ({len(cleaned_text)} characters after cleaning)",
+                f"  ✓ Parsed {stats['total_sections']} sections",
+                f"  ✓ Created {stats['total_chunks']} chunks "
+                f"({stats['avg_tokens_per_chunk']:.1f} avg tokens/chunk)"
+            ]))
         
         return {
             'chunks': chunks,
@@ -155,6 +233,98 @@ class IngestionPipeline:
             'document_name': document_name
         }
     
+    def _output_files(self, result: Dict, document_path: str, output_dir: str):
+        """
+        Create the output directory and build the output paths and metadata.
+        
+        Args:
+            result: Result of _process_document
+            document_path: Path to the source document
+            output_dir: Directory to save outputs
+            
+        Returns:
+            Tuple of (chunks file, metadata file, metadata dict)
+        """
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        
+        document_name = result['document_name']
+        metadata = {
+            'document_name': document_name,
+            'source_file': str(document_path),
+            'file_type': result['statistics']['file_type'],
+            'ingestion_date': datetime.now().isoformat(),
+            'statistics': result['statistics'],
+            'config': self.config
+        }
+        
+        return (
+            output_path / f"{document_name}_chunks.json",
+            output_path / f"{document_name}_metadata.json",
+            metadata
+        )
+    
+    def _save_json(self, data: Dict, output_path: Path):
+        """Write a dict as indented UTF-8 JSON."""
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    
+    def ingest_batch(
+        self,
+        document_paths: List[str],
+        output_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        return_exceptions: bool = False
+    ) -> List[Union[Dict, Exception]]:
+        """
+        Ingest several documents in parallel worker processes.
+        
+        Cleaning, parsing and chunking are CPU-bound Python, so documents
+        are spread across processes rather than threads.
+        
+        Args:
+            document_paths: Paths to document files
+            output_dir: Directory to save outputs (optional)
+            max_workers: Worker processes (default: config 'max_workers',
+                else CPU count - 1; 1 runs serially in this process)
+            return_exceptions: Return a failed document's exception in its
+                slot instead of raising it
+            
+        Returns:
+            Ingestion results, in the order of document_paths
+        """
+        if max_workers is None:
+            max_workers = self.max_workers or (os.cpu_count() or 2) - 1
+        max_workers = max(1, min(max_workers, len(document_paths)))
+        
+        results = []
+        
+        if max_workers == 1:
+            for document_path in document_paths:
+                try:
+                    results.append(self.ingest_document(document_path, output_dir=output_dir))
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    results.append(e)
+            return results
+        
+        logger.info(f"Ingesting {len(document_paths)} documents with {max_workers} worker processes")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_ingest_one, str(document_path), output_dir, self.config)
+                for document_path in document_paths
+            ]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    results.append(e)
+        
+        return results
+    
     def _calculate_stats(
         self,
         extraction_result: Dict,
@@ -162,14 +332,13 @@ class IngestionPipeline:
         chunks: List[Dict]
     ) -> Dict:
         """Calculate pipeline statistics."""
-        total_tokens = sum(c['token_count'] for c in chunks)
+        # One pass to pull the counts out; sum/min/max then run in C
+        token_counts = [c['token_count'] for c in chunks]
+        total_tokens = sum(token_counts)
         avg_tokens = total_tokens / len(chunks) if chunks else 0
         
         # Section level distribution
-        section_levels = {}
-        for section in sections:
-            level = section['level']
-            section_levels[level] = section_levels.get(level, 0) + 1
+        section_levels = dict(Counter(section['level'] for section in sections))
         
         return {
             'total_pages': extraction_result.total_pages,
@@ -181,8 +350,8 @@ class IngestionPipeline:
             'total_chunks': len(chunks),
             'total_tokens': total_tokens,
             'avg_tokens_per_chunk': avg_tokens,
-            'min_tokens': min(c['token_count'] for c in chunks) if chunks else 0,
-            'max_tokens': max(c['token_count'] for c in chunks) if chunks else 0
+            'min_tokens': min(token_counts, default=0),
+            'max_tokens': max(token_counts, default=0)
         }
     
     def save_chunks(self, chunks: List[Dict], output_path: str):
@@ -193,14 +362,19 @@ class IngestionPipeline:
             chunks: List of chunk dictionaries
             output_path: Output file path
         """
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(chunks, f, indent=2, ensure_ascii=False)
+        if ORJSON_AVAILABLE:
+            # Serialized in C straight to UTF-8 bytes; same layout as json.dump
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(chunks, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(chunks, f, indent=2, ensure_ascii=False)
         
         logger.debug(f"Saved {len(chunks)} chunks to {output_path}")
     
     def load_chunks(self, input_path: str) -> List[Dict]:
         """
-        Load chunks from JSON file.
+        Load chunks from a JSON file, or a JSON Lines file (.jsonl).
         
         Args:
             input_path: Input file path
@@ -209,12 +383,36 @@ class IngestionPipeline:
             List of chunk dictionaries
         """
         with open(input_path, 'r', encoding='utf-8') as f:
-            chunks = json.load(f)
+            if Path(input_path).suffix == '.jsonl':
+                chunks = [json.loads(line) for line in f if line.strip()]
+            else:
+                chunks = json.load(f)
         
         logger.debug(f"Loaded {len(chunks)} chunks from {input_path}")
         return chunks
 
 
+def _ingest_one(
+    document_path: str,
+    output_dir: Optional[str],
+    config: Optional[Dict]
+) -> Dict:
+    """
+    Ingest one document; module-level so it can run in a worker process.
+    
+    Args:
+        document_path: Path to document file
+        output_dir: Output directory
+        config: Configuration dict
+        
+    Returns:
+        Ingestion results
+    """
+    # Already one of several worker processes: no nested OCR pool
+    pipeline = IngestionPipeline(dict(config or {}, pdf_page_workers=1))
+    return pipeline.ingest_document(document_path, output_dir=output_dir)
+
+
 def ingest_document(
     document_path: str,
     document_name: Optional[str] = None,
@@ -237,6 +435,28 @@ def ingest_document(
     return pipeline.ingest_document(document_path, document_name, output_dir)
 
 
+def ingest_batch(
+    document_paths: List[str],
+    output_dir: Optional[str] = None,
+    config: Optional[Dict] = None,
+    max_workers: Optional[int] = None
+) -> List[Dict]:
+    """
+    Convenience function to ingest several documents in parallel.
+    
+    Args:
+        document_paths: Paths to document files
+        output_dir: Output directory
+        config: Configuration dict
+        max_workers: Worker processes (default: CPU count - 1)
+        
+    Returns:
+        Ingestion results, in input order
+    """
+    pipeline = IngestionPipeline(config)
+    return pipeline.ingest_batch(document_paths, output_dir, max_workers)
+
+
 if __name__ == "__main__":
     import sys
     
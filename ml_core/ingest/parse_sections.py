@@ -9,10 +9,18 @@ Recognizes hierarchical sections like:
 """
 
 import re
+import bisect
 import logging
-from typing import List, Dict, Optional, Tuple
+import threading
+from typing import Iterator, List, Dict, Optional, Tuple
 from dataclasses import dataclass
 
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -27,6 +35,7 @@ class Section:
     page_end: int
     level: int  # Hierarchy depth (4=1, 4.1=2, 4.1.2=3)
     parent_id: Optional[str] = None
+    char_start: Optional[int] = None  # Offset of the header in the parsed text
 
 
 class ISOSectionParser:
@@ -41,11 +50,20 @@ class ISOSectionParser:
     - "4.1.2 Champ d'application du système de management"
     """
     
-    # ISO section pattern: number(s) followed by space and capitalized text
-    SECTION_PATTERN = r'^(\d+(?:\.\d+)*)\s+([A-ZÀ-ÿ][^\n]+?)(?:\s*\.{3,}|\s*$)'
+    # ISO section pattern: number(s) followed by space and capitalized text,
+    # ending at trailing TOC dots or end of line. Names are 2+ characters,
+    # so sections without trailing dots need no separate pattern.
+    SECTION_RE = re.compile(r'^(\d+(?:\.\d+)*)\s+([A-ZÀ-ÿ][^\n]+?)(?:\s*\.{3,}|\s*$)')
+    
+    # Lines that may be headers (first non-blank character is a digit)
+    CANDIDATE_LINE_RE = re.compile(r'^[^\S\n]*\d[^\n]*', re.MULTILINE)
     
-    # Alternative pattern for sections without trailing dots
-    SECTION_PATTERN_ALT = r'^(\d+(?:\.\d+)*)\s+([A-ZÀ-ÿ][^\n]*?)$'
+    # Whitespace-only lines inside a section body
+    BLANK_LINE_RE = re.compile(r'\n[^\S\n]*(?=\n)')
+    
+    # Header prefix (number, whitespace, capital) for the Hyperscan scan;
+    # every line SECTION_RE accepts starts this way
+    HEADER_PREFIX_PATTERN = r'^[^\S\n]*\d+(?:\.\d+)*[^\S\n]+[A-ZÀ-ÿ]'
     
     def __init__(self, strict_mode: bool = False):
         """
@@ -55,6 +73,11 @@ class ISOSectionParser:
             strict_mode: If True, only match sections starting with capital letter
         """
         self.strict_mode = strict_mode
+        
+        self._hs_db = None
+        self._hs_scratch = threading.local()
+        if HYPERSCAN_AVAILABLE:
+            self._hs_db = self._build_header_db()
     
     def parse_sections(
         self, 
@@ -72,47 +95,47 @@ class ISOSectionParser:
             List of Section objects
         """
         sections = []
-        lines = text.split('\n')
         
         current_section = None
-        current_text = []
+        body_start = 0
         current_page = 1
         
-        for i, line in enumerate(lines):
-            # Check if line is a section header
+        # Only lines starting with a digit can be headers; find them in one
+        # pass and slice section bodies out of the text between them
+        for line_start, line_end in self._candidate_lines(text):
+            line = text[line_start:line_end]
             match = self._match_section_header(line)
             
-            if match:
-                # Save previous section if exists
-                if current_section:
-                    current_section.text = '\n'.join(current_text).strip()
-                    sections.append(current_section)
-                
-                # Start new section
-                section_id, section_name = match
-                level = self._get_section_level(section_id)
-                parent_id = self._get_parent_id(section_id)
-                
-                current_section = Section(
-                    section_id=section_id,
-                    section_name=section_name.strip(),
-                    text="",
-                    page_start=current_page,
-                    page_end=current_page,
-                    level=level,
-                    parent_id=parent_id
-                )
-                current_text = []
-                
-                logger.debug(f"Found section: {section_id} {section_name}")
-            else:
-                # Add to current section text
-                if current_section and line.strip():
-                    current_text.append(line)
+            if not match:
+                continue
+            
+            # Save previous section if exists
+            if current_section:
+                current_section.text = self._section_body(text[body_start:line_start])
+                sections.append(current_section)
+            
+            # Start new section
+            section_id, section_name = match
+            level = self._get_section_level(section_id)
+            parent_id = self._get_parent_id(section_id)
+            
+            current_section = Section(
+                section_id=section_id,
+                section_name=section_name.strip(),
+                text="",
+                page_start=current_page,
+                page_end=current_page,
+                level=level,
+                parent_id=parent_id,
+                char_start=line_start + len(line) - len(line.lstrip())
+            )
+            body_start = line_end + 1
+            
+            logger.debug(f"Found section: {section_id} {section_name}")
         
         # Save last section
         if current_section:
-            current_section.text = '\n'.join(current_text).strip()
+            current_section.text = self._section_body(text[body_start:])
             sections.append(current_section)
         
         # Update page numbers if page_info provided
@@ -122,6 +145,77 @@ class ISOSectionParser:
         logger.info(f"Parsed {len(sections)} sections")
         return sections
     
+    def _build_header_db(self) -> Optional["hyperscan.Database"]:
+        """
+        Compile the header prefix pattern into a Hyperscan database.
+        
+        Returns:
+            Hyperscan database, or None if the pattern is not supported
+        """
+        flags = (hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_UTF8 |
+                 hyperscan.HS_FLAG_UCP)
+        db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        try:
+            db.compile(
+                expressions=[self.HEADER_PREFIX_PATTERN.encode('utf-8')],
+                ids=[0],
+                elements=1,
+                flags=[flags]
+            )
+        except hyperscan.error as e:
+            logger.warning(f"Hyperscan header scan disabled: {e}")
+            return None
+        return db
+    
+    def _candidate_lines(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Find the lines that may be section headers.
+        
+        Uses a single Hyperscan scan when available, otherwise
+        CANDIDATE_LINE_RE. Callers re-check each line with SECTION_RE.
+        
+        Args:
+            text: Full document text
+            
+        Yields:
+            (start, end) character offsets of each candidate line, in order
+        """
+        # Hyperscan's Unicode \s excludes the \x1c-\x1f separators that
+        # Python's \s (and str.strip) treat as whitespace
+        if self._hs_db is None or any(c in text for c in '\x1c\x1d\x1e\x1f'):
+            for candidate in self.CANDIDATE_LINE_RE.finditer(text):
+                yield candidate.start(), candidate.end()
+            return
+        
+        scratch = getattr(self._hs_scratch, 'scratch', None)
+        if scratch is None:
+            scratch = self._hs_scratch.scratch = hyperscan.Scratch(self._hs_db)
+        
+        data = text.encode('utf-8')
+        ends = []
+        
+        def on_match(pattern_id, start, end, flags, context):
+            ends.append(end)
+        
+        self._hs_db.scan(data, match_event_handler=on_match, scratch=scratch)
+        
+        # Map each match's byte offset to its line's character offsets,
+        # decoding only the bytes between consecutive line starts
+        byte_pos = 0
+        char_pos = 0
+        last_line = -1
+        for end in sorted(ends):
+            line_byte = data.rfind(b'\n', 0, end) + 1
+            if line_byte == last_line:
+                continue  # another match on a line already yielded
+            last_line = line_byte
+            char_pos += len(data[byte_pos:line_byte].decode('utf-8'))
+            byte_pos = line_byte
+            line_end = text.find('\n', char_pos)
+            if line_end < 0:
+                line_end = len(text)
+            yield char_pos, line_end
+    
     def _match_section_header(self, line: str) -> Optional[Tuple[str, str]]:
         """
         Check if line matches ISO section pattern.
@@ -132,25 +226,24 @@ class ISOSectionParser:
         Returns:
             Tuple of (section_id, section_name) or None
         """
-        line = line.strip()
-        
-        # Try primary pattern
-        match = re.match(self.SECTION_PATTERN, line, re.MULTILINE)
+        match = self.SECTION_RE.match(line.strip())
         if match:
             return match.group(1), match.group(2)
         
-        # Try alternative pattern
-        match = re.match(self.SECTION_PATTERN_ALT, line)
-        if match:
-            section_id = match.group(1)
-            section_name = match.group(2).strip()
-            
-            # Validate: must have meaningful name
-            if len(section_name) > 2:
-                return section_id, section_name
-        
         return None
     
+    def _section_body(self, body: str) -> str:
+        """
+        Section text without blank lines, as in the original line order.
+        
+        Args:
+            body: Text between a header line and the next header
+            
+        Returns:
+            Non-blank lines joined with newlines, stripped
+        """
+        return self.BLANK_LINE_RE.sub('', body).strip()
+    
     def _get_section_level(self, section_id: str) -> int:
         """
         Determine section hierarchy level.
@@ -161,7 +254,7 @@ class ISOSectionParser:
         Returns:
             Level (1 for "4", 2 for "4.1", 3 for "4.1.2")
         """
-        return len(section_id.split('.'))
+        return section_id.count('.') + 1
     
     def _get_parent_id(self, section_id: str) -> Optional[str]:
         """
@@ -173,9 +266,9 @@ class ISOSectionParser:
         Returns:
             Parent ID like "4.1" or None if top-level
         """
-        parts = section_id.split('.')
-        if len(parts) > 1:
-            return '.'.join(parts[:-1])
+        i = section_id.rfind('.')
+        if i >= 0:
+            return section_id[:i]
         return None
     
     def _update_page_numbers(
@@ -195,20 +288,23 @@ class ISOSectionParser:
         Returns:
             Sections with updated page numbers
         """
-        # Build character offset map for each section
+        # Pages with offsets, sorted by start, so each lookup is a bisection
+        pages = sorted(
+            (page for page in page_info if 'char_start' in page and 'char_end' in page),
+            key=lambda page: page['char_start']
+        )
+        starts = [page['char_start'] for page in pages]
+        
         for section in sections:
-            # Find section position in full text
-            section_header = f"{section.section_id} {section.section_name}"
-            section_pos = full_text.find(section_header)
+            # Header offset recorded while parsing
+            section_pos = section.char_start
             
-            if section_pos >= 0:
+            if section_pos is not None:
                 # Find which page this falls on
-                for page in page_info:
-                    if 'char_start' in page and 'char_end' in page:
-                        if page['char_start'] <= section_pos < page['char_end']:
-                            section.page_start = page['page_number']
-                            section.page_end = page['page_number']
-                            break
+                i = bisect.bisect_right(starts, section_pos) - 1
+                if i >= 0 and section_pos < pages[i]['char_end']:
+                    section.page_start = pages[i]['page_number']
+                    section.page_end = pages[i]['page_number']
         
         return sections
     
@@ -244,6 +340,9 @@ class ISOSectionParser:
         """
         Find section by ID.
         
+        Scans the list, so it always reflects the list as given; for many
+        lookups build a dict once with build_section_index.
+        
         Args:
             sections: List of sections
             section_id: Section ID to find
@@ -255,6 +354,25 @@ class ISOSectionParser:
             if section.section_id == section_id:
                 return section
         return None
+    
+    def build_section_index(self, sections: List[Section]) -> Dict[str, Section]:
+        """
+        Map section IDs to sections (first occurrence wins, like a scan).
+        
+        Args:
+            sections: List of sections
+            
+        Returns:
+            Dict of section_id -> Section
+        """
+        index = {}
+        for section in sections:
+            index.setdefault(section.section_id, section)
+        return index
+
+
+# Shared parser for the convenience function, so its patterns compile once
+_PARSER = ISOSectionParser()
 
 
 def parse_sections(text: str, page_info: Optional[List[Dict]] = None) -> List[Dict]:
@@ -268,8 +386,7 @@ def parse_sections(text: str, page_info: Optional[List[Dict]] = None) -> List[Di
     Returns:
         List of section dictionaries
     """
-    parser = ISOSectionParser()
-    sections = parser.parse_sections(text, page_info)
+    sections = _PARSER.parse_sections(text, page_info)
     
     # Convert to dicts for easier serialization
     return [
@@ -2,20 +2,18 @@
 PDF Text Extraction Module
 
 Extracts text from PDF files with support for both text-based and scanned PDFs.
-Uses pdfminer.six for text extraction and falls back to Tesseract/PaddleOCR for scanned pages.
+Uses PyMuPDF for text extraction and falls back to Tesseract/PaddleOCR for scanned pages.
 """
 
 import logging
 import io
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 
-try:
-    from pdfminer.high_level import extract_pages, extract_text
-    from pdfminer.layout import LTTextContainer, LTChar, LTFigure, LTImage
-except ImportError:
-    raise ImportError("pdfminer.six is required. Install: pip install pdfminer.six")
+import numpy as np
 
 try:
     from PIL import Image
@@ -30,13 +28,74 @@ except ImportError:
     PADDLEOCR_AVAILABLE = False
     logging.warning("PaddleOCR not available. Install: pip install paddleocr")
 
-import fitz  # PyMuPDF for image extraction
+try:
+    from tesserocr import PyTessBaseAPI, PSM
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+import fitz  # PyMuPDF for text and image extraction
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _cuda_available() -> bool:
+    """
+    Check whether PaddlePaddle can run on a CUDA GPU.
+    
+    Other GPUs (e.g. Intel) are not used by PaddleOCR, so they count as CPU.
+    
+    Returns:
+        True if Paddle was built with CUDA and sees at least one device
+    """
+    try:
+        import paddle
+        return paddle.device.is_compiled_with_cuda() and paddle.device.cuda.device_count() > 0
+    except Exception:
+        return False
+
 
-@dataclass
+# PaddleOCR engine per language, loaded once per process (None if it failed)
+_paddle_engines: Dict[str, Optional["PaddleOCR"]] = {}
+
+# The engines are shared by every extractor and thread (e.g. concurrent
+# /ingest requests) but their predictors are not thread-safe, so loading
+# and each ocr() call hold this lock
+_paddle_lock = threading.Lock()
+
+
+def _get_paddle_ocr(lang: str = 'en') -> Optional["PaddleOCR"]:
+    """
+    Load a PaddleOCR engine once per process, shared by all extractors.
+    
+    Args:
+        lang: PaddleOCR language
+        
+    Returns:
+        PaddleOCR engine, or None if it cannot be initialized
+    """
+    if lang in _paddle_engines:
+        return _paddle_engines[lang]
+    
+    with _paddle_lock:
+        if lang not in _paddle_engines:
+            try:
+                use_gpu = _cuda_available()
+                _paddle_engines[lang] = PaddleOCR(
+                    use_angle_cls=True, 
+                    lang=lang,
+                    use_gpu=use_gpu,
+                    use_tensorrt=False,  # TensorRT engine build can hang on init
+                    show_log=False
+                )
+                logger.info(f"PaddleOCR initialized successfully ({'GPU' if use_gpu else 'CPU'})")
+            except Exception as e:
+                logger.warning(f"PaddleOCR init failed: {e}. Falling back to Tesseract")
+                _paddle_engines[lang] = None
+        return _paddle_engines[lang]
+
+
+@dataclass(slots=True)
 class PageContent:
     """Container for page text and metadata."""
     page_number: int
@@ -45,14 +104,76 @@ class PageContent:
     char_count: int
     
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class PDFExtractionResult:
-    """Complete PDF extraction result."""
-    pages: List[PageContent]
+    """
+    Complete PDF extraction result.
+    
+    Per-page fields are stored as parallel columns (page texts plus NumPy
+    arrays), so totals are single array reductions. Use page(i) or pages
+    for PageContent views.
+    """
+    texts: List[str]
+    page_numbers: np.ndarray  # int32
+    is_scanned: np.ndarray  # bool
+    char_counts: np.ndarray  # int32
     total_pages: int
     total_chars: int
     scanned_pages: int
     extraction_method: str
+    
+    @classmethod
+    def from_pages(cls, pages: List[PageContent]) -> "PDFExtractionResult":
+        """
+        Build the columnar result from extracted pages.
+        
+        Args:
+            pages: Pages in page order
+            
+        Returns:
+            PDFExtractionResult with totals filled in
+        """
+        is_scanned = np.fromiter((p.is_scanned for p in pages), dtype=bool, count=len(pages))
+        char_counts = np.fromiter((p.char_count for p in pages), dtype=np.int32, count=len(pages))
+        scanned_pages = int(is_scanned.sum())
+        
+        return cls(
+            texts=[p.text for p in pages],
+            page_numbers=np.fromiter((p.page_number for p in pages), dtype=np.int32, count=len(pages)),
+            is_scanned=is_scanned,
+            char_counts=char_counts,
+            total_pages=len(pages),
+            total_chars=int(char_counts.sum()),
+            scanned_pages=scanned_pages,
+            extraction_method="Mixed (Text + OCR)" if scanned_pages > 0 else "Text-based"
+        )
+    
+    def page(self, i: int) -> PageContent:
+        """PageContent for the i-th page (0-indexed)."""
+        return PageContent(
+            page_number=int(self.page_numbers[i]),
+            text=self.texts[i],
+            is_scanned=bool(self.is_scanned[i]),
+            char_count=int(self.char_counts[i])
+        )
+    
+    @property
+    def pages(self) -> List[PageContent]:
+        """All pages as PageContent, in page order."""
+        return [self.page(i) for i in range(len(self.texts))]
+    
+    def __eq__(self, other) -> bool:
+        """Compare page columns and totals (arrays compare element-wise)."""
+        if not isinstance(other, PDFExtractionResult):
+            return NotImplemented
+        return (
+            self.texts == other.texts
+            and np.array_equal(self.page_numbers, other.page_numbers)
+            and np.array_equal(self.is_scanned, other.is_scanned)
+            and np.array_equal(self.char_counts, other.char_counts)
+            and (self.total_pages, self.total_chars, self.scanned_pages, self.extraction_method)
+            == (other.total_pages, other.total_chars, other.scanned_pages, other.extraction_method)
+        )
 
 
 class PDFExtractor:
@@ -60,16 +181,23 @@ class PDFExtractor:
     PDF text extraction with OCR fallback.
     
     Workflow:
-    1. Try to extract text using pdfminer
+    1. Try to extract text using PyMuPDF
     2. If page has very little text (likely scanned), use OCR
     3. Support both Tesseract and PaddleOCR
     """
     
+    # Target resolution for pages rendered for OCR, and the zoom limits
+    # (zoom 1 = 72 DPI)
+    OCR_DPI = 200
+    MIN_RENDER_SCALE = 1.0
+    MAX_RENDER_SCALE = 2.0
+    
     def __init__(
         self, 
         use_paddleocr: bool = True,
         min_chars_threshold: int = 100,
-        tesseract_lang: str = 'eng+fra'  # English + French for ISO docs
+        tesseract_lang: str = 'eng+fra',  # English + French for ISO docs
+        max_workers: int = 1
     ):
         """
         Initialize PDF extractor.
@@ -78,25 +206,55 @@ class PDFExtractor:
             use_paddleocr: Use PaddleOCR if available (better accuracy)
             min_chars_threshold: Min chars to consider page as text-based
             tesseract_lang: Language for Tesseract OCR
+            max_workers: Worker processes for OCR of scanned pages (default
+                1 runs everything in this process)
         """
         self.min_chars_threshold = min_chars_threshold
         self.tesseract_lang = tesseract_lang
+        self.max_workers = max_workers
         self.use_paddleocr = use_paddleocr and PADDLEOCR_AVAILABLE
         
-        # Initialize PaddleOCR if requested
-        self.paddle_ocr = None
-        if self.use_paddleocr:
-            try:
-                self.paddle_ocr = PaddleOCR(
-                    use_angle_cls=True, 
-                    lang='en',  # Can be changed to 'fr' for French
-                    use_gpu=False,  # CPU only for Intel GPU compatibility
-                    show_log=False
-                )
-                logger.info("PaddleOCR initialized successfully")
-            except Exception as e:
-                logger.warning(f"PaddleOCR init failed: {e}. Falling back to Tesseract")
-                self.use_paddleocr = False
+        # Shared PaddleOCR engine, fetched on the first scanned page
+        self._paddle_ocr = None
+        
+        # In-process Tesseract API, created on the first OCR page and reused
+        # (pytesseract starts a tesseract process and reloads its language
+        # data for every image); one per thread, as the API is not thread-safe
+        self.use_tesserocr = TESSEROCR_AVAILABLE
+        self._tess = threading.local()
+    
+    @property
+    def paddle_ocr(self) -> Optional["PaddleOCR"]:
+        """Shared PaddleOCR engine, loaded on first use so text-only PDFs never load it."""
+        if self._paddle_ocr is None and self.use_paddleocr:
+            self._paddle_ocr = _get_paddle_ocr('en')  # Can be changed to 'fr' for French
+            self.use_paddleocr = self._paddle_ocr is not None
+        return self._paddle_ocr
+    
+    @paddle_ocr.setter
+    def paddle_ocr(self, engine: Optional["PaddleOCR"]):
+        self._paddle_ocr = engine
+    
+    def close(self):
+        """Release this thread's Tesseract API, if one was created."""
+        api = getattr(self._tess, 'api', None)
+        if api is not None:
+            api.End()
+            self._tess.api = None
+    
+    def warmup(self):
+        """
+        Initialize the OCR engines now rather than on the first scanned page.
+        
+        Runs a small blank image through PaddleOCR, or through the Tesseract
+        API when tesserocr is installed, so that lazy model and graph setup
+        happens at process startup.
+        """
+        img = Image.new("RGB", (64, 32), "white")
+        if self.use_paddleocr and self.paddle_ocr:
+            self._paddleocr_image(np.asarray(img))
+        elif self._get_tess_api() is not None:
+            self._tesseract_image(img)
     
     def extract_from_pdf(self, pdf_path: str) -> PDFExtractionResult:
         """
@@ -114,60 +272,147 @@ class PDFExtractor:
         
         logger.info(f"Starting extraction from: {pdf_path.name}")
         
-        # Open PDF with PyMuPDF for page count and images
-        pdf_doc = fitz.open(str(pdf_path))
-        total_pages = len(pdf_doc)
+        if self.max_workers > 1:
+            pages = self._extract_pages_parallel(str(pdf_path), self.max_workers)
+        else:
+            pages = list(self.iter_pages(str(pdf_path)))
         
-        pages = []
-        scanned_count = 0
+        result = PDFExtractionResult.from_pages(pages)
         
-        for page_num in range(total_pages):
-            logger.info(f"Processing page {page_num + 1}/{total_pages}")
-            
-            # First try text extraction with pdfminer
-            page_text = self._extract_text_from_page(str(pdf_path), page_num)
-            
-            is_scanned = len(page_text.strip()) < self.min_chars_threshold
+        logger.info(f"Extraction complete: {result.total_pages} pages, {result.total_chars} chars, "
+                   f"{result.scanned_pages} scanned pages")
+        
+        return result
+    
+    def iter_pages(self, pdf_path: str) -> Iterator[PageContent]:
+        """
+        Extract a PDF page by page in this process, as a stream.
+        
+        For callers that handle each page as it comes (write it out, index
+        it): only the current page's text is held, not the whole document.
+        
+        Args:
+            pdf_path: Path to PDF file
             
-            # If likely scanned, use OCR
-            if is_scanned:
-                logger.info(f"Page {page_num + 1} appears scanned, using OCR")
-                page_text = self._ocr_page(pdf_doc, page_num)
-                scanned_count += 1
+        Yields:
+            PageContent for each page, in page order
+        """
+        if not Path(pdf_path).exists():
+            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+        
+        pdf_doc = fitz.open(str(pdf_path))
+        try:
+            total_pages = len(pdf_doc)
+            for page_num in range(total_pages):
+                yield self._extract_page(pdf_doc, page_num, total_pages)
+        finally:
+            pdf_doc.close()
+    
+    def _extract_page(
+        self,
+        pdf_doc: fitz.Document,
+        page_num: int,
+        total_pages: int,
+        ocr: bool = True
+    ) -> PageContent:
+        """
+        Extract one page, falling back to OCR if it looks scanned.
+        
+        Args:
+            pdf_doc: Open PyMuPDF document
+            page_num: Page number (0-indexed)
+            total_pages: Page count, for progress logging
+            ocr: OCR a scanned page here (False leaves its text layer, for
+                the caller to OCR elsewhere)
             
-            pages.append(PageContent(
-                page_number=page_num + 1,
-                text=page_text,
-                is_scanned=is_scanned,
-                char_count=len(page_text)
-            ))
+        Returns:
+            PageContent for the page
+        """
+        logger.info(f"Processing page {page_num + 1}/{total_pages}")
         
-        pdf_doc.close()
+        # First try the page's text layer
+        page_text = self._extract_text_from_page(pdf_doc, page_num)
         
-        total_chars = sum(p.char_count for p in pages)
-        extraction_method = "Mixed (Text + OCR)" if scanned_count > 0 else "Text-based"
+        is_scanned = len(page_text.strip()) < self.min_chars_threshold
         
-        logger.info(f"Extraction complete: {total_pages} pages, {total_chars} chars, "
-                   f"{scanned_count} scanned pages")
+        # If likely scanned, use OCR
+        if is_scanned and ocr:
+            logger.info(f"Page {page_num + 1} appears scanned, using OCR")
+            page_text = self._ocr_page(pdf_doc, page_num)
         
-        return PDFExtractionResult(
-            pages=pages,
-            total_pages=total_pages,
-            total_chars=total_chars,
-            scanned_pages=scanned_count,
-            extraction_method=extraction_method
+        return PageContent(
+            page_number=page_num + 1,
+            text=page_text,
+            is_scanned=is_scanned,
+            char_count=len(page_text)
         )
     
-    def _extract_text_from_page(self, pdf_path: str, page_num: int) -> str:
-        """Extract text from a specific page using pdfminer."""
+    def _extract_pages_parallel(
+        self,
+        pdf_path: str,
+        max_workers: int
+    ) -> List[PageContent]:
+        """
+        Extract pages here and OCR the scanned ones in worker processes.
+        
+        Reading a text layer is cheap, so every page is probed in this
+        process and only pages needing OCR are sent to the pool, split into
+        contiguous runs (a few per worker, to balance slow pages). No pool
+        is started when at most one page needs OCR.
+        
+        Args:
+            pdf_path: Path to PDF file
+            max_workers: Worker processes
+            
+        Returns:
+            PageContent for every page, in page order
+        """
+        with fitz.open(pdf_path) as pdf_doc:
+            total_pages = len(pdf_doc)
+            pages = [
+                self._extract_page(pdf_doc, page_num, total_pages, ocr=False)
+                for page_num in range(total_pages)
+            ]
+            scanned = [page.page_number - 1 for page in pages if page.is_scanned]
+            max_workers = min(max_workers, len(scanned))
+            
+            if max_workers <= 1:
+                texts = [self._ocr_page(pdf_doc, page_num) for page_num in scanned]
+            else:
+                run_size = -(-len(scanned) // (max_workers * 4))
+                page_runs = [
+                    scanned[start:start + run_size]
+                    for start in range(0, len(scanned), run_size)
+                ]
+                config = {
+                    'use_paddleocr': self.use_paddleocr,
+                    'min_chars_threshold': self.min_chars_threshold,
+                    'tesseract_lang': self.tesseract_lang
+                }
+                
+                logger.info(f"OCR of {len(scanned)} scanned pages with {max_workers} worker processes")
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    results = executor.map(
+                        _ocr_page_run,
+                        [pdf_path] * len(page_runs),
+                        page_runs,
+                        [config] * len(page_runs)
+                    )
+                    texts = [text for run in results for text in run]
+        
+        for page_num, text in zip(scanned, texts):
+            pages[page_num] = PageContent(
+                page_number=page_num + 1,
+                text=text,
+                is_scanned=True,
+                char_count=len(text)
+            )
+        return pages
+    
+    def _extract_text_from_page(self, pdf_doc: fitz.Document, page_num: int) -> str:
+        """Extract text from a specific page of the already-open document."""
         try:
-            # Extract text for specific page
-            text = ""
-            for page_layout in extract_pages(pdf_path, page_numbers=[page_num]):
-                for element in page_layout:
-                    if isinstance(element, LTTextContainer):
-                        text += element.get_text()
-            return text
+            return pdf_doc[page_num].get_text("text")
         except Exception as e:
             logger.error(f"Text extraction failed for page {page_num}: {e}")
             return ""
@@ -186,26 +431,119 @@ class PDFExtractor:
         try:
             page = pdf_doc[page_num]
             
-            # Render page to image (higher DPI = better OCR)
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x scale
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+            scale = self._render_scale(page)
             
             # Try PaddleOCR first if available
-            if self.use_paddleocr and self.paddle_ocr:
-                return self._paddleocr_image(img)
-            else:
-                return self._tesseract_image(img)
+            use_paddleocr = self.use_paddleocr and self.paddle_ocr
+            
+            # A scan stored as one full-page image is OCR'd as stored
+            img = self._embedded_page_image(pdf_doc, page, scale)
+            
+            if img is None:
+                # Render page to image (higher DPI = better OCR)
+                matrix = fitz.Matrix(scale, scale)
+                pix = page.get_pixmap(matrix=matrix)
+                
+                if use_paddleocr:
+                    # PaddleOCR reads the pixmap's pixels in place, no copy
+                    img_array = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+                    return self._paddleocr_image(img_array.reshape(pix.height, pix.width, 3))
+                
+                # Copy straight from the pixmap's buffer (samples would make
+                # an extra bytes copy), then free the pixmap right away
+                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples_mv)
+                pix = None
+            
+            try:
+                if use_paddleocr:
+                    return self._paddleocr_image(np.asarray(img))
+                else:
+                    return self._tesseract_image(img)
+            finally:
+                # Release the pixel buffer now rather than at the next GC pass
+                img.close()
                 
         except Exception as e:
             logger.error(f"OCR failed for page {page_num}: {e}")
             return ""
     
-    def _paddleocr_image(self, image: Image.Image) -> str:
-        """Extract text using PaddleOCR."""
+    def _render_scale(self, page: fitz.Page) -> float:
+        """
+        Zoom for rendering a page for OCR.
+        
+        Targets OCR_DPI, but no finer than the page's sharpest image:
+        upsampling a low-resolution scan only multiplies OCR work.
+        
+        Args:
+            page: Page to render
+            
+        Returns:
+            Zoom between MIN_RENDER_SCALE and MAX_RENDER_SCALE
+        """
+        dpi = self.OCR_DPI
+        
+        image_dpis = [
+            image[2] / rect.width * 72
+            for image in page.get_images(full=True)
+            for rect in page.get_image_rects(image[0])
+            if rect.width > 0
+        ]
+        if image_dpis:
+            dpi = min(dpi, max(image_dpis))
+        
+        return min(self.MAX_RENDER_SCALE, max(self.MIN_RENDER_SCALE, dpi / 72))
+    
+    def _embedded_page_image(
+        self,
+        pdf_doc: fitz.Document,
+        page: fitz.Page,
+        scale: float
+    ) -> Optional[Image.Image]:
+        """
+        Decode the page's only image if it is an upright full-page scan.
+        
+        Skips rendering (and its width*height*3 pixmap) for typical scanned
+        pages. Images smaller than the render would be, masked or rotated
+        ones, and formats Pillow cannot decode are left to the renderer.
+        
+        Args:
+            pdf_doc: PyMuPDF document
+            page: Page to inspect
+            scale: Zoom the page would be rendered at
+            
+        Returns:
+            RGB image, or None if the page should be rendered instead
+        """
+        images = page.get_images(full=True)
+        if len(images) != 1 or page.rotation:
+            return None
+        
+        xref, smask, width = images[0][:3]
+        if smask or width < page.rect.width * scale:
+            return None
+        
+        placements = page.get_image_rects(xref, transform=True)
+        if len(placements) != 1:
+            return None
+        rect, matrix = placements[0]
+        if matrix.b or matrix.c or matrix.a <= 0 or matrix.d <= 0:
+            return None
+        if abs(rect & page.rect) < 0.95 * abs(page.rect):
+            return None
+        
+        try:
+            img = Image.open(io.BytesIO(pdf_doc.extract_image(xref)["image"]))
+            return img if img.mode == "RGB" else img.convert("RGB")
+        except Exception as e:
+            logger.debug(f"Embedded image not decodable, rendering page instead: {e}")
+            return None
+    
+    def _paddleocr_image(self, img_array: np.ndarray) -> str:
+        """Extract text using PaddleOCR from an RGB (height, width, 3) array."""
         try:
-            import numpy as np
-            img_array = np.array(image)
-            result = self.paddle_ocr.ocr(img_array, cls=True)
+            paddle_ocr = self.paddle_ocr
+            with _paddle_lock:
+                result = paddle_ocr.ocr(img_array, cls=True)
             
             # Extract text from result
             if result and result[0]:
@@ -219,17 +557,97 @@ class PDFExtractor:
     def _tesseract_image(self, image: Image.Image) -> str:
         """Extract text using Tesseract."""
         try:
+            api = self._get_tess_api()
+            if api is not None:
+                api.SetImage(image)
+                return api.GetUTF8Text()
+            
             text = pytesseract.image_to_string(image, lang=self.tesseract_lang)
             return text
         except Exception as e:
             logger.error(f"Tesseract error: {e}")
             return ""
+    
+    def _get_tess_api(self) -> Optional["PyTessBaseAPI"]:
+        """
+        Get this extractor's tesserocr API, creating it on first use.
+        
+        Returns:
+            PyTessBaseAPI, or None to use pytesseract instead
+        """
+        api = getattr(self._tess, 'api', None)
+        if api is None and self.use_tesserocr:
+            try:
+                api = self._tess.api = PyTessBaseAPI(lang=self.tesseract_lang, psm=PSM.AUTO)
+            except Exception as e:
+                logger.warning(f"tesserocr init failed: {e}. Falling back to pytesseract")
+                self.use_tesserocr = False
+        return api
+
+
+# Shared extractors, keyed by their settings, so OCR engines stay loaded
+# across documents (and page runs, in OCR workers) within a process
+_extractors: Dict[Tuple, PDFExtractor] = {}
+
+
+def get_pdf_extractor(
+    use_paddleocr: bool = True,
+    min_chars_threshold: int = 100,
+    tesseract_lang: str = 'eng+fra',
+    max_workers: int = 1
+) -> PDFExtractor:
+    """
+    Return a shared PDFExtractor for these settings, creating it once.
+    
+    Args:
+        use_paddleocr: Use PaddleOCR if available
+        min_chars_threshold: Minimum characters to consider page text-based
+        tesseract_lang: Language for Tesseract OCR
+        max_workers: Worker processes for OCR of scanned pages (default: 1)
+        
+    Returns:
+        PDFExtractor instance
+    """
+    key = (use_paddleocr, min_chars_threshold, tesseract_lang, max_workers)
+    extractor = _extractors.get(key)
+    if extractor is None:
+        extractor = _extractors[key] = PDFExtractor(
+            use_paddleocr=use_paddleocr,
+            min_chars_threshold=min_chars_threshold,
+            tesseract_lang=tesseract_lang,
+            max_workers=max_workers
+        )
+    return extractor
+
+
+def _ocr_page_run(
+    pdf_path: str,
+    page_nums: List[int],
+    config: Dict
+) -> List[str]:
+    """
+    OCR a run of pages; module-level so it can run in a worker process.
+    
+    Args:
+        pdf_path: Path to PDF file
+        page_nums: Page numbers (0-indexed) to OCR
+        config: PDFExtractor settings
+        
+    Returns:
+        OCR text for each page in page_nums
+    """
+    extractor = get_pdf_extractor(max_workers=1, **config)
+    
+    with fitz.open(pdf_path) as pdf_doc:
+        return [extractor._ocr_page(pdf_doc, page_num) for page_num in page_nums]
 
 
 def extract_text_from_pdf(
     pdf_path: str, 
     use_paddleocr: bool = True,
-    min_chars_threshold: int = 100
+    min_chars_threshold: int = 100,
+    tesseract_lang: str = 'eng+fra',
+    max_workers: int = 1
 ) -> Dict:
     """
     Convenience function to extract text from PDF.
@@ -238,33 +656,48 @@ def extract_text_from_pdf(
         pdf_path: Path to PDF file
         use_paddleocr: Use PaddleOCR if available
         min_chars_threshold: Minimum characters to consider page text-based
+        tesseract_lang: Language for Tesseract OCR
+        max_workers: Worker processes for OCR of scanned pages (default: 1)
         
     Returns:
         Dictionary with extraction results
     """
-    extractor = PDFExtractor(
+    extractor = get_pdf_extractor(
         use_paddleocr=use_paddleocr,
-        min_chars_threshold=min_chars_threshold
+        min_chars_threshold=min_chars_threshold,
+        tesseract_lang=tesseract_lang,
+        max_workers=max_workers
     )
     
     result = extractor.extract_from_pdf(pdf_path)
     
+    # Pages are offsets into full_text rather than copies of their text,
+    # so the document text is held once
+    pages = []
+    char_start = 0
+    for text, page_number, is_scanned, char_count in zip(
+        result.texts,
+        result.page_numbers.tolist(),
+        result.is_scanned.tolist(),
+        result.char_counts.tolist()
+    ):
+        pages.append({
+            "page_number": page_number,
+            "char_start": char_start,
+            "char_end": char_start + len(text),
+            "is_scanned": is_scanned,
+            "char_count": char_count
+        })
+        char_start += len(text) + 2  # "\n\n" between pages
+    
     # Convert to dict for easier usage
     return {
-        "pages": [
-            {
-                "page_number": p.page_number,
-                "text": p.text,
-                "is_scanned": p.is_scanned,
-                "char_count": p.char_count
-            }
-            for p in result.pages
-        ],
+        "pages": pages,
         "total_pages": result.total_pages,
         "total_chars": result.total_chars,
         "scanned_pages": result.scanned_pages,
         "extraction_method": result.extraction_method,
-        "full_text": "\n\n".join(p.text for p in result.pages)
+        "full_text": "\n\n".join(result.texts)
     }
 
 
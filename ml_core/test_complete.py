@@ -20,15 +20,22 @@ print("=" * 70)
 print("\n📦 Étape 1/4 : Installation des dépendances...")
 print("-" * 70)
 
+# pip n'est lancé que s'il manque un paquet
 try:
-    subprocess.run([
-        sys.executable, "-m", "pip", "install", 
-        "python-docx", "openpyxl", "xlrd"
-    ], check=True)
-    print("✅ Dépendances Word/Excel installées")
-except Exception as e:
-    print(f"⚠️  Erreur installation : {e}")
-    print("Continuons quand même...")
+    import docx
+    import openpyxl
+    import xlrd
+    print("✅ Dépendances Word/Excel déjà installées")
+except ImportError:
+    try:
+        subprocess.run([
+            sys.executable, "-m", "pip", "install", 
+            "python-docx", "openpyxl", "xlrd"
+        ], check=True)
+        print("✅ Dépendances Word/Excel installées")
+    except Exception as e:
+        print(f"⚠️  Erreur installation : {e}")
+        print("Continuons quand même...")
 
 # Étape 2 : Traiter tous les documents
 print("\n📄 Étape 2/4 : Traitement des documents...")
@@ -0,0 +1,14 @@
+"""
+Shared pytest fixtures for ML core tests.
+"""
+
+import pytest
+
+from ml_core.embeddings.embedder import Embedder
+
+
+@pytest.fixture(scope="session")
+def embedder():
+    """Create embedder instance once for the whole test session."""
+    # Use small model for testing
+    return Embedder(model_name="BAAI/bge-small-en-v1.5", device="cpu")
@@ -15,13 +15,18 @@ import numpy as np
 from pathlib import Path
 import tempfile
 import json
+import asyncio
+import faiss
+import torch
 
 # Import modules to test
-from ml_core.ingest.clean_text import TextCleaner, clean_text
+from ml_core.ingest.clean_text import TextCleaner, clean_text, get_cleaner
 from ml_core.ingest.parse_sections import ISOSectionParser, parse_sections
-from ml_core.ingest.chunker import DocumentChunker, chunk_document
-from ml_core.embeddings.embedder import Embedder
-from ml_core.embeddings.build_faiss import FAISSIndexBuilder
+from ml_core.ingest.chunker import DocumentChunker, chunk_document, chunk_document_columns
+from ml_core.embeddings.embedder import Embedder, QueryBatcher
+from ml_core.embeddings.build_faiss import FAISSIndexBuilder, ArrowMetadata, append_to_index
+from ml_core.embeddings.search import SemanticSearch
+from ml_core.api.answer_cache import AnswerCache
 
 
 class TestTextCleaning:
@@ -70,6 +75,48 @@ More text here."""
         assert "    " not in cleaned
         # Should have at most double newlines
         assert "\n\n\n" not in cleaned
+    
+    def test_custom_patterns_stay_per_instance(self):
+        """Test custom patterns apply to their cleaner only."""
+        custom = TextCleaner({'custom_header_patterns': [r'^ACME Corp$']})
+        
+        assert "ACME" not in custom.clean_text("ACME Corp\nBody text.")
+        assert "ACME Corp" in TextCleaner().clean_text("ACME Corp\nBody text.")
+        assert len(TextCleaner.HEADER_FOOTER_PATTERNS) == 5
+    
+    def test_curly_quotes_normalized(self):
+        """Test smart quotes become straight quotes."""
+        cleaner = TextCleaner()
+        
+        cleaned = cleaner.clean_text("The \u201cscope\u201d of the organization\u2019s QMS")
+        
+        assert cleaned == 'The "scope" of the organization\'s QMS'
+    
+    def test_hyperscan_prefilter_matches_regex_path(self):
+        """Test the Hyperscan line prefilter leaves the cleaned text unchanged."""
+        pytest.importorskip("hyperscan")
+        
+        text = (
+            "Page 1/30\n4.1 Scope\nThe organization shall.\n© ISO 2015\n"
+            "Draft\n12\n- text © \nISO 9001 body\n  p. 4  \nConfidential\n"
+        ) * 50
+        cleaner = TextCleaner()
+        reference = TextCleaner()
+        reference._hs_db = None
+        
+        assert cleaner._prefilter_lines(text) is not None
+        assert cleaner.clean_text(text) == reference.clean_text(text)
+        assert "Page 1/30" not in cleaner.clean_text(text)
+    
+    def test_shared_cleaner_per_config(self):
+        """Test convenience cleaners are reused per config, not across configs."""
+        config = {'custom_header_patterns': [r'^ACME Corp$']}
+        
+        assert get_cleaner() is get_cleaner(None)
+        assert get_cleaner(config) is get_cleaner(dict(config))
+        assert get_cleaner(config) is not get_cleaner()
+        assert "ACME" not in clean_text("ACME Corp\nBody text.", config)
+        assert "ACME Corp" in clean_text("ACME Corp\nBody text.")
 
 
 class TestSectionParsing:
@@ -128,6 +175,77 @@ Even more text.
             elif section.section_id == "4.1.2":
                 assert section.level == 3
                 assert section.parent_id == "4.1"
+    
+    def test_find_section_by_id(self):
+        """Test section lookup returns the first match and follows list changes."""
+        parser = ISOSectionParser()
+        sections = parser.parse_sections("4 Top\n\n4.1 Scope\n\n4.1 Scope again\n")
+        
+        assert parser.find_section(sections, "4.1") is sections[1]
+        assert parser.find_section(sections, "9.9") is None
+        
+        index = parser.build_section_index(sections)
+        assert index["4.1"] is sections[1]
+        assert "9.9" not in index
+        
+        sections.append(parser.parse_sections("5 Leadership\n")[0])
+        assert parser.find_section(sections, "5").section_name == "Leadership"
+        
+        # In-place replacement is seen too
+        sections[0] = parser.parse_sections("4 Context\n")[0]
+        assert parser.find_section(sections, "4").section_name == "Context"
+    
+    def test_section_bodies_and_header_offsets(self):
+        """Test bodies drop blank lines and headers map to their own page."""
+        parser = ISOSectionParser()
+        
+        text = (
+            "Preamble text\n"
+            "4.1 Scope ..... 2\n"
+            "\n"
+            "4.1 Scope\n"
+            "  First line.\n"
+            "   \n"
+            "  12 requirements apply.\n"
+            "\n"
+            "4.2 Terms\n"
+            "Last line."
+        )
+        page_info = [
+            {'page_number': 1, 'char_start': 0, 'char_end': 33},
+            {'page_number': 2, 'char_start': 33, 'char_end': len(text)}
+        ]
+        
+        sections = parser.parse_sections(text, page_info)
+        
+        assert [s.section_name for s in sections] == ["Scope", "Scope", "Terms"]
+        assert sections[1].text == "First line.\n  12 requirements apply."
+        assert sections[2].text == "Last line."
+        for section in sections:
+            assert text[section.char_start:].startswith(section.section_id)
+        # The body header is on page 2 even though its TOC entry is on page 1
+        assert [s.page_start for s in sections] == [1, 2, 2]
+    
+    def test_hyperscan_header_scan_matches_regex_path(self):
+        """Test the Hyperscan header scan finds the same sections and offsets."""
+        pytest.importorskip("hyperscan")
+        
+        text = (
+            "Préambule\n4 Contexte de l'organisme\n  4.1 Élément ... 3\n"
+            "2023 est l'année.\n4.1.2 Champ\xa0d'application\n12 a\n"
+            "1) liste\n  \n5 Leadership"
+        ) * 20
+        parser = ISOSectionParser()
+        reference = ISOSectionParser()
+        reference._hs_db = None
+        
+        sections = parser.parse_sections(text)
+        
+        assert parser._hs_db is not None
+        assert sections == reference.parse_sections(text)
+        assert len(sections) == 80
+        for section in sections:
+            assert text[section.char_start:].startswith(section.section_id)
 
 
 class TestChunking:
@@ -207,17 +325,588 @@ class TestChunking:
         assert chunk.section_name == 'Application Scope'
         assert chunk.page_start == 5
         assert chunk.document == "ISO 9001"
+    
+    def test_split_token_counts_from_batched_encoding(self):
+        """Test split chunks are sized from one batched sentence encoding."""
+        import tiktoken
+        
+        chunker = DocumentChunker(target_tokens=100, max_tokens=150, overlap_tokens=30)
+        # Byte-level encoding: works offline and counts are easy to check
+        chunker.encoding = tiktoken.Encoding(
+            "bytes", pat_str=r"\S+|\s+",
+            mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={}
+        )
+        sentences = [f"Sentence number {i} is here." for i in range(20)]
+        section = {
+            'section_id': '4.1', 'section_name': 'Large Section', 'text': ' '.join(sentences),
+            'page_start': 1, 'page_end': 3, 'level': 2, 'parent_id': '4'
+        }
+        
+        chunks = chunker.chunk_sections([section], "Test Doc")
+        
+        assert chunker.count_tokens_batch(sentences) == [len(s) for s in sentences]
+        assert len(chunks) > 1
+        for chunk in chunks:
+            chunk_sentences = chunker._split_into_sentences(chunk.text)
+            assert chunk.token_count == sum(len(s) for s in chunk_sentences)
+            assert chunk.token_count <= 100
+    
+    def test_threaded_split_matches_serial(self):
+        """Test splitting long sections on threads keeps the serial output."""
+        import tiktoken
+        
+        chunker = DocumentChunker(target_tokens=100, max_tokens=150, overlap_tokens=30)
+        chunker.encoding = tiktoken.Encoding(
+            "bytes", pat_str=r"\S+|\s+",
+            mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={}
+        )
+        sections = [
+            {'section_id': f'4.{n}', 'section_name': f'Section {n}',
+             'text': ' '.join(f"Clause {n} sentence {i}." for i in range(10 * n + 1)),
+             'page_start': n, 'page_end': n, 'level': 2, 'parent_id': '4'}
+            for n in range(1, 7)
+        ]
+        
+        serial = chunker.chunk_sections(sections, "Test Doc", max_workers=1)
+        threaded = chunker.chunk_sections(sections, "Test Doc", max_workers=4)
+        
+        assert sum(c.total_chunks_in_section > 1 for c in serial) > 0
+        assert threaded == serial
+    
+    def test_encoding_loaded_once_per_process(self, monkeypatch):
+        """Test chunkers share one tokenizer load, including a failed one."""
+        import tiktoken
+        from ml_core.ingest import chunker as chunker_module
+        
+        calls = []
+        
+        def failing_get_encoding(name):
+            calls.append(name)
+            raise ConnectionError("offline")
+        
+        monkeypatch.setattr(chunker_module, "_encodings", {})
+        monkeypatch.setattr(tiktoken, "get_encoding", failing_get_encoding)
+        
+        first = DocumentChunker()
+        second = DocumentChunker()
+        
+        assert first.encoding is None and second.encoding is None
+        assert calls == ["cl100k_base"]
+    
+    def test_iter_chunks_streams_same_chunks(self):
+        """Test iter_chunks yields the chunk_sections output lazily."""
+        chunker = DocumentChunker(target_tokens=100, max_tokens=150)
+        sections = [
+            {'section_id': f'4.{n}', 'section_name': f'Section {n}',
+             'text': 'This is a sentence. ' * (40 * n),
+             'page_start': n, 'page_end': n, 'level': 2, 'parent_id': '4'}
+            for n in range(1, 4)
+        ]
+        
+        stream = chunker.iter_chunks(sections, "Test Doc")
+        first = next(stream)
+        
+        assert first.section_id == '4.1'
+        assert [first] + list(stream) == chunker.chunk_sections(sections, "Test Doc")
+    
+    def test_chunk_document_columns_match_rows(self):
+        """Test columnar chunk output holds the same chunks as the row dicts."""
+        sections = [
+            {'section_id': '4.1', 'section_name': 'Short', 'text': 'A short section.',
+             'page_start': 1, 'page_end': 1, 'level': 2, 'parent_id': '4'},
+            {'section_id': '4.2', 'section_name': 'Long', 'text': 'This is a sentence. ' * 300,
+             'page_start': 2, 'page_end': 4, 'level': 2, 'parent_id': '4'}
+        ]
+        
+        rows = chunk_document(sections, "Test Doc")
+        columns = chunk_document_columns(sections, "Test Doc")
+        
+        assert set(columns) == set(rows[0])
+        assert all(len(values) == len(rows) for values in columns.values())
+        assert [dict(zip(columns, values)) for values in zip(*columns.values())] == rows
+        
+        metadata = ArrowMetadata.from_columns(columns)
+        assert len(metadata) == len(rows)
+        assert metadata[1]['chunk_id'] == rows[1]['chunk_id']
+
+
+class TestIngestion:
+    """Test document ingestion pipeline."""
+    
+    def test_ingest_batch_matches_serial(self):
+        """Test parallel batch ingestion keeps input order and reports failures."""
+        docx = pytest.importorskip("docx")
+        from ml_core.ingest.ingest_pipeline import IngestionPipeline
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for n in range(2):
+                document = docx.Document()
+                document.add_paragraph(f"4.{n} Scope of document {n}")
+                document.add_paragraph("The organization shall determine external issues. " * 5)
+                path = Path(tmpdir) / f"doc{n}.docx"
+                document.save(str(path))
+                paths.append(str(path))
+            paths.append(str(Path(tmpdir) / "missing.docx"))
+            
+            pipeline = IngestionPipeline()
+            serial = pipeline.ingest_batch(paths, max_workers=1, return_exceptions=True)
+            parallel = pipeline.ingest_batch(paths, max_workers=2, return_exceptions=True)
+            
+            assert isinstance(parallel[2], FileNotFoundError)
+            assert parallel[0]['chunks']
+            assert [r['chunks'] for r in parallel[:2]] == [r['chunks'] for r in serial[:2]]
+            assert parallel[1]['document_name'] == "doc1"
+            with pytest.raises(FileNotFoundError):
+                pipeline.ingest_batch(paths, max_workers=2)
+    
+    def test_ingest_document_async_matches_sync(self):
+        """Test async ingestion returns and saves the same outputs."""
+        docx = pytest.importorskip("docx")
+        from ml_core.ingest.ingest_pipeline import IngestionPipeline
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            document = docx.Document()
+            document.add_paragraph("4.1 Scope")
+            document.add_paragraph("The organization shall determine external issues.")
+            path = str(Path(tmpdir) / "doc.docx")
+            document.save(path)
+            
+            pipeline = IngestionPipeline()
+            expected = pipeline.ingest_document(path)
+            result = asyncio.run(pipeline.ingest_document_async(path, output_dir=tmpdir))
+            
+            assert result['chunks'] == expected['chunks']
+            assert pipeline.load_chunks(str(Path(tmpdir) / "doc_chunks.json")) == result['chunks']
+            with open(Path(tmpdir) / "doc_metadata.json", encoding='utf-8') as f:
+                assert json.load(f)['statistics'] == json.loads(json.dumps(result['statistics']))
+
+
+class TestDocumentExtraction:
+    """Test multi-format document extraction."""
+    
+    def test_file_type_from_signature(self):
+        """Test mislabeled files are routed by their content, not suffix."""
+        docx = pytest.importorskip("docx")
+        from ml_core.ingest.document_extractor import MultiFormatExtractor
+        
+        extractor = MultiFormatExtractor()
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            word_as_pdf = Path(tmpdir) / "report.pdf"
+            document = docx.Document()
+            document.add_paragraph("4.1 Scope")
+            document.save(str(word_as_pdf))
+            
+            pdf_as_docx = Path(tmpdir) / "report.docx"
+            pdf_as_docx.write_bytes(b"%PDF-1.7\n")
+            
+            unknown = Path(tmpdir) / "notes.xls"
+            unknown.write_bytes(b"plain text")
+            
+            assert extractor._detect_file_type(word_as_pdf) == 'word'
+            assert extractor._detect_file_type(pdf_as_docx) == 'pdf'
+            assert extractor._detect_file_type(unknown) == 'excel'
+            assert extractor.extract_document(str(word_as_pdf)).text == "4.1 Scope"
+    
+    def test_word_tables_kept_in_document_order(self):
+        """Test Word tables are extracted where they appear, not appended."""
+        docx = pytest.importorskip("docx")
+        from ml_core.ingest.document_extractor import MultiFormatExtractor
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            document = docx.Document()
+            document.add_paragraph("4.1 Scope")
+            table = document.add_table(rows=1, cols=2)
+            table.cell(0, 0).text = "Clause"
+            table.cell(0, 1).text = "Requirement"
+            document.add_paragraph("4.2 Terms")
+            path = str(Path(tmpdir) / "doc.docx")
+            document.save(path)
+            
+            content = MultiFormatExtractor().extract_document(path)
+        
+        text = content.text
+        assert text == "4.1 Scope\n\nClause\n\nRequirement\n\n4.2 Terms"
+        # Pages are offsets into the text, not copies of it
+        assert content.pages == [{
+            'page_number': 1, 'char_start': 0, 'char_end': len(text),
+            'is_scanned': False, 'char_count': len(text)
+        }]
+    
+    def test_convenience_extraction_reuses_extractor(self, monkeypatch):
+        """Test extract_document doesn't build an extractor per call."""
+        docx = pytest.importorskip("docx")
+        from ml_core.ingest import document_extractor
+        
+        def fail_init(self):
+            raise AssertionError("extractor constructed per call")
+        
+        monkeypatch.setattr(document_extractor.MultiFormatExtractor, "__init__", fail_init)
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            document = docx.Document()
+            document.add_paragraph("4.1 Scope")
+            path = str(Path(tmpdir) / "doc.docx")
+            document.save(path)
+            
+            for _ in range(2):
+                assert document_extractor.extract_document(path).text == "4.1 Scope"
+    
+    def test_extraction_cache_keyed_by_file_metadata(self, monkeypatch):
+        """Test unchanged files reuse their extraction and changed ones don't."""
+        import os
+        from ml_core.ingest import document_extractor
+        from ml_core.ingest.document_extractor import DocumentContent, extract_document_cached
+        
+        calls = []
+        
+        def fake_extract(file_path):
+            calls.append(file_path)
+            text = Path(file_path).read_text()
+            return DocumentContent(
+                text=text, pages=[{'page_number': 1, 'char_count': len(text)}],
+                total_pages=1, total_chars=len(text),
+                extraction_method='fake', file_type='pdf'
+            )
+        
+        monkeypatch.setattr(document_extractor, "extract_document", fake_extract)
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "doc.pdf"
+            cache_dir = str(Path(tmpdir) / "cache")
+            path.write_text("first version")
+            
+            first = extract_document_cached(str(path), cache_dir)
+            second = extract_document_cached(str(path), cache_dir)
+            
+            assert second == first
+            assert len(calls) == 1
+            
+            path.write_text("second version!")
+            os.utime(path, ns=(0, path.stat().st_mtime_ns + 1))
+            
+            assert extract_document_cached(str(path), cache_dir).text == "second version!"
+            assert len(calls) == 2
+            
+            # Different OCR settings are a different entry
+            extractor = document_extractor.MultiFormatExtractor(tesseract_lang='eng')
+            monkeypatch.setattr(extractor, "extract_document", fake_extract)
+            extract_document_cached(str(path), cache_dir, extractor)
+            extract_document_cached(str(path), cache_dir, extractor)
+            assert len(calls) == 3
+            
+            # Only the latest entry per path is kept
+            other = Path(tmpdir) / "other.pdf"
+            other.write_text("other")
+            extract_document_cached(str(other), cache_dir)
+            assert len(list(Path(cache_dir).glob('*.json'))) == 2
+            assert not list(Path(cache_dir).glob('*.tmp'))
+            
+            assert document_extractor.clear_extraction_cache(cache_dir) == 2
+            extract_document_cached(str(path), cache_dir)
+            assert len(calls) == 5
+    
+    def test_extraction_cache_location(self):
+        """Test the pipeline's cache directory and the switch that disables it."""
+        from ml_core.ingest.ingest_pipeline import IngestionPipeline
+        
+        assert IngestionPipeline()._extraction_cache(None) is None
+        assert IngestionPipeline()._extraction_cache("out") == str(Path("out") / ".extraction_cache")
+        assert IngestionPipeline({'extraction_cache_dir': "cache"})._extraction_cache("out") == "cache"
+        assert IngestionPipeline({'disable_extraction_cache': True})._extraction_cache("out") is None
+    
+    def test_pdf_pages_extracted_in_parallel_keep_order(self, monkeypatch):
+        """Test only scanned pages go to OCR workers and results match the serial loop."""
+        fitz = pytest.importorskip("fitz")
+        from ml_core.ingest import pdf_to_text
+        from ml_core.ingest.pdf_to_text import PDFExtractor
+        
+        pools = []
+        
+        class InlinePool:
+            """Runs the pool's work in this process, recording the page runs."""
+            def __init__(self, max_workers):
+                pools.append((max_workers, []))
+            
+            def __enter__(self):
+                return self
+            
+            def __exit__(self, *exc):
+                return False
+            
+            def map(self, fn, *iterables):
+                pools[-1][1].extend(iterables[1])
+                return map(fn, *iterables)
+        
+        def ocr_page(self, pdf_doc, page_num):
+            return f"OCR page {page_num + 1}"
+        
+        monkeypatch.setattr(pdf_to_text, "ProcessPoolExecutor", InlinePool)
+        monkeypatch.setattr(PDFExtractor, "_ocr_page", ocr_page)
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = str(Path(tmpdir) / "doc.pdf")
+            text_only = str(Path(tmpdir) / "text.pdf")
+            pdf = fitz.open()
+            for i in range(6):
+                page = pdf.new_page()
+                if i in (1, 4, 5):
+                    continue  # no text layer: a scanned page
+                for j in range(4):
+                    page.insert_text(
+                        (72, 72 + 14 * j),
+                        f"{i + 1}.{j} The organization shall determine the scope of page {i + 1}",
+                        fontsize=10
+                    )
+            pdf.save(path)
+            pdf.delete_pages([1, 4, 5])
+            pdf.save(text_only)
+            pdf.close()
+            
+            serial = PDFExtractor(use_paddleocr=False).extract_from_pdf(path)
+            assert pools == []
+            parallel = PDFExtractor(use_paddleocr=False, max_workers=2).extract_from_pdf(path)
+            assert [(workers, [list(run) for run in runs]) for workers, runs in pools] == [
+                (2, [[1], [4], [5]])
+            ]
+            
+            # A text-only PDF never starts a pool, even when fan-out is enabled
+            PDFExtractor(use_paddleocr=False, max_workers=2).extract_from_pdf(text_only)
+            assert len(pools) == 1
+        
+        assert parallel == serial
+        assert [p.page_number for p in parallel.pages] == list(range(1, 7))
+        assert parallel.pages[3].text.startswith("4.0 The organization")
+        assert parallel.pages[4].text == "OCR page 5"
+        assert parallel.scanned_pages == 3
+        # Per-page fields are columns; page(i) gives the PageContent view
+        assert parallel.page(3) == parallel.pages[3]
+        assert parallel.char_counts.dtype == np.int32
+        assert parallel.total_chars == sum(len(text) for text in parallel.texts)
+    
+    def test_pdf_ocr_workers_keep_order(self):
+        """Test scanned pages OCR'd in real worker processes come back in page order."""
+        fitz = pytest.importorskip("fitz")
+        from ml_core.ingest.pdf_to_text import PDFExtractor
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = str(Path(tmpdir) / "doc.pdf")
+            pdf = fitz.open()
+            for i in range(4):
+                page = pdf.new_page()
+                if i % 2:
+                    page.insert_text((72, 72), f"{i + 1}.0 Terms and definitions " * 8, fontsize=6)
+            pdf.save(path)
+            pdf.close()
+            
+            serial = PDFExtractor(use_paddleocr=False).extract_from_pdf(path)
+            parallel = PDFExtractor(use_paddleocr=False, max_workers=2).extract_from_pdf(path)
+        
+        assert parallel == serial
+        assert parallel.is_scanned.tolist() == [True, False, True, False]
+    
+    def test_pdf_pages_streamed_and_returned_as_offsets(self):
+        """Test iter_pages streams the same pages and results hold page offsets."""
+        fitz = pytest.importorskip("fitz")
+        from ml_core.ingest.pdf_to_text import PDFExtractor, extract_text_from_pdf
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = str(Path(tmpdir) / "doc.pdf")
+            pdf = fitz.open()
+            for i in range(3):
+                page = pdf.new_page()
+                for j in range(4):
+                    page.insert_text((72, 72 + 14 * j), f"{i + 1}.{j} Requirements for the quality management system")
+            pdf.save(path)
+            pdf.close()
+            
+            extractor = PDFExtractor(use_paddleocr=False, max_workers=1)
+            streamed = extractor.iter_pages(path)
+            first = next(streamed)
+            assert first.page_number == 1
+            assert [first] + list(streamed) == extractor.extract_from_pdf(path).pages
+            
+            result = extract_text_from_pdf(path, use_paddleocr=False, max_workers=1)
+        
+        full_text = result['full_text']
+        for page in result['pages']:
+            assert 'text' not in page
+            page_text = full_text[page['char_start']:page['char_end']]
+            assert page_text.startswith(f"{page['page_number']}.0 Requirements")
+            assert len(page_text) == page['char_count']
+        assert result['pages'][-1]['char_end'] == len(full_text)
+    
+    def test_ocr_engines_reused_across_pages_and_extractors(self, monkeypatch):
+        """Test OCR engines load once and shared extractors keep them warm."""
+        pytest.importorskip("fitz")
+        from PIL import Image
+        from ml_core.ingest import pdf_to_text
+        
+        created = []
+        paddle_kwargs = []
+        
+        class FakeTessAPI:
+            def __init__(self, lang, psm):
+                created.append(lang)
+                self.ended = False
+            
+            def SetImage(self, image):
+                self.size = image.size
+            
+            def GetUTF8Text(self):
+                return f"{self.size[0]}x{self.size[1]}"
+            
+            def End(self):
+                self.ended = True
+        
+        monkeypatch.setattr(pdf_to_text, "PADDLEOCR_AVAILABLE", True)
+        class FakePaddle:
+            def __init__(self, **kwargs):
+                paddle_kwargs.append(kwargs)
+                self.shapes = []
+            
+            def ocr(self, img_array, cls=True):
+                self.shapes.append(img_array.shape)
+                return [[]]
+        
+        monkeypatch.setattr(pdf_to_text, "PaddleOCR", FakePaddle, raising=False)
+        monkeypatch.setattr(pdf_to_text, "_extractors", {})
+        monkeypatch.setattr(pdf_to_text, "_cuda_available", lambda: False)
+        monkeypatch.setattr(pdf_to_text, "_paddle_engines", {})
+        monkeypatch.setattr(pdf_to_text, "TESSEROCR_AVAILABLE", True)
+        monkeypatch.setattr(pdf_to_text, "PyTessBaseAPI", FakeTessAPI, raising=False)
+        monkeypatch.setattr(pdf_to_text, "PSM", type("PSM", (), {"AUTO": 3}), raising=False)
+        
+        first = pdf_to_text.PDFExtractor()
+        assert pdf_to_text.PDFExtractor().paddle_ocr is first.paddle_ocr
+        assert len(paddle_kwargs) == 1 and paddle_kwargs[0]['use_gpu'] is False
+        
+        first.warmup()
+        assert first.paddle_ocr.shapes == [(32, 64, 3)]
+        assert pdf_to_text.get_pdf_extractor() is pdf_to_text.get_pdf_extractor()
+        assert pdf_to_text.get_pdf_extractor() is not pdf_to_text.get_pdf_extractor(use_paddleocr=False)
+        
+        extractor = pdf_to_text.PDFExtractor(use_paddleocr=False)
+        assert extractor._tesseract_image(Image.new("RGB", (4, 2))) == "4x2"
+        assert extractor._tesseract_image(Image.new("RGB", (3, 5))) == "3x5"
+        assert created == ['eng+fra']
+        
+        api = extractor._get_tess_api()
+        extractor.close()
+        assert api.ended and extractor._get_tess_api() is not api
+    
+    def test_shared_paddleocr_serialized_across_threads(self, monkeypatch):
+        """Test threads load the shared PaddleOCR engine once and never run it concurrently."""
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from ml_core.ingest import pdf_to_text
+        
+        created = []
+        running = []
+        overlaps = []
+        
+        class FakePaddle:
+            def __init__(self, **kwargs):
+                time.sleep(0.01)
+                created.append(self)
+            
+            def ocr(self, img_array, cls=True):
+                running.append(1)
+                overlaps.append(len(running))
+                time.sleep(0.005)
+                running.pop()
+                return [[[None, ("4.1 Scope", 0.9)]]]
+        
+        monkeypatch.setattr(pdf_to_text, "PADDLEOCR_AVAILABLE", True)
+        monkeypatch.setattr(pdf_to_text, "PaddleOCR", FakePaddle, raising=False)
+        monkeypatch.setattr(pdf_to_text, "_cuda_available", lambda: False)
+        monkeypatch.setattr(pdf_to_text, "_paddle_engines", {})
+        monkeypatch.setattr(pdf_to_text, "_paddle_lock", threading.Lock())
+        
+        img_array = np.zeros((32, 64, 3), dtype=np.uint8)
+        
+        def ocr(_):
+            return pdf_to_text.PDFExtractor()._paddleocr_image(img_array)
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            texts = list(executor.map(ocr, range(8)))
+        
+        assert texts == ["4.1 Scope"] * 8
+        assert len(created) == 1
+        assert max(overlaps) == 1
+    
+    def test_full_page_scan_ocr_without_rendering(self):
+        """Test full-page scans are OCR'd as stored, others rendered to their image DPI."""
+        fitz = pytest.importorskip("fitz")
+        import io
+        from PIL import Image
+        from ml_core.ingest.pdf_to_text import PDFExtractor
+        
+        def png(width, height):
+            buffer = io.BytesIO()
+            Image.new("RGB", (width, height), "white").save(buffer, "PNG")
+            return buffer.getvalue()
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = str(Path(tmpdir) / "scan.pdf")
+            pdf = fitz.open()
+            for width, height, full_page in [
+                (1240, 1754, True),   # 150 DPI scan
+                (620, 877, True),     # 75 DPI scan
+                (1240, 877, False),   # 150 DPI image on half the page
+                (620, 438, False),    # 75 DPI image on half the page
+                (0, 0, False)         # nothing but vector content
+            ]:
+                page = pdf.new_page(width=595, height=842)
+                rect = page.rect if full_page else fitz.Rect(0, 0, 595, 421)
+                if width:
+                    page.insert_image(rect, stream=png(width, height))
+            pdf.save(path)
+            pdf.close()
+            
+            extractor = PDFExtractor(use_paddleocr=False, max_workers=1)
+            sizes = []
+            extractor._tesseract_image = lambda image: sizes.append(image.size) or ""
+            result = extractor.extract_from_pdf(path)
+        
+        assert result.scanned_pages == 5
+        # Renders target 200 DPI (capped at 2x) but never upsample past the
+        # sharpest image on the page
+        assert sizes == [(1240, 1754), (620, 877), (1190, 1684), (620, 878), (1190, 1684)]
+    
+    def test_paddleocr_reads_rendered_pixels_as_array(self):
+        """Test PaddleOCR gets the rendered page as an RGB array, not a PIL image."""
+        fitz = pytest.importorskip("fitz")
+        from ml_core.ingest.pdf_to_text import PDFExtractor
+        
+        class FakePaddle:
+            def ocr(self, img_array, cls=True):
+                self.img_array = img_array.copy()  # the view dies with the pixmap
+                return [[[None, ("4.1 Scope", 0.9)], [None, ("Text", 0.8)]]]
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = str(Path(tmpdir) / "blank.pdf")
+            pdf = fitz.open()
+            pdf.new_page(width=595, height=842).draw_rect(fitz.Rect(10, 10, 50, 50), fill=(1, 0, 0))
+            pdf.save(path)
+            
+            extractor = PDFExtractor(use_paddleocr=False, max_workers=1)
+            extractor.use_paddleocr, extractor.paddle_ocr = True, FakePaddle()
+            text = extractor._ocr_page(pdf, 0)
+            pdf.close()
+        
+        img_array = extractor.paddle_ocr.img_array
+        assert text == "4.1 Scope\nText"
+        assert isinstance(img_array, np.ndarray)
+        assert img_array.shape == (1684, 1190, 3) and img_array.dtype == np.uint8
+        assert tuple(img_array[40, 40]) == (255, 0, 0)
 
 
 class TestEmbeddings:
     """Test embedding generation."""
     
-    @pytest.fixture
-    def embedder(self):
-        """Create embedder instance."""
-        # Use small model for testing
-        return Embedder(model_name="BAAI/bge-small-en-v1.5", device="cpu")
-    
     def test_single_embedding(self, embedder):
         """Test single text embedding."""
         text = "This is a test sentence."
@@ -246,15 +935,110 @@ class TestEmbeddings:
         text2 = "External issues must be determined by the organization."
         text3 = "Completely different topic about cats."
         
-        emb1 = embedder.embed_query(text1)
-        emb2 = embedder.embed_query(text2)
-        emb3 = embedder.embed_query(text3)
+        # One forward pass for all three, with the same query instruction as embed_query
+        emb1, emb2, emb3 = embedder.embed_queries([text1, text2, text3])
         
         sim_12 = embedder.compute_similarity(emb1, emb2)
         sim_13 = embedder.compute_similarity(emb1, emb3)
         
         # Similar sentences should have higher similarity
         assert sim_12 > sim_13
+    
+    def test_length_sorted_batches_keep_input_order(self):
+        """Test texts are batched by length but returned in input order."""
+        class StubModel:
+            def __init__(self):
+                self.batches = []
+            
+            def encode(self, texts, **kwargs):
+                self.batches.append(list(texts))
+                return torch.tensor([[len(t), 1.0] for t in texts])
+        
+        embedder = Embedder.__new__(Embedder)
+        embedder.backend = "torch"
+        embedder.device = "cpu"
+        embedder.use_bf16 = False
+        embedder.use_fp16 = False
+        embedder.model = StubModel()
+        embedder.embedding_dim = 2
+        
+        texts = ["a", "bbbbbb", "cc", "dddd", "e"]
+        embeddings = embedder.embed_texts(texts, batch_size=2, normalize=False)
+        
+        assert embedder.model.batches == [["a", "e"], ["cc", "dddd"], ["bbbbbb"]]
+        assert embeddings[:, 0].tolist() == [1, 6, 2, 4, 1]
+        
+        # Duplicates are embedded once and copied back into place
+        embedder.model.batches = []
+        embeddings = embedder.embed_texts(["cc", "a", "cc", "a"], batch_size=4, normalize=False)
+        
+        assert embedder.model.batches == [["a", "cc"]]
+        assert embeddings[:, 0].tolist() == [2, 1, 2, 1]
+    
+    def test_model_loaded_once_per_process(self, monkeypatch):
+        """Test Embedder instances with the same model share one loaded model."""
+        from ml_core.embeddings import embedder as embedder_module
+        
+        loads = []
+        
+        class StubSentenceTransformer:
+            def __init__(self, model_name, device=None):
+                loads.append((model_name, device))
+            
+            def get_sentence_embedding_dimension(self):
+                return 8
+        
+        monkeypatch.setattr(embedder_module, "SentenceTransformer", StubSentenceTransformer)
+        monkeypatch.setattr(Embedder, "_model_cache", {})
+        
+        first = Embedder(model_name="stub-model")
+        second = Embedder(model_name="stub-model")
+        Embedder(model_name="stub-model", device="cuda")
+        
+        assert first.model is second.model
+        assert loads == [("stub-model", "cpu"), ("stub-model", "cuda")]
+    
+    def test_batch_similarities_match_per_query(self):
+        """Test batched similarities equal one compute_similarities call per query."""
+        embedder = Embedder.__new__(Embedder)
+        queries = np.random.randn(3, 8).astype('float32')
+        corpus = np.random.randn(10, 8).astype('float32')
+        
+        batch = embedder.compute_similarities_batch(queries, corpus)
+        
+        assert batch.shape == (3, 10)
+        for i in range(3):
+            assert np.allclose(batch[i], embedder.compute_similarities(queries[i], corpus), atol=1e-5)
+
+
+class TestQueryBatcher:
+    """Test query coalescing."""
+    
+    class StubEmbedder:
+        """Records each batch instead of running a model."""
+        
+        def __init__(self):
+            self.batches = []
+        
+        def embed_queries(self, queries):
+            self.batches.append(list(queries))
+            return np.array([[float(len(q))] for q in queries], dtype='float32')
+    
+    def test_concurrent_queries_share_one_batch(self):
+        """Test concurrent queries are embedded in a single call."""
+        stub = self.StubEmbedder()
+        batcher = QueryBatcher(stub, max_batch=8, max_wait=0.05)
+        queries = ["a", "bb", "ccc"]
+        
+        async def run():
+            results = await asyncio.gather(*[batcher.embed(q) for q in queries])
+            await batcher.stop()
+            return results
+        
+        results = asyncio.run(run())
+        
+        assert stub.batches == [queries]
+        assert [r[0] for r in results] == [1.0, 2.0, 3.0]
 
 
 class TestFAISSIndex:
@@ -266,7 +1050,7 @@ class TestFAISSIndex:
         n_docs = 10
         dim = 384
         embeddings = np.random.randn(n_docs, dim).astype('float32')
-        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        faiss.normalize_L2(embeddings)
         
         # Create metadata
         metadata = [
@@ -297,7 +1081,7 @@ class TestFAISSIndex:
         n_docs = 20
         dim = 384
         embeddings = np.random.randn(n_docs, dim).astype('float32')
-        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        faiss.normalize_L2(embeddings)
         
         metadata = [{'chunk_id': f'chunk_{i}', 'text': f'Text {i}'} for i in range(n_docs)]
         
@@ -336,6 +1120,397 @@ class TestFAISSIndex:
             # Check loaded index
             assert loaded_index.ntotal == index.ntotal
             assert len(loaded_metadata) == len(id_to_metadata)
+    
+    def test_mmap_index_survives_rewrite(self):
+        """Test a memory-mapped index stays usable when the file is rebuilt."""
+        embeddings = np.random.randn(50, 16).astype('float32')
+        metadata = [{'chunk_id': f'chunk_{i}'} for i in range(50)]
+        
+        builder = FAISSIndexBuilder()
+        index, id_to_metadata = builder.build_index(embeddings, metadata)
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            builder.save_index(index, id_to_metadata, tmpdir, "test_index")
+            mapped, _ = builder.load_index(tmpdir, "test_index")
+            
+            # Rebuild over the same files while the old index is mapped
+            smaller, smaller_metadata = builder.build_index(embeddings[:10], metadata[:10])
+            builder.save_index(smaller, smaller_metadata, tmpdir, "test_index")
+            
+            _, indices = mapped.search(embeddings[:1], 1)
+            assert mapped.ntotal == 50
+            assert indices[0][0] == 0
+            
+            reloaded, _ = builder.load_index(tmpdir, "test_index", preload=True)
+            assert reloaded.ntotal == 10
+    
+    def test_append_to_index(self):
+        """Test appending chunks keeps existing vectors and skips indexed ones."""
+        def make_chunks(start, n, document='ISO 9001'):
+            return [
+                {
+                    'chunk_id': f'chunk_{i}', 'text': f'text {i}', 'section_id': '1',
+                    'section_name': 'Scope', 'page_start': 1, 'page_end': 1,
+                    'document': document, 'token_count': 2
+                }
+                for i in range(start, start + n)
+            ]
+        
+        embeddings = np.random.randn(8, 16).astype('float32')
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # No index yet: append builds one
+            append_to_index(make_chunks(0, 5), embeddings[:5], tmpdir)
+            index, metadata = append_to_index(make_chunks(5, 3, 'ISO 14001'), embeddings[5:], tmpdir)
+            
+            assert index.ntotal == 8
+            assert [m['chunk_id'] for m in metadata] == [f'chunk_{i}' for i in range(8)]
+            
+            loaded, loaded_metadata = FAISSIndexBuilder().load_index(tmpdir)
+            _, indices = loaded.search(embeddings[6:7], 1)
+            assert loaded_metadata[indices[0][0]]['chunk_id'] == 'chunk_6'
+            
+            # Re-ingesting an indexed document, or reusing a chunk_id, adds nothing
+            index, _ = append_to_index(make_chunks(0, 5), embeddings[:5], tmpdir)
+            assert index.ntotal == 8
+            chunks = make_chunks(7, 2, 'ISO 27001') + make_chunks(20, 1, 'ISO 27001') * 2
+            index, metadata = append_to_index(chunks, embeddings[:4], tmpdir)
+            assert index.ntotal == 10
+            assert [m['chunk_id'] for m in metadata][-2:] == ['chunk_8', 'chunk_20']
+            
+            assert not list(Path(tmpdir).glob('*.tmp'))
+    
+    def test_arrow_metadata_rows(self):
+        """Test Arrow-backed metadata behaves like a list of row dicts."""
+        pytest.importorskip("pyarrow")
+        chunks = [
+            {
+                'chunk_id': f'chunk_{i}', 'text': f'text {i}', 'section_id': '4.1',
+                'section_name': 'Context', 'page_start': i, 'page_end': i,
+                'document': 'ISO 9001', 'token_count': 2, 'char_start': 0
+            }
+            for i in range(4)
+        ]
+        
+        metadata = ArrowMetadata.from_chunks(chunks)
+        
+        assert len(metadata) == 4
+        assert metadata[np.int64(2)]['text'] == 'text 2'
+        assert metadata[-1]['chunk_id'] == 'chunk_3'
+        assert 'char_start' not in metadata[0]
+        assert [m['page_start'] for m in metadata] == [0, 1, 2, 3]
+        assert metadata.column('chunk_id') == [f'chunk_{i}' for i in range(4)]
+        assert len(metadata.extend(chunks[:1])) == 5
+    
+    def test_metadata_json_fallback(self, monkeypatch):
+        """Test metadata round-trips through JSON when pyarrow is missing."""
+        from ml_core.embeddings import build_faiss
+        monkeypatch.setattr(build_faiss, "PYARROW_AVAILABLE", False)
+        
+        embeddings = np.random.randn(5, 16).astype('float32')
+        metadata = [{'chunk_id': f'chunk_{i}', 'page_start': i} for i in range(5)]
+        
+        builder = FAISSIndexBuilder()
+        index, id_to_metadata = builder.build_index(embeddings, metadata)
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            builder.save_index(index, id_to_metadata, tmpdir, "test_index")
+            assert (Path(tmpdir) / "test_index_metadata.json").exists()
+            
+            _, loaded_metadata = builder.load_index(tmpdir, "test_index")
+            assert loaded_metadata[3] == {'chunk_id': 'chunk_3', 'page_start': 3}
+    
+    def test_load_legacy_dict_metadata(self):
+        """Test metadata saved as an {"id": row} JSON dict loads as a list."""
+        embeddings = np.random.randn(3, 16).astype('float32')
+        builder = FAISSIndexBuilder()
+        index, _ = builder.build_index(embeddings, [{}] * 3)
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            faiss.write_index(index, str(Path(tmpdir) / "test_index.bin"))
+            legacy = {str(i): {'chunk_id': f'chunk_{i}'} for i in range(3)}
+            with open(Path(tmpdir) / "test_index_metadata.json", 'w') as f:
+                json.dump(legacy, f)
+            
+            _, loaded_metadata = builder.load_index(tmpdir, "test_index")
+            assert loaded_metadata == [{'chunk_id': f'chunk_{i}'} for i in range(3)]
+
+    def test_flat_cosine_scalar_quantized(self):
+        """Test flat cosine index stores 8-bit codes and keeps exact ranking."""
+        n_docs = 20
+        dim = 384
+        embeddings = np.random.randn(n_docs, dim).astype('float32')
+        faiss.normalize_L2(embeddings)
+        metadata = [{'chunk_id': f'chunk_{i}'} for i in range(n_docs)]
+        
+        builder = FAISSIndexBuilder(index_type="flat", metric="cosine")
+        index, _ = builder.build_index(embeddings, metadata)
+        
+        assert isinstance(index, faiss.IndexPreTransform)
+        base = faiss.downcast_index(index.index)
+        assert isinstance(base, faiss.IndexScalarQuantizer)
+        assert base.code_size == dim
+        
+        _, indices = index.search(embeddings[3:4], 1)
+        assert indices[0][0] == 3
+    
+    def test_cosine_index_normalizes_inputs(self):
+        """Test cosine indexes accept un-normalized embeddings."""
+        embeddings = np.random.randn(20, 32).astype('float32')
+        scaled = embeddings * np.random.uniform(0.1, 10, size=(20, 1)).astype('float32')
+        metadata = [{'chunk_id': f'chunk_{i}'} for i in range(20)]
+        
+        builder = FAISSIndexBuilder(index_type="flat", metric="cosine", sq_type=None)
+        index, _ = builder.build_index(scaled, metadata)
+        
+        scores, indices = index.search(embeddings[5:6] * 3, 1)
+        assert indices[0][0] == 5
+        assert scores[0][0] == pytest.approx(1.0, abs=1e-4)
+
+    def test_compressed_index_falls_back_to_flat(self):
+        """Test small corpora skip PQ training and use an exact index."""
+        n_docs = 50
+        dim = 64
+        embeddings = np.random.randn(n_docs, dim).astype('float32')
+        metadata = [{'chunk_id': f'chunk_{i}'} for i in range(n_docs)]
+        
+        builder = FAISSIndexBuilder(index_type="ivfpq", metric="cosine", m_pq=8)
+        index, _ = builder.build_index(embeddings, metadata)
+        
+        assert faiss.try_extract_index_ivf(index) is None
+        assert index.ntotal == n_docs
+
+    def test_ivfpq_nprobe_persisted(self):
+        """Test IVF-PQ index is trained and nprobe survives save/load."""
+        n_docs = FAISSIndexBuilder.COMPRESSED_MIN_DOCS
+        dim = 32
+        embeddings = np.random.randn(n_docs, dim).astype('float32')
+        metadata = [{'chunk_id': f'chunk_{i}'} for i in range(n_docs)]
+        
+        builder = FAISSIndexBuilder(index_type="ivfpq", metric="cosine", nlist=64, m_pq=4)
+        index, id_to_metadata = builder.build_index(embeddings, metadata)
+        
+        assert index.ntotal == n_docs
+        assert faiss.extract_index_ivf(index).nprobe == 2
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            builder.save_index(index, id_to_metadata, tmpdir, "test_index")
+            loaded_index, _ = builder.load_index(tmpdir, "test_index")
+        
+            assert faiss.extract_index_ivf(loaded_index).nprobe == 2
+    
+    def test_ivfpq_similar_chunks_after_load(self):
+        """Test IVF-PQ vectors can be reconstructed by id for similar-chunk lookups."""
+        n_docs = FAISSIndexBuilder.COMPRESSED_MIN_DOCS
+        dim = 32
+        embeddings = np.random.randn(n_docs, dim).astype('float32')
+        metadata = [
+            {
+                'chunk_id': f'chunk_{i}', 'text': f'text {i}', 'section_id': '1',
+                'section_name': 'Scope', 'page_start': 1, 'document': 'ISO 9001'
+            }
+            for i in range(n_docs)
+        ]
+        
+        builder = FAISSIndexBuilder(index_type="ivfpq", metric="cosine", nlist=64, m_pq=4)
+        index, id_to_metadata = builder.build_index(embeddings, metadata)
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            builder.save_index(index, id_to_metadata, tmpdir, "test_index")
+            loaded_index, loaded_metadata = builder.load_index(tmpdir, "test_index")
+            
+            embedder = type("Embedder", (), {"embedding_dim": dim})()
+            engine = SemanticSearch(loaded_index, loaded_metadata, embedder)
+            similar = engine.get_similar_chunks('chunk_5', k=3)
+        
+        assert len(similar) == 3
+        assert all(hit['document'] == 'ISO 9001' for hit in similar)
+    
+    def test_auto_index_type_by_corpus_size(self):
+        """Test "auto" picks flat, HNSW or IVF-PQ from the vector count."""
+        builder = FAISSIndexBuilder(index_type="auto")
+        
+        assert builder.resolve_index_type(5_000, 384)[0] == "flat"
+        assert builder.resolve_index_type(50_000, 384)[0] == "hnsw"
+        assert builder.resolve_index_type(4_000_000, 384) == ("ivfpq", 2000, 48)
+
+
+class TestAnswerCache:
+    """Test /ask answer caching."""
+    
+    def test_exact_hit_normalizes_query(self):
+        """Test exact lookups ignore case and surrounding whitespace."""
+        cache = AnswerCache()
+        cache.put(AnswerCache.make_key("What is ISO 9001?", 5, 512, 0.7), {'answer': 'A'})
+        
+        assert cache.get(AnswerCache.make_key("  what is iso 9001?", 5, 512, 0.7)) == {'answer': 'A'}
+        assert cache.get(AnswerCache.make_key("What is ISO 9001?", 3, 512, 0.7)) is None
+    
+    def test_semantic_hit_requires_same_params(self):
+        """Test paraphrase lookup by embedding similarity."""
+        cache = AnswerCache(similarity_threshold=0.97)
+        emb = np.random.randn(16).astype('float32')
+        cache.put(AnswerCache.make_key("scope of iso 9001", 5, 512, 0.7), {'answer': 'A'}, emb)
+        
+        near = emb + 0.01 * np.random.randn(16).astype('float32')
+        assert cache.get_similar(AnswerCache.make_key("iso 9001 scope", 5, 512, 0.7), near) == {'answer': 'A'}
+        assert cache.get_similar(AnswerCache.make_key("iso 9001 scope", 5, 256, 0.7), near) is None
+        assert cache.get_similar(AnswerCache.make_key("other", 5, 512, 0.7), -emb) is None
+    
+    def test_lru_eviction(self):
+        """Test least recently used entries are evicted, including from semantic lookup."""
+        cache = AnswerCache(max_entries=2)
+        embs = np.eye(3, dtype='float32')
+        for i in range(3):
+            cache.put(AnswerCache.make_key(f"q{i}", 5, 512, 0.7), {'answer': i}, embs[i])
+        
+        assert len(cache) == 2
+        assert cache.get(AnswerCache.make_key("q0", 5, 512, 0.7)) is None
+        assert cache.get_similar(AnswerCache.make_key("x", 5, 512, 0.7), embs[0]) is None
+        assert cache.get_similar(AnswerCache.make_key("x", 5, 512, 0.7), embs[2]) == {'answer': 2}
+
+
+class TestSemanticSearch:
+    """Test SemanticSearch caching and batching."""
+    
+    class StubEmbedder:
+        """Maps known queries to fixed vectors and counts calls."""
+        
+        embedding_dim = 8
+        
+        def __init__(self, vectors):
+            self.vectors = vectors
+            self.calls = 0
+        
+        def embed_query(self, query):
+            self.calls += 1
+            return self.vectors[query]
+    
+    def _engine(self, vectors):
+        embeddings = np.eye(8, dtype='float32')
+        metadata = [
+            {
+                'chunk_id': f'chunk_{i}', 'text': f'text {i}', 'section_id': str(i),
+                'section_name': 'Scope', 'page_start': 1, 'document': 'ISO 9001'
+            }
+            for i in range(8)
+        ]
+        index = faiss.IndexFlatIP(8)
+        index.add(embeddings)
+        return SemanticSearch(index, metadata, self.StubEmbedder(vectors))
+    
+    def test_exact_repeat_skips_embedding(self):
+        """Test a repeated query is served from the exact cache."""
+        engine = self._engine({'scope': np.eye(8, dtype='float32')[2]})
+        
+        first = engine.search('scope', k=2)
+        second = engine.search('  Scope ', k=2)
+        
+        assert engine.embedder.calls == 1
+        assert second == first
+        assert first[0]['chunk_id'] == 'chunk_2'
+    
+    def test_paraphrase_reuses_results_per_k(self):
+        """Test near-identical embeddings hit the cache only for the same k."""
+        base = np.eye(8, dtype='float32')[4]
+        near = base + 0.01 * np.ones(8, dtype='float32')
+        engine = self._engine({'q1': base, 'q2': near})
+        
+        engine.search('q1', k=3)
+        index_calls = []
+        original_search = engine.index.search
+        engine.index.search = lambda *a: index_calls.append(1) or original_search(*a)
+        
+        assert engine.search('q2', k=3)[0]['chunk_id'] == 'chunk_4'
+        assert index_calls == []
+        
+        engine.search('q2', k=1)
+        assert index_calls == [1]
+    
+    def test_asearch_matches_search(self):
+        """Test the async search returns the same hits and reuses the cache."""
+        engine = self._engine({'scope': np.eye(8, dtype='float32')[5]})
+        
+        results = asyncio.run(engine.asearch('scope', k=2))
+        
+        assert results[0]['chunk_id'] == 'chunk_5'
+        assert asyncio.run(engine.asearch('scope', k=2)) == results
+        assert engine.embedder.calls == 1
+    
+    def test_chunk_id_lookup(self):
+        """Test chunk_id lookups go through the id map."""
+        engine = self._engine({})
+        
+        assert engine.search_by_chunk_id('chunk_5')['text'] == 'text 5'
+        assert engine.search_by_chunk_id('missing') is None
+        assert engine.get_similar_chunks('missing') == []
+        assert len(engine.get_similar_chunks('chunk_5', k=3)) == 3
+    
+    def test_ef_search_knob(self):
+        """Test ef_search reaches the HNSW index under the cosine wrapper."""
+        engine = self._engine({})
+        assert engine.ef_search is None and engine.nprobe is None
+        
+        builder = FAISSIndexBuilder(index_type="hnsw", metric="cosine")
+        engine.index, _ = builder.build_index(np.eye(8, dtype='float32'), engine.metadata)
+        engine.ef_search = 64
+        
+        assert faiss.downcast_index(engine.index.index).hnsw.efSearch == 64
+        with pytest.raises(ValueError):
+            engine.nprobe = 4
+    
+    def test_arrow_metadata_results_match_list(self):
+        """Test Arrow-backed metadata yields the same hits as a list of dicts."""
+        vectors = {'q': np.eye(8, dtype='float32')[3] + 0.1}
+        engine = self._engine(vectors)
+        rows = [dict(m, page_end=1, token_count=2) for m in engine.metadata]
+        arrow_engine = SemanticSearch(
+            engine.index, ArrowMetadata.from_chunks(rows), self.StubEmbedder(vectors)
+        )
+        
+        assert arrow_engine.search('q', k=4) == engine.search('q', k=4)
+        assert arrow_engine.get_similar_chunks('chunk_3', k=2) == engine.get_similar_chunks('chunk_3', k=2)
+    
+    def test_query_buffer_reused_and_grown(self):
+        """Test float32 queries pass through and others reuse a growing buffer."""
+        engine = self._engine({})
+        
+        query = np.zeros(8, dtype=np.float32)
+        assert np.shares_memory(engine._query_buffer(query), query)
+        
+        first = engine._query_buffer(np.ones(8, dtype=np.float64))
+        second = engine._query_buffer(np.zeros(8, dtype=np.float64))
+        assert first.base is second.base and first.dtype == np.float32
+        
+        batch = engine._query_buffer(np.ones((3, 8), dtype=np.float64))
+        assert batch.shape == (3, 8) and engine._buffers.buf.shape == (3, 8)
+        engine._query_buffer(np.ones((4, 8), dtype=np.float64))
+        assert engine._buffers.buf.shape == (6, 8)
+    
+    def test_to_gpu_keeps_cpu_index_without_gpus(self, monkeypatch):
+        """Test the GPU transfer is a no-op when faiss sees no GPUs."""
+        monkeypatch.setattr(faiss, "get_num_gpus", lambda: 0, raising=False)
+        engine = self._engine({})
+        index = engine.index
+        
+        assert engine.to_gpu() is False
+        assert engine.index is index and engine._gpu_res is None
+    
+    def test_batch_search_matches_single_search(self):
+        """Test batch_search returns the same rows as per-query search."""
+        vectors = {'a': np.eye(8, dtype='float32')[1], 'b': np.eye(8, dtype='float32')[6]}
+        engine = self._engine(vectors)
+        engine.embedder.embed_queries = lambda qs: np.stack([vectors[q] for q in qs])
+        
+        batched = engine.batch_search(['a', 'b'], k=3, min_score=0.5)
+        
+        assert batched == [engine.search('a', k=3, min_score=0.5), engine.search('b', k=3, min_score=0.5)]
+        assert [len(r) for r in batched] == [1, 1]
+        
+        hits = engine.search_arrays(['a', 'b'], k=3)
+        assert hits.shape == (2, 3)
+        assert hits['idx'][:, 0].tolist() == [1, 6]
+        assert hits['score'][:, 0].tolist() == [r[0]['score'] for r in batched]
 
 
 class TestEndToEndRAG: